@@ -0,0 +1,3 @@
+"""
+Benchmarks of the scale-up model on synthetic growth data
+"""
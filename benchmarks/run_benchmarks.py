@@ -0,0 +1,654 @@
+"""
+Benchmarks of the scale-up model. Measures the time and peak memory of the
+main entry points on synthetic growth data and compares them to the baselines
+in baseline.json. Exits with 1 if a benchmark got slower than its baseline
+by more than the threshold.
+
+The throughput is compared relative to the throughput of a reference
+calculation that does not use the model, run in the same session (see
+reference_benchmark), so the baselines do not depend on the speed of the
+machine they were saved on.
+
+Usage:
+    python -m benchmarks.run_benchmarks [--quick] [--filter TEXT] [--repeat N]
+        [--threshold FRACTION] [--memory-threshold FRACTION] [--save-baseline]
+
+Save new baselines with --save-baseline when a change of the model makes
+it faster on purpose.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import DAYS_PER_MONTH, growth_timeseries, write_scenario
+from src.grid_model import run_grid_model
+from src.preprocessing import convert_growth_model_output, prep_data, prep_scenarios
+from src.scaleup_model import (
+    CALIBRATION_DAYS,
+    MAX_DENSITY,
+    MIN_DENSITY,
+    SeaweedScaleUpModel,
+    run_model,
+)
+
+# File with the baselines of the benchmarks
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Location the synthetic scenarios are written to
+LOCATION = "synthetic"
+
+
+class BenchmarkSkipped(Exception):
+    """
+    Raised by the setup of a benchmark that cannot run in this environment
+    """
+
+
+class Benchmark:
+    """
+    A benchmark of an entry point of the model. The setup prepares the inputs
+    in the current directory and returns the function to measure, the amount of
+    work it does and the unit of this work, e.g. the number of simulated days.
+    """
+
+    def __init__(self, name, setup, quick=False):
+        """
+        Initialize the benchmark
+        Arguments:
+            name (str): the name of the benchmark
+            setup (function): prepares the benchmark and returns the function
+                to measure, the amount of work and its unit
+            quick (bool): whether the benchmark is part of the quick selection
+        Returns:
+            None
+        """
+        self.name = name
+        self.setup = setup
+        self.quick = quick
+
+
+def model_parameters(days_to_run):
+    """
+    The parameters run_cluster uses for seaweed_growth
+    Arguments:
+        days_to_run (int): the number of days to run
+    Returns:
+        dict: the parameters
+    """
+    return dict(
+        initial_seaweed=10000,
+        initial_area_built=100,
+        initial_area_used=100,
+        new_module_area_per_day=100,
+        min_density=MIN_DENSITY,
+        max_density=MAX_DENSITY,
+        max_area=100000,
+        optimal_growth_rate=30,
+        initial_lag=0,
+        percent_usable_for_growth=85,
+        days_to_run=days_to_run,
+    )
+
+
+def write_scenarios(kind, number_of_clusters, number_of_scenarios, months):
+    """
+    Writes and prepares synthetic scenarios
+    Arguments:
+        kind (str): the kind of synthetic growth
+        number_of_clusters (int): the number of clusters of every scenario
+        number_of_scenarios (int): the number of scenarios
+        months (int): the number of months of growth
+    Returns:
+        list: the names of the scenarios
+    """
+    scenarios = ["scenario_{}".format(scenario) for scenario in range(number_of_scenarios)]
+    for seed, scenario in enumerate(scenarios):
+        write_scenario(LOCATION, scenario, kind, number_of_clusters, months, seed=seed)
+        prep_data(scenario, LOCATION, number_of_clusters, daily_csv=False)
+    return scenarios
+
+
+def synthetic_model(kind, days):
+    """
+    Creates a model of a single cluster with synthetic growth
+    Arguments:
+        kind (str): the kind of synthetic growth
+        days (int): the number of days of growth
+    Returns:
+        SeaweedScaleUpModel: the model
+    """
+    scenario = write_scenarios(kind, 1, 1, -(-days // DAYS_PER_MONTH))[0]
+    path = "data" + os.sep + LOCATION + os.sep + scenario
+    return SeaweedScaleUpModel(path, 1, 1000000, 20)
+
+
+def reference_benchmark(steps):
+    """
+    Benchmark of a fixed calculation that does not use the model: a loop
+    of float operations like a simulated day and array operations like the
+    batched engine. The other benchmarks are compared relative to it
+    Arguments:
+        steps (int): the number of steps of the loop
+    Returns:
+        function: the setup of the benchmark
+    """
+
+    def setup():
+        growth = np.linspace(0, 1, steps)
+
+        def run():
+            seaweed = 1.0
+            for growth_rate_fraction in growth.tolist():
+                seaweed = seaweed * (1 + 0.3 * growth_rate_fraction * math.exp(-0.5)) / 1.1
+            for _ in range(20):
+                np.multiply.accumulate(np.sqrt(growth + seaweed))
+
+        return run, steps, "steps"
+
+    return setup
+
+
+# Measured first in every session, the others are compared relative to it
+REFERENCE = Benchmark("reference", reference_benchmark(200000))
+
+
+def seaweed_growth_benchmark(kind, days, event_driven):
+    """
+    Benchmark of SeaweedScaleUpModel.seaweed_growth
+    Arguments:
+        kind (str): the kind of synthetic growth
+        days (int): the number of days to run
+        event_driven (bool): whether to use the event engine
+    Returns:
+        function: the setup of the benchmark
+    """
+
+    def setup():
+        model = synthetic_model(kind, days)
+
+        def run():
+            model.seaweed_growth(
+                growth_rate_fraction=model.growth_timeseries,
+                event_driven=event_driven,
+                **model_parameters(days)
+            )
+
+        return run, days, "days"
+
+    return setup
+
+
+def productivity_benchmark(solver, calibrations):
+    """
+    Benchmark of SeaweedScaleUpModel.determine_average_productivity
+    Arguments:
+        solver (str): "steady_state" for a constant growth solved directly or
+            "simulation" for a seasonal growth that is simulated
+        calibrations (int): the number of calibrations to measure
+    Returns:
+        function: the setup of the benchmark
+    """
+
+    def setup():
+        model = synthetic_model("seasonal", CALIBRATION_DAYS)
+        if solver == "steady_state":
+            growth_rate_fractions = [0.2 + 0.6 * run / calibrations for run in range(calibrations)]
+        else:
+            growth_rate_fractions = [
+                growth_timeseries("seasonal", CALIBRATION_DAYS, seed)
+                for seed in range(calibrations)
+            ]
+
+        def run():
+            for growth_rate_fraction in growth_rate_fractions:
+                model.determine_average_productivity(
+                    growth_rate_fraction, CALIBRATION_DAYS, 85, 30, solver=solver
+                )
+
+        return run, calibrations, "calibrations"
+
+    return setup
+
+
+def run_model_benchmark(number_of_clusters, number_of_scenarios, years, **kwargs):
+    """
+    Benchmark of run_model
+    Arguments:
+        number_of_clusters (int): the number of clusters of every scenario
+        number_of_scenarios (int): the number of scenarios
+        years (int): the number of years to run
+        kwargs: further arguments of run_model, e.g. the engine
+    Returns:
+        function: the setup of the benchmark
+    """
+
+    def setup():
+        days_to_run = years * 12 * DAYS_PER_MONTH
+        scenarios = write_scenarios(
+            "multi_decade", number_of_clusters, number_of_scenarios, years * 12
+        )
+        # Every repeat runs all clusters again, the batch engine always does that
+        force = kwargs.get("engine", "serial") == "serial"
+
+        def run():
+            run_model(
+                optimal_growth_rate=30,
+                days_to_run=days_to_run,
+                global_pop=8000000000,
+                calories_per_person_per_day=2100,
+                harvest_loss=20,
+                food_waste=13,
+                calories_per_t_seaweed_wet=288200,
+                food_limit=0.15,
+                feed_limit=0.05,
+                biofuel_limit=0.25,
+                percent_usable_for_growth=85,
+                scenarios=scenarios,
+                location=LOCATION,
+                number_of_clusters=number_of_clusters,
+                force=force,
+                **kwargs
+            )
+
+        return run, days_to_run * number_of_clusters * len(scenarios), "days"
+
+    return setup
+
+
+def run_grid_model_benchmark(cells, years, **kwargs):
+    """
+    Benchmark of run_grid_model
+    Arguments:
+        cells (int): the number of grid cells, in 10 clusters
+        years (int): the number of years to run
+        kwargs: further arguments of run_grid_model, e.g. jobs
+    Returns:
+        function: the setup of the benchmark
+    """
+
+    def setup():
+        days_to_run = years * 12 * DAYS_PER_MONTH
+        write_scenario(
+            LOCATION, "scenario_0", "multi_decade", 10, years * 12, cells_per_cluster=cells // 10
+        )
+
+        def run():
+            run_grid_model(
+                optimal_growth_rate=30,
+                days_to_run=days_to_run,
+                global_pop=8000000000,
+                calories_per_person_per_day=2100,
+                harvest_loss=20,
+                food_waste=13,
+                calories_per_t_seaweed_wet=288200,
+                food_limit=0.15,
+                feed_limit=0.05,
+                biofuel_limit=0.25,
+                percent_usable_for_growth=85,
+                scenarios=["scenario_0"],
+                location=LOCATION,
+                **kwargs
+            )
+
+        return run, days_to_run * cells, "days"
+
+    return setup
+
+
+def prep_data_benchmark(number_of_clusters, months, columnar=False):
+    """
+    Benchmark of prep_data
+    Arguments:
+        number_of_clusters (int): the number of clusters
+        months (int): the number of months of growth
+        columnar (bool): whether to read the growth from the columnar format
+    Returns:
+        function: the setup of the benchmark
+    """
+
+    def setup():
+        write_scenario(LOCATION, "scenario_0", "multi_decade", number_of_clusters, months)
+        if columnar:
+            convert_growth_model_output("scenario_0", LOCATION)
+
+        def run():
+            prep_data("scenario_0", LOCATION, number_of_clusters)
+
+        return run, number_of_clusters * months, "cluster months"
+
+    return setup
+
+
+def prep_scenarios_benchmark(number_of_scenarios, number_of_clusters, months, **kwargs):
+    """
+    Benchmark of prep_scenarios
+    Arguments:
+        number_of_scenarios (int): the number of scenarios
+        number_of_clusters (int): the number of clusters
+        months (int): the number of months of growth
+        kwargs: further arguments of prep_scenarios, e.g. jobs
+    Returns:
+        function: the setup of the benchmark
+    """
+
+    def setup():
+        scenarios = ["scenario_{}".format(scenario) for scenario in range(number_of_scenarios)]
+        for seed, scenario in enumerate(scenarios):
+            write_scenario(
+                LOCATION, scenario, "multi_decade", number_of_clusters, months, seed=seed
+            )
+
+        def run():
+            prep_scenarios(scenarios, [LOCATION], number_of_clusters, **kwargs)
+
+        return run, number_of_scenarios * number_of_clusters * months, "cluster months"
+
+    return setup
+
+
+def create_plots_benchmark(number_of_clusters, number_of_scenarios, years, jobs=1):
+    """
+    Benchmark of plotter.create_plots on the results of run_model. The scenario
+    comparison is left out, as it needs the scenarios of the publication
+    Arguments:
+        number_of_clusters (int): the number of clusters of every scenario
+        number_of_scenarios (int): the number of scenarios
+        years (int): the number of years the model runs
+        jobs (int): the number of worker processes to plot in
+    Returns:
+        function: the setup of the benchmark
+    """
+
+    def setup():
+        try:
+            from src.plotter import create_plots
+        except Exception as error:
+            raise BenchmarkSkipped("plotter cannot be imported: {}".format(error))
+        scenarios = write_scenarios(
+            "multi_decade", number_of_clusters, number_of_scenarios, years * 12
+        )
+        run_model_benchmark(number_of_clusters, number_of_scenarios, years)()[0]()
+
+        def run():
+            create_plots(
+                LOCATION, scenarios, 100, number_of_clusters, with_comparison=False, jobs=jobs
+            )
+
+        # Make sure the plots work before measuring them
+        try:
+            run()
+        except Exception as error:
+            raise BenchmarkSkipped("plotting failed: {}".format(error))
+        return run, number_of_clusters * len(scenarios), "clusters"
+
+    return setup
+
+
+BENCHMARKS = [
+    Benchmark(
+        "seaweed_growth/constant/10y/daily",
+        seaweed_growth_benchmark("constant", 3650, False),
+    ),
+    Benchmark(
+        "seaweed_growth/seasonal/10y/daily",
+        seaweed_growth_benchmark("seasonal", 3650, False),
+        quick=True,
+    ),
+    Benchmark(
+        "seaweed_growth/seasonal/10y/event",
+        seaweed_growth_benchmark("seasonal", 3650, True),
+        quick=True,
+    ),
+    Benchmark(
+        "seaweed_growth/multi_decade/50y/daily",
+        seaweed_growth_benchmark("multi_decade", 18250, False),
+    ),
+    Benchmark(
+        "seaweed_growth/multi_decade/50y/event",
+        seaweed_growth_benchmark("multi_decade", 18250, True),
+    ),
+    Benchmark(
+        "determine_average_productivity/steady_state",
+        productivity_benchmark("steady_state", 100),
+        quick=True,
+    ),
+    Benchmark(
+        "determine_average_productivity/simulation",
+        productivity_benchmark("simulation", 10),
+        quick=True,
+    ),
+    Benchmark("run_model/serial/3x2/10y", run_model_benchmark(3, 2, 10), quick=True),
+    Benchmark("run_model/serial/20x7/10y", run_model_benchmark(20, 7, 10)),
+    Benchmark(
+        "run_model/event/20x7/10y", run_model_benchmark(20, 7, 10, event_driven=True)
+    ),
+    Benchmark(
+        "run_model/batch/20x7/10y", run_model_benchmark(20, 7, 10, engine="batch")
+    ),
+    Benchmark("run_grid_model/2000cells/10y", run_grid_model_benchmark(2000, 10)),
+    Benchmark("run_grid_model/20000cells/10y", run_grid_model_benchmark(20000, 10)),
+    Benchmark("prep_data/20x600m", prep_data_benchmark(20, 600), quick=True),
+    Benchmark("prep_data/columnar/20x600m", prep_data_benchmark(20, 600, columnar=True)),
+    Benchmark("prep_scenarios/7x20x600m", prep_scenarios_benchmark(7, 20, 600)),
+    Benchmark(
+        "prep_scenarios/7x20x600m/no_daily_csv",
+        prep_scenarios_benchmark(7, 20, 600, daily_csv=False),
+    ),
+    Benchmark("create_plots/3x2/10y", create_plots_benchmark(3, 2, 10)),
+    Benchmark("create_plots/3x4/10y/jobs4", create_plots_benchmark(3, 4, 10, jobs=4)),
+]
+
+
+def measure(benchmark, repeat=3):
+    """
+    Measures a benchmark in a temporary directory. The time is the fastest of
+    the repeats and the peak memory is traced in an extra run, as tracing
+    slows the run down
+    Arguments:
+        benchmark (Benchmark): the benchmark
+        repeat (int): how often the function is timed
+    Returns:
+        dict: the seconds, the work done per second and the peak memory in bytes
+    """
+    working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            run, work, unit = benchmark.setup()
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+            tracemalloc.start()
+            try:
+                run()
+                peak_memory = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        finally:
+            os.chdir(working_directory)
+    seconds = min(times)
+    return {
+        "seconds": seconds,
+        "throughput": work / seconds,
+        "unit": unit + " per second",
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def relative_results(results, reference):
+    """
+    Adds the throughput relative to the reference benchmark to the results
+    Arguments:
+        results (dict): the results of measure by benchmark name
+        reference (dict): the result of measure of the reference benchmark
+    Returns:
+        dict: the results by benchmark name, with the relative throughput
+    """
+    return {
+        name: dict(result, relative_throughput=result["throughput"] / reference["throughput"])
+        for name, result in results.items()
+    }
+
+
+def compare(results, baselines, threshold=0.25, memory_threshold=0.5):
+    """
+    Compares the results of the benchmarks to their baselines. The throughput
+    is compared relative to the reference benchmark (see relative_results)
+    Arguments:
+        results (dict): the results of measure with the relative throughput,
+            by benchmark name
+        baselines (dict): the baselines by benchmark name
+        threshold (float): how much lower the throughput may be, as a fraction
+        memory_threshold (float): how much higher the peak memory may be,
+            as a fraction
+    Returns:
+        list: a description of every regression
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        if result["relative_throughput"] < baseline["relative_throughput"] * (1 - threshold):
+            regressions.append(
+                "{}: {:.4g} times the reference throughput instead of {:.4g}".format(
+                    name, result["relative_throughput"], baseline["relative_throughput"]
+                )
+            )
+        if result["peak_memory_bytes"] > baseline["peak_memory_bytes"] * (
+            1 + memory_threshold
+        ):
+            regressions.append(
+                "{}: peak memory of {} bytes instead of {}".format(
+                    name, result["peak_memory_bytes"], baseline["peak_memory_bytes"]
+                )
+            )
+    return regressions
+
+
+def load_baselines(path=BASELINE_FILE):
+    """
+    Loads the baselines
+    Arguments:
+        path (str): the file the baselines are saved in
+    Returns:
+        dict: the baselines by benchmark name, empty if there are none
+    """
+    try:
+        with open(path) as baseline_file:
+            return json.load(baseline_file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(results, path=BASELINE_FILE):
+    """
+    Saves results as the new baselines, keeping the baselines of the
+    benchmarks that were not run. Only the throughput relative to the
+    reference benchmark and the peak memory are saved, not the time, which
+    depends on the machine
+    Arguments:
+        results (dict): the results of measure with the relative throughput,
+            by benchmark name
+        path (str): the file to save the baselines in
+    Returns:
+        None
+    """
+    baselines = load_baselines(path)
+    for name, result in results.items():
+        baselines[name] = {
+            "relative_throughput": result["relative_throughput"],
+            "unit": result["unit"],
+            "peak_memory_bytes": result["peak_memory_bytes"],
+        }
+    with open(path, "w") as baseline_file:
+        json.dump(dict(sorted(baselines.items())), baseline_file, indent=4)
+        baseline_file.write("\n")
+
+
+def main(arguments=None):
+    """
+    Runs the benchmarks from the command line
+    Arguments:
+        arguments (list): the command line arguments, sys.argv if None
+    Returns:
+        int: the exit code, 1 if a benchmark regressed
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks of the scale-up model")
+    parser.add_argument("--quick", action="store_true", help="only run the quick selection")
+    parser.add_argument("--filter", default="", help="only run benchmarks containing this")
+    parser.add_argument("--repeat", type=int, default=3, help="how often to time each one")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed loss of throughput compared to the baseline, as a fraction",
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=0.5,
+        help="allowed increase of the peak memory compared to the baseline",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="save the results as new baselines"
+    )
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="file of the baselines")
+    arguments = parser.parse_args(arguments)
+    baselines = load_baselines(arguments.baseline)
+    reference = measure(REFERENCE, arguments.repeat)
+    print(
+        "{:45} {:9.4f} s {:12.4g} {:22}".format(
+            REFERENCE.name, reference["seconds"], reference["throughput"], reference["unit"]
+        )
+    )
+    results = {}
+    for benchmark in BENCHMARKS:
+        if arguments.quick and not benchmark.quick:
+            continue
+        if arguments.filter not in benchmark.name:
+            continue
+        try:
+            result = measure(benchmark, arguments.repeat)
+        except BenchmarkSkipped as reason:
+            print("{:45} skipped ({})".format(benchmark.name, reason))
+            continue
+        result = relative_results({benchmark.name: result}, reference)[benchmark.name]
+        results[benchmark.name] = result
+        baseline = baselines.get(benchmark.name)
+        print(
+            "{:45} {:9.4f} s {:12.4g} {:22} {:8.1f} MB{}".format(
+                benchmark.name,
+                result["seconds"],
+                result["throughput"],
+                result["unit"],
+                result["peak_memory_bytes"] / 1e6,
+                ""
+                if baseline is None
+                else " ({:+.0%} relative throughput)".format(
+                    result["relative_throughput"] / baseline["relative_throughput"] - 1
+                ),
+            )
+        )
+    if arguments.save_baseline:
+        save_baselines(results, arguments.baseline)
+        print("Saved the baselines to {}".format(arguments.baseline))
+        return 0
+    regressions = compare(
+        results, baselines, arguments.threshold, arguments.memory_threshold
+    )
+    for regression in regressions:
+        print("Regression: " + regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Generators of synthetic growth data for the benchmarks. The growth is
+constant within a month, like the output of the growth model, and can be
+written in the format prep_data reads, so the whole pipeline can be run on it
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.growth_timeseries import GrowthTimeseries
+
+# Kinds of synthetic growth
+GROWTH_KINDS = ("constant", "seasonal", "multi_decade")
+# Days every month is used for, the same as the default of prep_data
+DAYS_PER_MONTH = 30
+
+
+def monthly_growth(kind, months, seed=0):
+    """
+    Creates the growth rate fraction of every month
+    Arguments:
+        kind (str): "constant" for the same growth every month, "seasonal" for
+            a yearly cycle or "multi_decade" for a yearly cycle with random
+            differences between the years and a slow recovery from a low start,
+            like after a nuclear winter
+        months (int): the number of months
+        seed (int): seed of the random numbers, so the growth is reproducible
+    Returns:
+        np.ndarray: the growth rate fraction of every month, between 0 and 1
+    """
+    rng = np.random.default_rng(seed)
+    if kind == "constant":
+        return np.full(months, rng.uniform(0.2, 0.8))
+    month = np.arange(months)
+    season = np.sin(2 * np.pi * (month / 12 + rng.uniform()))
+    if kind == "seasonal":
+        growth = rng.uniform(0.3, 0.6) + rng.uniform(0.1, 0.3) * season
+    elif kind == "multi_decade":
+        recovery = 1 - 0.6 * np.exp(-month / rng.uniform(24, 120))
+        yearly_anomaly = rng.normal(0, 0.05, months // 12 + 1)[month // 12]
+        growth = (rng.uniform(0.3, 0.6) + 0.2 * season + yearly_anomaly) * recovery
+    else:
+        raise ValueError("kind must be one of {}".format(", ".join(GROWTH_KINDS)))
+    return np.clip(growth, 0, 1)
+
+
+def growth_timeseries(kind, days, seed=0):
+    """
+    Creates a synthetic growth timeseries
+    Arguments:
+        kind (str): the kind of growth (see monthly_growth)
+        days (int): the number of days
+        seed (int): seed of the random numbers
+    Returns:
+        GrowthTimeseries: the growth rate fraction of every day
+    """
+    months = -(-days // DAYS_PER_MONTH)
+    lengths = np.full(months, DAYS_PER_MONTH)
+    lengths[-1] = days - DAYS_PER_MONTH * (months - 1)
+    return GrowthTimeseries.from_segments(
+        lengths, monthly_growth(kind, months, seed), name="synthetic_" + kind
+    )
+
+
+def clustered_growth_table(kind, number_of_clusters, months, cells_per_cluster=5, seed=0):
+    """
+    Creates a table of the growth of grid cells, in the format of the output of
+    the growth model that prep_data reads
+    Arguments:
+        kind (str): the kind of growth (see monthly_growth)
+        number_of_clusters (int): the number of clusters
+        months (int): the number of months
+        cells_per_cluster (int): the number of grid cells of every cluster
+        seed (int): seed of the random numbers
+    Returns:
+        pd.DataFrame: one row per grid cell with the growth of every month
+            and the cluster (starting at 0)
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for cluster in range(number_of_clusters):
+        growth = monthly_growth(kind, months, seed + cluster)
+        for _ in range(cells_per_cluster):
+            rows.append(np.clip(growth + rng.normal(0, 0.02, months), 0, 1))
+    growth_df = pd.DataFrame(np.array(rows), columns=range(months))
+    growth_df["cluster"] = np.repeat(np.arange(number_of_clusters), cells_per_cluster)
+    return growth_df
+
+
+def write_scenario(
+    location, scenario, kind, number_of_clusters, months, cells_per_cluster=5, seed=0
+):
+    """
+    Writes the growth of a synthetic scenario to where prep_data reads it
+    and creates the folder for its results
+    Arguments:
+        location (str): location on the globe
+        scenario (str): the scenario
+        kind (str): the kind of growth (see monthly_growth)
+        number_of_clusters (int): the number of clusters
+        months (int): the number of months
+        cells_per_cluster (int): the number of grid cells of every cluster
+        seed (int): seed of the random numbers
+    Returns:
+        None
+    """
+    path = "data" + os.sep + location + os.sep + scenario
+    os.makedirs(path, exist_ok=True)
+    os.makedirs("results" + os.sep + location + os.sep + scenario, exist_ok=True)
+    clustered_growth_table(
+        kind, number_of_clusters, months, cells_per_cluster, seed
+    ).to_pickle(path + os.sep + "seaweed_growth_rate_clustered_" + location + ".pkl")
@@ -3,4 +3,5 @@ from setuptools import find_packages, setup
 setup(
     name="src",
     packages=find_packages(),
+    package_data={"src": ["ALLFED.mplstyle"]},
 )
@@ -0,0 +1,348 @@
+"""
+Batched version of the seaweed scale-up model. Simulates many runs
+(e.g. all clusters of all scenarios or a set of parameter combinations)
+in a single loop over the days, advancing all runs at once with NumPy
+"""
+import numpy as np
+
+from src.scaleup_model import (
+    CUMULATIVE_HARVEST_FOR_FOOD,
+    CURRENT_AREA_BUILT,
+    CURRENT_AREA_USED,
+    CURRENT_DENSITY,
+    CURRENT_SEAWEED,
+    CURRENT_SEAWEED_NEED,
+    GROWTH_RATE_MULTIPLICATOR,
+    HARVEST_DF_COLUMNS,
+    HARVEST_FOR_FOOD,
+    HARVEST_INTERVALL,
+    HARVEST_WET,
+    HARVEST_WET_WITH_LOSS,
+    MAX_DENSITY,
+    MIN_DENSITY,
+    NEW_AREA_USED,
+    NEW_MODULE_AREA,
+    SEAWEED_REMAINING_TO_GROW,
+    build_harvest_df,
+    seaweed_farm_area_per_day,
+    split_records,
+)
+
+
+def batch_seaweed_growth(
+    growth_rate_fractions,
+    initial_seaweed,
+    initial_area_built,
+    initial_area_used,
+    new_module_area_per_day,
+    min_density,
+    max_density,
+    max_area,
+    optimal_growth_rate,
+    harvest_loss,
+    initial_lag,
+    percent_usable_for_growth,
+    days_to_run,
+):
+    """
+    Calculates the seaweed growth for several runs at once. Does the same
+    calculations as SeaweedScaleUpModel.seaweed_growth, but harvests,
+    restocking and the max area limit are applied as masked updates on
+    arrays with one entry per run.
+    All parameters except growth_rate_fractions and days_to_run can either
+    be a scalar that is used for all runs or have one value per run.
+    Arguments:
+        growth_rate_fractions: list with one growth rate fraction per run,
+            each either a scalar or a list, array or GrowthTimeseries with one
+            value per day, or an array of shape (days, number of runs)
+        initial_seaweed: The initial amount of seaweed in t
+        initial_area_built: The initial area built in km²
+        initial_area_used: The initial area used in km²
+        new_module_area_per_day: The area built per day in km²
+        min_density: The minimum density in t/km²
+        max_density: The maximum density in t/km²
+        max_area: The maximum area in km²
+        optimal_growth_rate: The optimal growth rate in %
+        harvest_loss: The harvest loss in percent
+        initial_lag: The initial lag in days
+        percent_usable_for_growth: The percent usable for growth in %
+        days_to_run: The number of days to run
+    Returns:
+        array of shape (days_to_run, len(HARVEST_DF_COLUMNS), number of runs)
+        with the daily records of all runs, NaN where no value was written
+    """
+    growth = growth_rate_matrix(growth_rate_fractions, days_to_run)
+    records = np.full(
+        (days_to_run, len(HARVEST_DF_COLUMNS), growth.shape[1]), np.nan
+    )
+    for current_day, record in iter_batch_seaweed_growth(
+        growth,
+        initial_seaweed,
+        initial_area_built,
+        initial_area_used,
+        new_module_area_per_day,
+        min_density,
+        max_density,
+        max_area,
+        optimal_growth_rate,
+        harvest_loss,
+        initial_lag,
+        percent_usable_for_growth,
+        days_to_run,
+    ):
+        records[current_day] = record
+    return records
+
+
+def iter_batch_seaweed_growth(
+    growth_rate_fractions,
+    initial_seaweed,
+    initial_area_built,
+    initial_area_used,
+    new_module_area_per_day,
+    min_density,
+    max_density,
+    max_area,
+    optimal_growth_rate,
+    harvest_loss,
+    initial_lag,
+    percent_usable_for_growth,
+    days_to_run,
+):
+    """
+    Calculates the seaweed growth for several runs at once like
+    batch_seaweed_growth, but yields the records day by day while they are
+    calculated, so callers that only need some values of every run, e.g. the
+    first harvest, do not have to keep the records of all days in memory
+    Arguments:
+        growth_rate_fractions: the growth rate fractions of the runs
+            (see growth_rate_matrix)
+        the other arguments are the same as for batch_seaweed_growth
+    Yields:
+        int: the day
+        array of shape (len(HARVEST_DF_COLUMNS), number of runs) with the
+        records of all runs on that day, NaN where no value was written
+    """
+    growth = growth_rate_matrix(growth_rate_fractions, days_to_run)
+    number_of_runs = growth.shape[1]
+
+    def per_run(value):
+        return np.broadcast_to(
+            np.asarray(value, dtype=float), (number_of_runs,)
+        ).copy()
+
+    min_density = per_run(min_density)
+    max_density = per_run(max_density)
+    max_area = per_run(max_area)
+    optimal_growth_rate = per_run(optimal_growth_rate)
+    initial_lag = per_run(initial_lag)
+    new_module_area_per_day = per_run(new_module_area_per_day)
+    # make the harvest loss a fraction
+    harvest_loss = per_run(harvest_loss) / 100
+    assert np.all((harvest_loss <= 1) & (harvest_loss >= 0))
+    # Calculate the area that can be built on each day. Runs with no new
+    # module area estimate the productivity on a fixed area. The area of a
+    # day is only formed for all runs on that day, so the memory does not
+    # grow with days times runs
+    farm_area_per_day = seaweed_farm_area_per_day(np.arange(days_to_run))
+    builds_modules = new_module_area_per_day > 0
+    # We can only use a fraction of the module area to grow seaweed
+    usable_fraction = per_run(percent_usable_for_growth) / 100
+    # Initialize
+    current_area_built = per_run(initial_area_built)
+    current_area_used = per_run(initial_area_used)
+    current_seaweed = per_run(initial_seaweed)
+    current_density = current_seaweed / current_area_used
+    cumulative_harvest_for_food = np.zeros(number_of_runs)
+    current_seaweed_need = np.zeros(number_of_runs)
+    harvest_intervall = np.zeros(number_of_runs)
+
+    for current_day in range(days_to_run):
+        record = np.full((len(HARVEST_DF_COLUMNS), number_of_runs), np.nan)
+        # Build more seaweed farms if the lag is over and the maximum is not reached
+        building = (current_day > initial_lag) & (current_area_built < max_area)
+        module_area = np.where(
+            builds_modules, farm_area_per_day[current_day], new_module_area_per_day
+        )
+        record[NEW_MODULE_AREA] = np.where(building, module_area, 0)
+        current_area_built = np.where(
+            building,
+            np.minimum(current_area_built + module_area * usable_fraction, max_area),
+            current_area_built,
+        )
+        # Let the seaweed grow
+        self_shading_factor = batch_self_shading(current_density / 1000)
+        actual_growth_rate = 1 + (
+            (optimal_growth_rate * growth[current_day] * self_shading_factor) / 100
+        )
+        record[GROWTH_RATE_MULTIPLICATOR] = actual_growth_rate
+        assert np.all((actual_growth_rate <= 2) & (actual_growth_rate >= 0))
+        current_seaweed = current_seaweed * actual_growth_rate
+        current_density = current_seaweed / current_area_used
+        # Harvest all runs that have reached harvest density
+        harvest = current_density >= max_density
+        if harvest.any():
+            record[HARVEST_INTERVALL, harvest] = harvest_intervall[harvest]
+            harvest_intervall[harvest] = 0
+            seaweed_remaining_to_grow = current_area_used * min_density
+            harvest_wet = current_seaweed - seaweed_remaining_to_grow
+            harvest_wet_with_loss = harvest_wet * (1 - harvest_loss)
+            current_seaweed_need = np.where(
+                harvest,
+                (current_area_built - current_area_used) * min_density,
+                current_seaweed_need,
+            )
+            # Runs that cannot stock all the area built use the whole harvest for it
+            restock = current_seaweed_need > harvest_wet_with_loss
+            food = harvest & ~restock
+            harvest_for_food = harvest_wet_with_loss - current_seaweed_need
+            new_area_used = current_seaweed_need / min_density
+            record[SEAWEED_REMAINING_TO_GROW, harvest] = seaweed_remaining_to_grow[
+                harvest
+            ]
+            record[HARVEST_WET, harvest] = harvest_wet[harvest]
+            record[HARVEST_WET_WITH_LOSS, harvest] = harvest_wet_with_loss[harvest]
+            record[HARVEST_FOR_FOOD, food] = harvest_for_food[food]
+            record[NEW_AREA_USED, harvest] = new_area_used[harvest]
+            cumulative_harvest_for_food = np.where(
+                food,
+                cumulative_harvest_for_food + harvest_for_food,
+                cumulative_harvest_for_food,
+            )
+            current_area_used = np.where(
+                harvest, current_area_used + new_area_used, current_area_used
+            )
+            current_seaweed = np.where(
+                harvest,
+                np.where(
+                    restock,
+                    seaweed_remaining_to_grow + harvest_wet_with_loss,
+                    current_area_used * min_density,
+                ),
+                current_seaweed,
+            )
+        # Increment the harvest counter
+        harvest_intervall += 1
+        record[CURRENT_SEAWEED_NEED] = current_seaweed_need
+        record[CURRENT_AREA_BUILT] = current_area_built
+        record[CURRENT_AREA_USED] = current_area_used
+        record[CURRENT_SEAWEED] = current_seaweed
+        record[CURRENT_DENSITY] = current_density
+        record[CUMULATIVE_HARVEST_FOR_FOOD] = cumulative_harvest_for_food
+        yield current_day, record
+
+
+def batch_determine_average_productivity(
+    growth_rate_fractions,
+    days_to_run,
+    percent_usable_for_growth,
+    optimal_growth_rate,
+    harvest_loss,
+):
+    """
+    Let the model run for one km² for several runs at once to determine
+    the productivity per area and day, like
+    SeaweedScaleUpModel.determine_average_productivity
+    Arguments:
+        growth_rate_fractions: list with one growth rate fraction per run,
+            each either a scalar or a list, array or GrowthTimeseries with one
+            value per day
+        days_to_run: int, number of days to run the model
+        percent_usable_for_growth: float, the percentage of the module area
+            that can be used for growth
+        optimal_growth_rate: float, the optimal growth rate of the seaweed
+        harvest_loss: float, the harvest loss in percent
+    Returns:
+        array with the average productivity per km² and day of every run,
+        NaN for runs that never harvest food
+    """
+    # Only the last harvest of every run is needed, so the days are not kept
+    growth = growth_rate_matrix(growth_rate_fractions, days_to_run)
+    stable_harvest_intervall = np.full(growth.shape[1], np.nan)
+    stable_harvest_for_food = np.full(growth.shape[1], np.nan)
+    for _, record in iter_batch_seaweed_growth(
+        growth,
+        initial_seaweed=1,
+        initial_area_built=1,
+        initial_area_used=1,
+        new_module_area_per_day=0,
+        min_density=MIN_DENSITY,
+        max_density=MAX_DENSITY,
+        max_area=1,
+        optimal_growth_rate=optimal_growth_rate,
+        harvest_loss=harvest_loss,
+        initial_lag=0,
+        percent_usable_for_growth=percent_usable_for_growth,
+        days_to_run=days_to_run,
+    ):
+        # Get the stabilized values
+        harvest = ~np.isnan(record[HARVEST_INTERVALL])
+        stable_harvest_intervall[harvest] = record[HARVEST_INTERVALL, harvest]
+        food = ~np.isnan(record[HARVEST_FOR_FOOD])
+        stable_harvest_for_food[food] = record[HARVEST_FOR_FOOD, food]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return stable_harvest_for_food / stable_harvest_intervall
+
+
+def batch_harvest_dfs(records, split_harvests=False):
+    """
+    Converts the records of batch_seaweed_growth into one dataframe per run
+    Arguments:
+        records: array returned by batch_seaweed_growth
+        split_harvests: whether to split the results of every run into the
+            daily state and the harvests (see scaleup_model.split_harvest_df)
+    Returns:
+        list with one dataframe per run, the same as returned by
+        SeaweedScaleUpModel.seaweed_growth, or one tuple of the daily state
+        and the harvests per run
+    """
+    if split_harvests:
+        return [split_records(records[:, :, run]) for run in range(records.shape[2])]
+    return [build_harvest_df(records[:, :, run]) for run in range(records.shape[2])]
+
+
+def batch_self_shading(density):
+    """
+    Vectorized version of self_shading
+    Arguments:
+        density: array of seaweed densities in kg/m²
+    Returns:
+        array of growth rate fractions
+    """
+    assert np.all(density > 0)
+    return np.where(density < 0.4, 1, np.exp(-0.513 * (density - 0.4)))
+
+
+def growth_rate_matrix(growth_rate_fractions, days_to_run):
+    """
+    Combines the growth rate fractions of several runs into one array
+    Arguments:
+        growth_rate_fractions: list with one growth rate fraction per run,
+            each either a scalar or a list, array or GrowthTimeseries with one
+            value per day, or an array of shape (days, number of runs)
+        days_to_run: the number of days to run
+    Returns:
+        array of shape (days_to_run, number of runs)
+    """
+    if isinstance(growth_rate_fractions, np.ndarray) and growth_rate_fractions.ndim == 2:
+        if len(growth_rate_fractions) < days_to_run:
+            raise IndexError("growth rate fractions are shorter than days_to_run")
+        growth = growth_rate_fractions[:days_to_run]
+        assert np.all((growth >= 0) & (growth <= 1))
+        return growth
+    growth = np.empty((days_to_run, len(growth_rate_fractions)))
+    for run, growth_rate_fraction in enumerate(growth_rate_fractions):
+        if np.ndim(growth_rate_fraction) == 0:
+            growth[:, run] = growth_rate_fraction
+        else:
+            growth_rate_fraction = np.asarray(growth_rate_fraction, dtype=float)
+            if len(growth_rate_fraction) < days_to_run:
+                raise IndexError(
+                    "growth rate fraction of run {} is shorter than days_to_run".format(
+                        run
+                    )
+                )
+            growth[:, run] = growth_rate_fraction[:days_to_run]
+    # Make sure all the values in the growth rate fractions are between 0 and 1
+    assert np.all((growth >= 0) & (growth <= 1))
+    return growth
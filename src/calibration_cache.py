@@ -0,0 +1,215 @@
+"""
+Cache for the productivity calibration of the scale-up model, so clusters
+with the same growth do not have to be calibrated again
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from src.scaleup_model import MAX_DENSITY, MIN_DENSITY, MODEL_VERSION
+
+
+class CalibrationCache:
+    """
+    Stores the results of SeaweedScaleUpModel.determine_average_productivity,
+    keyed on a hash of all inputs of the calibration and the model version.
+    The results are kept in memory and, if a directory is given, also on
+    disk as one small json file per entry. Both are limited in size and the
+    least recently used entries are removed first.
+    """
+
+    def __init__(self, directory=None, max_entries=1024, max_disk_entries=10000):
+        """
+        Initialize the cache
+        Arguments:
+            directory: directory to save the entries in, None to only keep
+                them in memory
+            max_entries: the maximum number of entries kept in memory
+            max_disk_entries: the maximum number of entries kept on disk
+        Returns:
+            None
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(
+        growth_rate_fraction,
+        days_to_run,
+        percent_usable_for_growth,
+        optimal_growth_rate,
+        harvest_loss,
+        min_density=MIN_DENSITY,
+        max_density=MAX_DENSITY,
+    ):
+        """
+        Calculates the key of a calibration
+        Arguments:
+            growth_rate_fraction: the growth rate fraction the calibration runs with,
+                either a scalar or a timeseries
+            days_to_run: the number of days the calibration runs
+            percent_usable_for_growth: the percentage of the module area
+                that can be used for growth
+            optimal_growth_rate: the optimal growth rate of the seaweed
+            harvest_loss: the harvest loss in percent
+            min_density: the density left after a harvest in t/km²
+            max_density: the harvest density in t/km²
+        Returns:
+            str: the hex digest identifying the calibration
+        """
+        if np.ndim(growth_rate_fraction) == 0:
+            growth = repr(float(growth_rate_fraction))
+        else:
+            growth = hashlib.sha256(
+                np.ascontiguousarray(growth_rate_fraction, dtype=float).tobytes()
+            ).hexdigest()
+        inputs = [
+            MODEL_VERSION,
+            growth,
+            int(days_to_run),
+            float(percent_usable_for_growth),
+            float(optimal_growth_rate),
+            float(harvest_loss),
+            float(min_density),
+            float(max_density),
+        ]
+        return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Looks up a calibration
+        Arguments:
+            key: the key of the calibration
+        Returns:
+            tuple: whether the calibration was found and its productivity
+                per km² and day (None if the calibration found no productivity)
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, self.entries[key]
+        if self.directory is not None:
+            path = self.path(key)
+            try:
+                with open(path) as entry:
+                    productivity_day_km2 = json.load(entry)["productivity_day_km2"]
+            except (FileNotFoundError, ValueError, KeyError):
+                pass
+            else:
+                # Mark the entry as recently used
+                os.utime(path)
+                self.remember(key, productivity_day_km2)
+                self.hits += 1
+                return True, productivity_day_km2
+        self.misses += 1
+        return False, None
+
+    def put(self, key, productivity_day_km2):
+        """
+        Saves a calibration
+        Arguments:
+            key: the key of the calibration
+            productivity_day_km2: the productivity per km² and day, None
+                if the calibration found no productivity
+        Returns:
+            None
+        """
+        if productivity_day_km2 is not None:
+            productivity_day_km2 = float(productivity_day_km2)
+        self.remember(key, productivity_day_km2)
+        if self.directory is not None:
+            # Write to a temporary file first, so other processes never
+            # read a half written entry
+            temporary_path = self.path(key) + ".{}.tmp".format(os.getpid())
+            with open(temporary_path, "w") as entry:
+                json.dump(
+                    {
+                        "model_version": MODEL_VERSION,
+                        "productivity_day_km2": productivity_day_km2,
+                    },
+                    entry,
+                )
+            os.replace(temporary_path, self.path(key))
+            self.evict_disk_entries()
+
+    def remember(self, key, productivity_day_km2):
+        """
+        Keeps a calibration in memory and removes the least recently used
+        entries if there are too many
+        Arguments:
+            key: the key of the calibration
+            productivity_day_km2: the productivity per km² and day
+        Returns:
+            None
+        """
+        self.entries[key] = productivity_day_km2
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def evict_disk_entries(self):
+        """
+        Removes the least recently used entries on disk if there are too many
+        Arguments:
+            None
+        Returns:
+            None
+        """
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".json")
+        ]
+        if len(paths) <= self.max_disk_entries:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[: len(paths) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def path(self, key):
+        """
+        The file an entry is saved in
+        Arguments:
+            key: the key of the calibration
+        Returns:
+            str: path of the entry
+        """
+        return os.path.join(self.directory, key + ".json")
+
+    def clear(self):
+        """
+        Removes all entries from memory and disk and resets the counters
+        Arguments:
+            None
+        Returns:
+            None
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        if self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        """
+        Summarizes how well the cache worked
+        Arguments:
+            None
+        Returns:
+            dict: number of hits, misses and entries in memory
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
@@ -0,0 +1,355 @@
+"""
+Checkpoints of the scale-up model. The state of a simulation at the end of a
+day is saved, so the run can be continued from there later, e.g. to extend
+the number of days without simulating the first days again
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from src.manifest import growth_hash
+from src.results_store import load_results, results_path
+from src.scaleup_model import HARVEST_DF_COLUMNS, MODEL_VERSION, build_harvest_df
+
+# Name of the checkpoint files of a cluster
+CHECKPOINT_FILE = "checkpoint_cluster_{}.json"
+
+
+class SimulationState:
+    """
+    Everything SeaweedScaleUpModel.seaweed_growth needs to know about the
+    farm to continue a run on the given day
+    """
+
+    # The values of the state, in the order they are saved in
+    FIELDS = (
+        "day",
+        "current_area_built",
+        "current_area_used",
+        "current_seaweed",
+        "current_density",
+        "current_seaweed_need",
+        "harvest_intervall",
+        "cumulative_harvest_for_food",
+        "max_area_reached",
+    )
+
+    def __init__(
+        self,
+        day,
+        current_area_built,
+        current_area_used,
+        current_seaweed,
+        current_density,
+        current_seaweed_need,
+        harvest_intervall,
+        cumulative_harvest_for_food,
+        max_area_reached=False,
+    ):
+        """
+        Initialize the state
+        Arguments:
+            day: the next day to simulate
+            current_area_built: The area built in km²
+            current_area_used: The area used in km²
+            current_seaweed: The amount of seaweed in t
+            current_density: The seaweed density in t/km²
+            current_seaweed_need: The seaweed needed to stock the area built in t
+            harvest_intervall: The days since the last harvest
+            cumulative_harvest_for_food: The harvest for food so far in t
+            max_area_reached: whether reaching the maximum area was reported
+        Returns:
+            None
+        """
+        self.day = int(day)
+        self.current_area_built = float(current_area_built)
+        self.current_area_used = float(current_area_used)
+        self.current_seaweed = float(current_seaweed)
+        self.current_density = float(current_density)
+        self.current_seaweed_need = float(current_seaweed_need)
+        self.harvest_intervall = int(harvest_intervall)
+        self.cumulative_harvest_for_food = float(cumulative_harvest_for_food)
+        self.max_area_reached = bool(max_area_reached)
+
+    def __eq__(self, other):
+        if not isinstance(other, SimulationState):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return "SimulationState({})".format(
+            ", ".join("{}={!r}".format(*item) for item in self.to_dict().items())
+        )
+
+    def to_dict(self):
+        """
+        Converts the state into a dict that can be saved as json
+        Arguments:
+            None
+        Returns:
+            dict: the values of the state
+        """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, values):
+        """
+        Creates the state from a dict created by to_dict
+        Arguments:
+            values: the values of the state
+        Returns:
+            SimulationState: the state
+        """
+        return cls(**{field: values[field] for field in cls.FIELDS})
+
+    @classmethod
+    def from_harvest_df(
+        cls,
+        harvest_df,
+        max_area,
+        initial_lag,
+        calibration_run=False,
+        initial_state=None,
+    ):
+        """
+        Determines the state at the end of a run from its results
+        Arguments:
+            harvest_df: the dataframe created by SeaweedScaleUpModel.seaweed_growth
+            max_area: The maximum area in km² the run was made with
+            initial_lag: The initial lag in days the run was made with
+            calibration_run: whether the run was a calibration run
+            initial_state: the state the run was continued from, None if
+                it started on day 0
+        Returns:
+            SimulationState: the state on the day after the last day of the run
+        """
+        if initial_state is None:
+            first_day = 0
+            harvest_intervall = 0
+            max_area_reached = False
+        else:
+            first_day = initial_state.day
+            harvest_intervall = initial_state.harvest_intervall
+            max_area_reached = initial_state.max_area_reached
+        day = first_day + len(harvest_df)
+        if "harvest_intervall" in harvest_df.columns:
+            harvest_days = np.flatnonzero(harvest_df["harvest_intervall"].notna())
+        else:
+            harvest_days = []
+        if len(harvest_days) > 0:
+            harvest_intervall = day - (first_day + harvest_days[-1])
+        else:
+            harvest_intervall += len(harvest_df)
+        # Reaching the maximum area is reported on the first day after the lag
+        # that starts with the maximum area built
+        area_built_at_start = np.concatenate(
+            (
+                [np.nan if initial_state is None else initial_state.current_area_built],
+                harvest_df["current_area_built"].to_numpy()[:-1],
+            )
+        )
+        first_checked = max(int(initial_lag) + 1 - first_day, 0)
+        if not calibration_run and np.any(area_built_at_start[first_checked:] >= max_area):
+            max_area_reached = True
+        last_day = harvest_df.iloc[-1]
+        return cls(
+            day,
+            last_day["current_area_built"],
+            last_day["current_area_used"],
+            last_day["current_seaweed"],
+            last_day["current_density"],
+            last_day["current_seaweed_need"],
+            harvest_intervall,
+            last_day["cumulative_harvest_for_food"],
+            max_area_reached,
+        )
+
+
+def run_key(
+    growth_rate_fraction,
+    initial_seaweed,
+    initial_area_built,
+    initial_area_used,
+    new_module_area_per_day,
+    min_density,
+    max_density,
+    max_area,
+    optimal_growth_rate,
+    harvest_loss,
+    initial_lag,
+    percent_usable_for_growth,
+):
+    """
+    Calculates a key of all inputs of a run except the number of days, so a
+    checkpoint is only used to continue the same run
+    Arguments:
+        growth_rate_fraction: The fraction of the growth rate, either a scalar
+            or a timeseries
+        initial_seaweed: The initial amount of seaweed in t
+        initial_area_built: The initial area built in km²
+        initial_area_used: The initial area used in km²
+        new_module_area_per_day: The area built per day in km²
+        min_density: The minimum density in t/km²
+        max_density: The maximum density in t/km²
+        max_area: The maximum area in km²
+        optimal_growth_rate: The optimal growth rate in %
+        harvest_loss: The harvest loss in percent
+        initial_lag: The initial lag in days
+        percent_usable_for_growth: The percent usable for growth in %
+    Returns:
+        str: the hex digest identifying the run
+    """
+    inputs = [MODEL_VERSION, growth_hash(growth_rate_fraction)] + [
+        float(value)
+        for value in (
+            initial_seaweed,
+            initial_area_built,
+            initial_area_used,
+            new_module_area_per_day,
+            min_density,
+            max_density,
+            max_area,
+            optimal_growth_rate,
+            harvest_loss,
+            initial_lag,
+            percent_usable_for_growth,
+        )
+    ]
+    return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+
+def checkpoint_path(location, scenario, cluster):
+    """
+    The file the checkpoint of a cluster is saved in
+    Arguments:
+        location (str): location on the globe
+        scenario (str): the scenario
+        cluster (int): the cluster
+    Returns:
+        str: path of the checkpoint
+    """
+    return (
+        "results"
+        + os.sep
+        + location
+        + os.sep
+        + scenario
+        + os.sep
+        + CHECKPOINT_FILE.format(cluster)
+    )
+
+
+def save_checkpoint(state, path, key):
+    """
+    Saves the state of a run
+    Arguments:
+        state (SimulationState): the state to save
+        path (str): the file to save the state in
+        key (str): the key of the run (see run_key)
+    Returns:
+        None
+    """
+    # Write to a temporary file first, so a crash never leaves a half
+    # written checkpoint behind
+    temporary_path = path + ".{}.tmp".format(os.getpid())
+    with open(temporary_path, "w") as checkpoint:
+        json.dump(
+            {"model_version": MODEL_VERSION, "key": key, "state": state.to_dict()},
+            checkpoint,
+        )
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path, key):
+    """
+    Loads the state of a run saved with save_checkpoint
+    Arguments:
+        path (str): the file the state is saved in
+        key (str): the key of the run (see run_key)
+    Returns:
+        SimulationState: the state, None if there is no checkpoint of this run
+    """
+    try:
+        with open(path) as checkpoint:
+            saved = json.load(checkpoint)
+        if saved["key"] != key:
+            return None
+        return SimulationState.from_dict(saved["state"])
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return None
+
+
+def load_previous_run(location, scenario, cluster, key):
+    """
+    Loads the checkpoint of a cluster and the results it belongs to, so the
+    run can be continued from the checkpoint
+    Arguments:
+        location (str): location on the globe
+        scenario (str): the scenario
+        cluster (int): the cluster
+        key (str): the key of the run (see run_key)
+    Returns:
+        tuple: the SimulationState and the results of the days before it,
+            (None, None) if there is no checkpoint of this run or the saved
+            results do not belong to it
+    """
+    state = load_checkpoint(checkpoint_path(location, scenario, cluster), key)
+    path = results_path(location, scenario, cluster)
+    if state is None or not os.path.exists(path):
+        return None, None
+    previous_df = load_results(path)
+    # Only exact results can be continued
+    if not 0 < state.day <= len(previous_df) or any(
+        previous_df[column].dtype != np.float64
+        for column in previous_df.columns.intersection(HARVEST_DF_COLUMNS)
+    ):
+        return None, None
+    previous_df = previous_df.iloc[: state.day]
+    # The results of the last day before the checkpoint have to be its state
+    last_day = previous_df.iloc[-1]
+    if any(
+        last_day[field] != getattr(state, field)
+        for field in (
+            "current_area_built",
+            "current_area_used",
+            "current_seaweed",
+            "current_density",
+            "current_seaweed_need",
+            "cumulative_harvest_for_food",
+        )
+    ):
+        return None, None
+    return state, previous_df
+
+
+def extend_harvest_df(previous_df, harvest_df):
+    """
+    Appends the results of a run continued from a checkpoint to the results
+    of the days before the checkpoint
+    Arguments:
+        previous_df (pd.DataFrame): the results of the days before the checkpoint
+        harvest_df (pd.DataFrame): the results of the continued run
+    Returns:
+        pd.DataFrame: the same dataframe as created by an uninterrupted run
+    """
+    days = len(previous_df) + len(harvest_df)
+    records = np.full((days, len(HARVEST_DF_COLUMNS)), np.nan)
+    for rows, results in [
+        (slice(None, len(previous_df)), previous_df),
+        (slice(len(previous_df), None), harvest_df),
+    ]:
+        for column in results.columns.intersection(HARVEST_DF_COLUMNS):
+            records[rows, HARVEST_DF_COLUMNS.index(column)] = results[column]
+    extended_df = build_harvest_df(records)
+    # Columns added by the run, e.g. whether the days were extrapolated
+    for column in harvest_df.columns.difference(HARVEST_DF_COLUMNS, sort=False):
+        if column in previous_df.columns:
+            previous_values = previous_df[column].to_numpy()
+        else:
+            previous_values = np.zeros(len(previous_df), dtype=harvest_df[column].dtype)
+        extended_df[column] = np.concatenate(
+            (previous_values, harvest_df[column].to_numpy())
+        )
+    return extended_df
@@ -0,0 +1,677 @@
+"""
+Event-driven version of the seaweed scale-up model. Instead of going
+through every day with the complete farm state, it jumps from one
+harvest to the next and only fills in the daily values when asked to
+"""
+import logging
+import math
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+from src.scaleup_model import (
+    CUMULATIVE_HARVEST_FOR_FOOD,
+    CURRENT_AREA_BUILT,
+    CURRENT_AREA_USED,
+    CURRENT_DENSITY,
+    CURRENT_SEAWEED,
+    CURRENT_SEAWEED_NEED,
+    GROWTH_RATE_MULTIPLICATOR,
+    HARVEST_DF_COLUMNS,
+    HARVEST_INTERVALL,
+    NEW_MODULE_AREA,
+    build_harvest_df,
+    daily_growth_rate_fractions,
+    seaweed_farm_area_per_day,
+    self_shading,
+)
+
+# Columns of the harvest events, one row per harvest day
+HARVEST_EVENT_COLUMNS = HARVEST_DF_COLUMNS[HARVEST_INTERVALL:]
+
+logger = logging.getLogger(__name__)
+
+
+def event_seaweed_growth(
+    growth_rate_fraction,
+    initial_seaweed,
+    initial_area_built,
+    initial_area_used,
+    new_module_area_per_day,
+    min_density,
+    max_density,
+    max_area,
+    optimal_growth_rate,
+    harvest_loss,
+    initial_lag,
+    percent_usable_for_growth,
+    days_to_run,
+    daily=True,
+    verbose=False,
+    calibration_run=False,
+):
+    """
+    Calculates the seaweed growth from harvest to harvest. Gives the same
+    results as SeaweedScaleUpModel.seaweed_growth, but:
+        - the area built does not depend on the seaweed, so it is calculated
+          for all days at once
+        - between two harvests only the amount of seaweed changes, so only
+          its growth is calculated until it reaches the harvest density, one
+          month after the other. Without self shading the day it reaches the
+          self shading density is solved directly. With self shading the
+          growth depends on the density of the day before, so it is stepped
+          day by day, but without the rest of the farm
+        - the growth rate fraction is constant within a month, so a harvest
+          cycle that starts in the same state during the same month as an
+          earlier one is not stepped again
+    Arguments:
+        growth_rate_fraction: The fraction of the growth rate (can either be scalar,
+            list or GrowthTimeseries)
+        initial_seaweed: The initial amount of seaweed in t
+        initial_area_built: The initial area built in km²
+        initial_area_used: The initial area used in km²
+        new_module_area_per_day: The area built per day in km²
+        min_density: The minimum density in t/km²
+        max_density: The maximum density in t/km²
+        max_area: The maximum area in km²
+        optimal_growth_rate: The optimal growth rate in %
+        harvest_loss: The harvest loss in percent
+        initial_lag: The initial lag in days
+        percent_usable_for_growth: The percent usable for growth in %
+        days_to_run: The number of days to run
+        daily: whether to return the daily values or only the harvests
+        verbose: log every harvest (at the DEBUG level)
+        calibration_run: whether this is a run to determine the productivity
+    Returns:
+        A dataframe with all important growth numbers for every day (the same
+        as SeaweedScaleUpModel.seaweed_growth) or, if daily is False, a dataframe
+        with one row per harvest indexed by the day of the harvest
+    """
+    growth_rate_fractions = daily_growth_rate_fractions(
+        growth_rate_fraction, days_to_run
+    )
+    new_module_area, area_built, max_area_day = build_farm_area(
+        initial_area_built,
+        new_module_area_per_day,
+        max_area,
+        initial_lag,
+        percent_usable_for_growth,
+        days_to_run,
+    )
+    harvests = []
+    # Daily seaweed, density and growth rate for every stretch between two harvests
+    growth_paths = []
+    for first_day, growth_path, harvest in iter_harvests(
+        growth_rate_fractions,
+        area_built,
+        max_area_day,
+        initial_seaweed,
+        initial_area_used,
+        min_density,
+        max_density,
+        optimal_growth_rate,
+        harvest_loss,
+        days_to_run,
+        verbose,
+        calibration_run,
+    ):
+        growth_paths.append((first_day,) + growth_path)
+        if harvest is not None:
+            harvests.append(harvest)
+    if not daily:
+        return pd.DataFrame(
+            harvests, columns=("day",) + HARVEST_EVENT_COLUMNS
+        ).set_index("day")
+    return daily_harvest_df(
+        np.array(harvests, dtype=float).reshape(-1, len(HARVEST_EVENT_COLUMNS) + 1),
+        growth_paths,
+        new_module_area,
+        area_built,
+        initial_area_used,
+        days_to_run,
+    )
+
+
+def iter_seaweed_growth(
+    growth_rate_fraction,
+    initial_seaweed,
+    initial_area_built,
+    initial_area_used,
+    new_module_area_per_day,
+    min_density,
+    max_density,
+    max_area,
+    optimal_growth_rate,
+    harvest_loss,
+    initial_lag,
+    percent_usable_for_growth,
+    days_to_run,
+    harvests_only=False,
+    stop=None,
+    verbose=False,
+    calibration_run=False,
+):
+    """
+    Calculates the seaweed growth like event_seaweed_growth, but yields the
+    results day by day while they are calculated. The run can be ended early
+    by the caller or with stop conditions, e.g. to find out when the need
+    is first satisfied without simulating the rest of the days. The records
+    of a complete run give the dataframe of SeaweedScaleUpModel.seaweed_growth
+    with pd.DataFrame(records).set_index("day")
+    Arguments:
+        growth_rate_fraction: The fraction of the growth rate (can either be scalar,
+            list or GrowthTimeseries)
+        initial_seaweed: The initial amount of seaweed in t
+        initial_area_built: The initial area built in km²
+        initial_area_used: The initial area used in km²
+        new_module_area_per_day: The area built per day in km²
+        min_density: The minimum density in t/km²
+        max_density: The maximum density in t/km²
+        max_area: The maximum area in km²
+        optimal_growth_rate: The optimal growth rate in %
+        harvest_loss: The harvest loss in percent
+        initial_lag: The initial lag in days
+        percent_usable_for_growth: The percent usable for growth in %
+        days_to_run: The number of days to run
+        harvests_only: whether to only yield the harvest days
+        stop: function or list of functions that get every record and
+            return True to end the run after it (see need_satisfied,
+            area_saturated and day_budget)
+        verbose: log every harvest (at the DEBUG level)
+        calibration_run: whether this is a run to determine the productivity
+    Yields:
+        dict: the day and the values of the HARVEST_DF_COLUMNS written on it
+    """
+    if stop is None:
+        stop = []
+    elif callable(stop):
+        stop = [stop]
+    growth_rate_fractions = daily_growth_rate_fractions(
+        growth_rate_fraction, days_to_run
+    )
+    new_module_area, area_built, max_area_day = build_farm_area(
+        initial_area_built,
+        new_module_area_per_day,
+        max_area,
+        initial_lag,
+        percent_usable_for_growth,
+        days_to_run,
+    )
+    # The values that only change on harvest days
+    current_seaweed_need = 0.0
+    current_area_used = float(initial_area_used)
+    cumulative_harvest_for_food = 0.0
+    for first_day, growth_path, harvest in iter_harvests(
+        growth_rate_fractions,
+        area_built,
+        max_area_day,
+        initial_seaweed,
+        initial_area_used,
+        min_density,
+        max_density,
+        optimal_growth_rate,
+        harvest_loss,
+        days_to_run,
+        verbose,
+        calibration_run,
+    ):
+        seaweed_path, density_path, growth_rate_path = growth_path
+        for day_grown in range(len(seaweed_path)):
+            current_day = first_day + day_grown
+            record = {
+                "day": current_day,
+                "new_module_area_per_day": float(new_module_area[current_day]),
+                "actual_growth_rate_multiplicator": growth_rate_path[day_grown],
+            }
+            if harvest is not None and current_day == harvest[0]:
+                record.update(zip(HARVEST_EVENT_COLUMNS, map(float, harvest[1:])))
+                if np.isnan(record["harvest_for_food"]):
+                    del record["harvest_for_food"]
+                current_seaweed_need = record["current_seaweed_need"]
+                current_area_used = record["current_area_used"]
+                cumulative_harvest_for_food = record["cumulative_harvest_for_food"]
+            elif harvests_only:
+                continue
+            else:
+                record.update(
+                    current_seaweed_need=current_seaweed_need,
+                    current_area_built=float(area_built[current_day]),
+                    current_area_used=current_area_used,
+                    current_seaweed=seaweed_path[day_grown],
+                    current_density=density_path[day_grown],
+                    cumulative_harvest_for_food=cumulative_harvest_for_food,
+                )
+            yield record
+            if any(condition(record) for condition in stop):
+                return
+
+
+def need_satisfied(seaweed_need, fraction=1):
+    """
+    Stop condition for iter_seaweed_growth: stops at the first harvest that
+    gives enough food to satisfy the need until the next harvest
+    Arguments:
+        seaweed_need: the seaweed needed per day in t
+        fraction: the fraction of the need that has to be satisfied
+    Returns:
+        function: the stop condition
+    """
+
+    def condition(record):
+        harvest_intervall = record.get("harvest_intervall", 0)
+        return harvest_intervall > 0 and (
+            record.get("harvest_for_food", 0) / harvest_intervall
+            >= seaweed_need * fraction
+        )
+
+    return condition
+
+
+def area_saturated(max_area):
+    """
+    Stop condition for iter_seaweed_growth: stops on the day the maximum
+    area is built
+    Arguments:
+        max_area: The maximum area in km²
+    Returns:
+        function: the stop condition
+    """
+
+    def condition(record):
+        return record.get("current_area_built", 0) >= max_area
+
+    return condition
+
+
+def day_budget(days):
+    """
+    Stop condition for iter_seaweed_growth: stops after the given number of days
+    Arguments:
+        days: the number of days to run
+    Returns:
+        function: the stop condition
+    """
+
+    def condition(record):
+        return record["day"] >= days - 1
+
+    return condition
+
+
+def iter_harvests(
+    growth_rate_fractions,
+    area_built,
+    max_area_day,
+    initial_seaweed,
+    initial_area_used,
+    min_density,
+    max_density,
+    optimal_growth_rate,
+    harvest_loss,
+    days_to_run,
+    verbose=False,
+    calibration_run=False,
+):
+    """
+    Lets the seaweed grow from harvest to harvest. The next harvest is only
+    calculated when it is asked for, so the run can be stopped at any harvest
+    Arguments:
+        growth_rate_fractions: list with the growth rate fraction of every day
+        area_built: the area built at the end of every day (see build_farm_area)
+        max_area_day: the day the maximum area was reached (see build_farm_area)
+        initial_seaweed: The initial amount of seaweed in t
+        initial_area_used: The initial area used in km²
+        min_density: The minimum density in t/km²
+        max_density: The maximum density in t/km²
+        optimal_growth_rate: The optimal growth rate in %
+        harvest_loss: The harvest loss in percent
+        days_to_run: The number of days to run
+        verbose: log every harvest (at the DEBUG level)
+        calibration_run: whether this is a run to determine the productivity
+    Yields:
+        tuple: the first day grown since the last harvest, the daily seaweed,
+            density and growth rate since then (see grow_until_harvest) and the
+            harvest at the end of these days (day followed by the values of the
+            HARVEST_EVENT_COLUMNS) or None if the run ended before the harvest
+    """
+    # Print the message on the same position as the daily model
+    track_max_area = max_area_day is None or calibration_run
+    # First and last day + 1 of the stretches with the same growth rate fraction
+    segment_starts = np.flatnonzero(
+        np.diff(growth_rate_fractions[:days_to_run], prepend=np.nan)
+    ).tolist()
+    segment_ends = segment_starts[1:] + [days_to_run]
+    # make the harvest loss a fraction
+    harvest_loss = harvest_loss / 100
+    assert harvest_loss <= 1 and harvest_loss >= 0
+
+    current_area_used = initial_area_used
+    current_seaweed = initial_seaweed
+    current_density = current_seaweed / current_area_used
+    cumulative_harvest_for_food = 0
+    last_harvest_day = 0
+    # Growth paths that reached harvest density, by the state after the harvest
+    # they started from. The first day after a harvest is still shaded by the
+    # density before the harvest, so it is part of the state. With monthly growth
+    # a month rarely has two cycles starting in the same state, the paths are
+    # mostly reused with a constant growth rate fraction
+    known_paths = {}
+    current_day = 0
+    while current_day < days_to_run:
+        segment_end = segment_ends[bisect_right(segment_starts, current_day) - 1]
+        state = (
+            growth_rate_fractions[current_day],
+            current_seaweed,
+            current_density,
+            current_area_used,
+        )
+        path = known_paths.get(state)
+        if path is None or current_day + len(path[0]) > segment_end:
+            path = grow_until_harvest(
+                growth_rate_fractions,
+                segment_starts,
+                segment_ends,
+                current_day,
+                current_seaweed,
+                current_density,
+                current_area_used,
+                optimal_growth_rate,
+                max_density,
+            )
+            # Only paths within one month can be reused
+            if path[3] and current_day + len(path[0]) <= segment_end:
+                known_paths[state] = path
+        seaweed_path, density_path, growth_rate_path, harvested = path
+        first_day = current_day
+        current_day += len(seaweed_path)
+        current_seaweed = seaweed_path[-1]
+        current_density = density_path[-1]
+        if not harvested:
+            yield first_day, (seaweed_path, density_path, growth_rate_path), None
+            break
+        harvest_day = current_day - 1
+        if not track_max_area and max_area_day <= harvest_day:
+            logger.info("max area reached at month %s", max_area_day / 30)
+            track_max_area = True
+        harvest_intervall = harvest_day - last_harvest_day
+        last_harvest_day = harvest_day
+        if verbose:
+            logger.debug("harvesting at day %s", harvest_day)
+            logger.debug("days since last harvest: %s", harvest_intervall)
+        # calculate the amount of seaweed we have to leave in the field
+        seaweed_remaining_to_grow = current_area_used * min_density
+        # calulate the amount harvested
+        harvest_wet = current_seaweed - seaweed_remaining_to_grow
+        if verbose:
+            logger.debug("harvest_wet %s", harvest_wet)
+        harvest_wet_with_loss = harvest_wet * (1 - harvest_loss)
+        # calculate how much seaweed we would need to stock all aready built area
+        current_area_built = area_built[harvest_day]
+        current_seaweed_need = (current_area_built - current_area_used) * min_density
+        new_area_used = current_seaweed_need / min_density
+        current_area_used += new_area_used
+        # check if we can stock all the area built
+        if current_seaweed_need > harvest_wet_with_loss:
+            harvest_for_food = np.nan
+            current_seaweed = seaweed_remaining_to_grow + harvest_wet_with_loss
+        else:
+            harvest_for_food = harvest_wet_with_loss - current_seaweed_need
+            cumulative_harvest_for_food += harvest_for_food
+            current_seaweed = current_area_used * min_density
+        yield first_day, (seaweed_path, density_path, growth_rate_path), (
+            harvest_day,
+            harvest_intervall,
+            seaweed_remaining_to_grow,
+            harvest_wet,
+            harvest_wet_with_loss,
+            harvest_for_food,
+            new_area_used,
+            current_seaweed_need,
+            current_area_built,
+            current_area_used,
+            current_seaweed,
+            current_density,
+            cumulative_harvest_for_food,
+        )
+    if not track_max_area:
+        logger.info("max area reached at month %s", max_area_day / 30)
+
+
+def grow_until_harvest(
+    growth_rate_fractions,
+    segment_starts,
+    segment_ends,
+    first_day,
+    current_seaweed,
+    current_density,
+    current_area_used,
+    optimal_growth_rate,
+    max_density,
+):
+    """
+    Lets the seaweed grow until it reaches the harvest density or the run ends,
+    one stretch with the same growth rate fraction after the other. Without
+    self shading the days until the density reaches self shading are solved
+    directly (see unshaded_growth_days). With self shading the growth rate
+    depends on the density of the day before, so it is stepped day by day
+    Arguments:
+        growth_rate_fractions: list with the growth rate fraction of every day
+        segment_starts: the first days of the stretches with the same growth
+            rate fraction
+        segment_ends: the last days + 1 of these stretches, the last one is the
+            number of days of the run
+        first_day: the first day to grow
+        current_seaweed: the seaweed in t at the end of the day before first_day
+        current_density: the density in t/km² the self shading of first_day is based on
+        current_area_used: the area used in km²
+        optimal_growth_rate: The optimal growth rate in %
+        max_density: The maximum density in t/km²
+    Returns:
+        tuple: lists of the seaweed, density and growth rate of every day grown
+            and whether harvest density was reached on the last of these days
+    """
+    seaweed_path = []
+    density_path = []
+    growth_rate_path = []
+    current_day = first_day
+    segment = bisect_right(segment_starts, first_day) - 1
+    while segment < len(segment_ends):
+        segment_end = segment_ends[segment]
+        # Multiplied in the same order as in the daily model to get the same result
+        optimal_growth = optimal_growth_rate * growth_rate_fractions[current_day]
+        if current_density / 1000 < 0.4:
+            actual_growth_rate = 1 + (optimal_growth * self_shading(current_density / 1000)) / 100
+            assert actual_growth_rate <= 2 and actual_growth_rate >= 0
+            # Without self shading the growth rate stays the same until the end of
+            # the stretch, so the days until self shading starts are solved directly
+            days = min(
+                unshaded_growth_days(
+                    current_seaweed, current_area_used, actual_growth_rate, max_density
+                ),
+                segment_end - current_day,
+            )
+            # Multiplied one day after the other, the same as stepping every day
+            seaweed = np.multiply.accumulate(
+                np.append(current_seaweed, np.full(days, actual_growth_rate))
+            )[1:]
+            density = seaweed / current_area_used
+            crossings = np.flatnonzero((density / 1000 >= 0.4) | (density >= max_density))
+            if len(crossings) > 0:
+                days = int(crossings[0]) + 1
+            seaweed_path.extend(seaweed[:days].tolist())
+            density_path.extend(density[:days].tolist())
+            growth_rate_path.extend([actual_growth_rate] * days)
+            current_day += days
+            current_seaweed = seaweed_path[-1]
+            current_density = density_path[-1]
+            if current_density >= max_density:
+                return seaweed_path, density_path, growth_rate_path, True
+        else:
+            # With self shading the density only grows, so the growth rate is
+            # largest on the first day
+            actual_growth_rate = 1 + (optimal_growth * self_shading(current_density / 1000)) / 100
+            assert actual_growth_rate <= 2 and actual_growth_rate >= 0
+            for current_day in range(current_day, segment_end):
+                # The same calculation as self_shading, without the function call
+                actual_growth_rate = 1 + (
+                    optimal_growth * math.exp(-0.513 * (current_density / 1000 - 0.4))
+                ) / 100
+                current_seaweed = current_seaweed * actual_growth_rate
+                current_density = current_seaweed / current_area_used
+                seaweed_path.append(current_seaweed)
+                density_path.append(current_density)
+                growth_rate_path.append(actual_growth_rate)
+                if current_density >= max_density:
+                    return seaweed_path, density_path, growth_rate_path, True
+                # The first day after a harvest is shaded by the density before
+                # the harvest, so the seaweed left can be without self shading
+                if current_density / 1000 < 0.4:
+                    current_day += 1
+                    break
+            else:
+                current_day = segment_end
+        if current_day == segment_end:
+            segment += 1
+    return seaweed_path, density_path, growth_rate_path, False
+
+
+def unshaded_growth_days(
+    current_seaweed, current_area_used, actual_growth_rate, max_density
+):
+    """
+    Calculates in how many days the seaweed growing without self shading
+    reaches the density with self shading or the harvest density. Rounding
+    can make the result one day too short or too long, so the density has
+    to be checked on the days around it
+    Arguments:
+        current_seaweed: the seaweed in t at the start
+        current_area_used: the area used in km²
+        actual_growth_rate: the growth rate multiplicator without self shading
+        max_density: The maximum density in t/km²
+    Returns:
+        int: the number of days plus one, at least one
+    """
+    if actual_growth_rate <= 1:
+        return math.inf
+    target_seaweed = min(400, max_density) * current_area_used
+    return max(
+        math.ceil(
+            math.log(target_seaweed / current_seaweed) / math.log(actual_growth_rate)
+        ),
+        0,
+    ) + 1
+
+
+def build_farm_area(
+    initial_area_built,
+    new_module_area_per_day,
+    max_area,
+    initial_lag,
+    percent_usable_for_growth,
+    days_to_run,
+):
+    """
+    Calculates the area built for all days at once. The area does not
+    depend on the seaweed, so it can be calculated before the growth
+    Arguments:
+        initial_area_built: The initial area built in km²
+        new_module_area_per_day: The area built per day in km², if larger than 0
+            it follows seaweed_farm_area_per_day
+        max_area: The maximum area in km²
+        initial_lag: The initial lag in days
+        percent_usable_for_growth: The percent usable for growth in %
+        days_to_run: The number of days to run
+    Returns:
+        tuple: the new module area of every day, the area built at the end of
+            every day and the day the maximum area was reached (None if never)
+    """
+    days = np.arange(days_to_run)
+    if new_module_area_per_day > 0:
+        module_area_per_day = seaweed_farm_area_per_day(days)
+    else:
+        module_area_per_day = np.full(days_to_run, float(new_module_area_per_day))
+    # We can only use a fraction of the module area to grow seaweed
+    growth_area_per_day = module_area_per_day * (percent_usable_for_growth / 100)
+    building_days = days[days > initial_lag]
+    # The area built after every building day, if there was no maximum
+    area_built_unlimited = np.add.accumulate(
+        np.concatenate(([initial_area_built], growth_area_per_day[building_days]))
+    )
+    # Building stops on the first building day that starts with the maximum area
+    saturated = np.flatnonzero(area_built_unlimited >= max_area)
+    area_built_after = area_built_unlimited[1:].copy()
+    if len(saturated) == 0:
+        building_stops = len(building_days)
+    elif saturated[0] == 0:
+        building_stops = 0
+        area_built_after[:] = initial_area_built
+    else:
+        building_stops = saturated[0]
+        # The area reaching the maximum is cut off at the maximum
+        area_built_after[building_stops - 1:] = max_area
+    area_built = np.full(days_to_run, float(initial_area_built))
+    area_built[building_days] = area_built_after
+    new_module_area = np.zeros(days_to_run)
+    new_module_area[building_days[:building_stops]] = module_area_per_day[
+        building_days[:building_stops]
+    ]
+    if building_stops < len(building_days):
+        max_area_day = int(building_days[building_stops])
+    else:
+        max_area_day = None
+    return new_module_area, area_built, max_area_day
+
+
+def daily_harvest_df(
+    harvests,
+    growth_paths,
+    new_module_area,
+    area_built,
+    initial_area_used,
+    days_to_run,
+):
+    """
+    Fills in the daily values between the harvests
+    Arguments:
+        harvests: array with one row per harvest, the day followed by the
+            values of the HARVEST_EVENT_COLUMNS
+        growth_paths: list of (first day, seaweed, density, growth rate) of the
+            stretches grown between the harvests
+        new_module_area: the new module area of every day
+        area_built: the area built at the end of every day
+        initial_area_used: The initial area used in km²
+        days_to_run: The number of days to run
+    Returns:
+        A dataframe with all important growth numbers for every day, the same as
+        SeaweedScaleUpModel.seaweed_growth
+    """
+    records = np.full((days_to_run, len(HARVEST_DF_COLUMNS)), np.nan)
+    records[:, NEW_MODULE_AREA] = new_module_area
+    records[:, CURRENT_AREA_BUILT] = area_built
+    for first_day, seaweed_path, density_path, growth_rate_path in growth_paths:
+        days = slice(first_day, first_day + len(seaweed_path))
+        records[days, CURRENT_SEAWEED] = seaweed_path
+        records[days, CURRENT_DENSITY] = density_path
+        records[days, GROWTH_RATE_MULTIPLICATOR] = growth_rate_path
+    harvest_days = harvests[:, 0].astype(int)
+    # The harvest columns come in the same order as in the records
+    harvest_values = harvests[:, 1:]
+    records[harvest_days, HARVEST_INTERVALL:CURRENT_SEAWEED_NEED] = harvest_values[
+        :, :CURRENT_SEAWEED_NEED - HARVEST_INTERVALL
+    ]
+    records[harvest_days, CURRENT_SEAWEED] = harvest_values[
+        :, HARVEST_EVENT_COLUMNS.index("current_seaweed")
+    ]
+    # These only change on harvest days
+    days_with_value = np.diff(np.append(harvest_days, days_to_run), prepend=0)
+    for column, initial_value in (
+        (CURRENT_SEAWEED_NEED, 0),
+        (CURRENT_AREA_USED, initial_area_used),
+        (CUMULATIVE_HARVEST_FOR_FOOD, 0),
+    ):
+        values = np.append(
+            initial_value, harvest_values[:, column - HARVEST_INTERVALL]
+        )
+        records[:, column] = np.repeat(values, days_with_value)
+    return build_harvest_df(records)
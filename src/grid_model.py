@@ -0,0 +1,375 @@
+"""
+Runs the scale-up model for every grid cell of the growth model instead of
+the median growth of the clusters, to show where farms would be productive.
+All cells share the build and harvest parameters and are simulated in chunks
+with the batched engine, keeping only a few values of every cell instead of
+the daily records, so tens of thousands of cells fit into memory
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.batch_model import batch_determine_average_productivity, iter_batch_seaweed_growth
+from src.instrumentation import phase
+from src.preprocessing import (
+    CLUSTER_KEY,
+    COLUMNAR_EXTENSION,
+    MONTH_KEY,
+    MONTHS_KEY,
+    columnar_index,
+    growth_model_path,
+)
+from src.scaleup_model import (
+    CALIBRATION_DAYS,
+    CUMULATIVE_HARVEST_FOR_FOOD,
+    CURRENT_AREA_BUILT,
+    HARVEST_FOR_FOOD,
+    HARVEST_INTERVALL,
+    MAX_DENSITY,
+    MIN_DENSITY,
+    calculate_seaweed_need,
+)
+
+# File with the results of every grid cell of a scenario
+GRID_RESULTS_FILE = "grid_cell_results.csv"
+# Number of grid cells simulated at once
+CHUNK_CELLS = 4096
+# The results of every grid cell
+GRID_COLUMNS = [
+    "cluster",
+    "mean_growth_rate",
+    "productivity_day_km2",
+    "max_area",
+    "days_to_productivity",
+    "harvests",
+    "area_built",
+    "cumulative_harvest_for_food",
+    "mean_daily_harvest_for_food",
+]
+
+logger = logging.getLogger(__name__)
+
+
+def cell_growth(scenario, location, starting_month=0):
+    """
+    Reads the monthly growth of every grid cell from the output of the growth
+    model, the columnar format if it exists (see
+    preprocessing.write_columnar_growth) or the pickle. Both keep the index
+    of the grid cells, e.g. their latitude and longitude
+    Arguments:
+        scenario (str): the scenario
+        location (str): location on the globe
+        starting_month (int): the first month to use
+    Returns:
+        pd.DataFrame: one row per grid cell with the growth of every month
+            from starting_month on, sorted by month, and its cluster
+    """
+    columnar_path = growth_model_path(scenario, location, COLUMNAR_EXTENSION)
+    if os.path.exists(columnar_path):
+        with np.load(columnar_path) as columnar_file:
+            months = np.sort(columnar_file[MONTHS_KEY])
+            months = months[months >= starting_month]
+            growth_df = pd.DataFrame(
+                {month: columnar_file[MONTH_KEY.format(month)] for month in months.tolist()},
+                index=columnar_index(columnar_file),
+            )
+            growth_df["cluster"] = columnar_file[CLUSTER_KEY]
+        return growth_df
+    growth_df = pd.read_pickle(growth_model_path(scenario, location))
+    return select_months(growth_df, starting_month)
+
+
+def select_months(growth_df, starting_month=0):
+    """
+    Selects the months the cells are simulated for
+    Arguments:
+        growth_df (pd.DataFrame): the output of the growth model, one row per
+            grid cell with the growth of every month and its cluster
+        starting_month (int): the first month to use
+    Returns:
+        pd.DataFrame: the growth of every month from starting_month on,
+            sorted by month, and the cluster
+    """
+    months = growth_df.columns.drop("cluster")
+    months = months[months >= starting_month].sort_values()
+    return growth_df[list(months) + ["cluster"]]
+
+
+def simulate_cells(
+    monthly_growth,
+    max_growth,
+    seaweed_needed,
+    harvest_loss,
+    optimal_growth_rate,
+    days_to_run,
+    percent_usable_for_growth,
+    report=None,
+):
+    """
+    Calibrates and simulates grid cells with the batched engine, like
+    run_batch does for clusters, and keeps only the results of every cell
+    Arguments:
+        monthly_growth (np.ndarray): one row per cell with its growth rate
+            fraction of every month
+        max_growth (int): the number of days every month is used for
+        seaweed_needed (float): the seaweed needed per day in t
+        harvest_loss (float): Fraction of harvest lost
+        optimal_growth_rate (float): the optimal growth rate
+        days_to_run (int): the number of days to run the model
+        percent_usable_for_growth (float): how much of the harvest is usable for growth
+        report (RunReport): report to add the time of the phases to
+    Returns:
+        dict: array with the value of every cell by column of GRID_COLUMNS,
+            except the cluster. Cells that are not productive enough are NaN
+    """
+    # Contiguous rows, so the mean of a cell does not depend on the chunk size
+    monthly_growth = np.ascontiguousarray(monthly_growth, dtype=float)
+    cells = len(monthly_growth)
+    months_needed = -(-days_to_run // max_growth)
+    if monthly_growth.shape[1] < months_needed:
+        raise ValueError("the growth of the cells is shorter than days_to_run")
+    results = {column: np.full(cells, np.nan) for column in GRID_COLUMNS[1:]}
+    results["mean_growth_rate"] = monthly_growth.mean(axis=1)
+    with phase(report, "calibrate"):
+        results["productivity_day_km2"] = batch_determine_average_productivity(
+            results["mean_growth_rate"].tolist(),
+            CALIBRATION_DAYS,
+            percent_usable_for_growth,
+            optimal_growth_rate,
+            harvest_loss,
+        )
+    productive = np.flatnonzero(~np.isnan(results["productivity_day_km2"]))
+    if len(productive) == 0:
+        return results
+    max_area = seaweed_needed / results["productivity_day_km2"][productive]
+    growth = np.repeat(
+        monthly_growth[productive, :months_needed].T, max_growth, axis=0
+    )[:days_to_run]
+    days_to_productivity = np.full(len(productive), np.nan)
+    harvests = np.zeros(len(productive))
+    with phase(report, "simulate"):
+        for current_day, record in iter_batch_seaweed_growth(
+            growth,
+            initial_seaweed=10000,
+            initial_area_built=100,
+            initial_area_used=100,
+            new_module_area_per_day=100,
+            min_density=MIN_DENSITY,
+            max_density=MAX_DENSITY,
+            max_area=max_area,
+            optimal_growth_rate=optimal_growth_rate,
+            harvest_loss=harvest_loss,
+            initial_lag=0,  # 0 because this is taken care of with the logistic growth
+            percent_usable_for_growth=percent_usable_for_growth,
+            days_to_run=days_to_run,
+        ):
+            # The first day a harvest is used for food
+            first_food = ~np.isnan(record[HARVEST_FOR_FOOD]) & np.isnan(days_to_productivity)
+            days_to_productivity[first_food] = current_day
+            harvests += ~np.isnan(record[HARVEST_INTERVALL])
+    # Like add_run_information, the complete area includes the part not used for growth
+    results["max_area"][productive] = max_area / (percent_usable_for_growth / 100)
+    results["days_to_productivity"][productive] = days_to_productivity
+    results["harvests"][productive] = harvests
+    results["area_built"][productive] = record[CURRENT_AREA_BUILT]
+    results["cumulative_harvest_for_food"][productive] = record[CUMULATIVE_HARVEST_FOR_FOOD]
+    results["mean_daily_harvest_for_food"][productive] = (
+        record[CUMULATIVE_HARVEST_FOR_FOOD] / days_to_run
+    )
+    return results
+
+
+def run_grid_model(
+    optimal_growth_rate,
+    days_to_run,
+    global_pop,
+    calories_per_person_per_day,
+    harvest_loss,
+    food_waste,
+    calories_per_t_seaweed_wet,
+    food_limit,
+    feed_limit,
+    biofuel_limit,
+    percent_usable_for_growth,
+    scenarios,
+    location,
+    starting_month=0,
+    max_growth=30,
+    chunk_cells=CHUNK_CELLS,
+    jobs=1,
+    executor=None,
+    growth_data=None,
+    persist=True,
+    report=None,
+):
+    """
+    Runs the model for every grid cell of the growth model with its own
+    growth instead of the median growth of its cluster. Every cell is
+    calibrated and simulated as if it had to produce the seaweed needed on
+    its own, like the clusters in run_model
+    Arguments:
+        optimal_growth_rate (float): the optimal growth rate
+        days_to_run (int): the number of days to run the model
+        global_pop (int): Global population
+        calories_per_person_per_day (int): Calories needed per person per day
+        harvest_loss (float): Fraction of harvest lost
+        food_waste (float): Fraction of food wasted
+        calories_per_t_seaweed_wet (int): Calories per t of seaweed
+        food_limit (float): how large a fraction of the food can be substituted by seaweed
+        feed_limit (float): how large a fraction of the feed can be substituted by seaweed
+        biofuel_limit (float): how large a fraction of the biofuel can be substituted by seaweed
+        percent_usable_for_growth (float): how much of the harvest is usable for growth
+        scenarios (list): list of scenarios to run
+        location (str): location on the globe
+        starting_month (int): the first month of the growth to use
+        max_growth (int): the number of days every month is used for
+        chunk_cells (int): the number of cells simulated at once. The memory
+            needed grows with it
+        jobs (int): number of worker processes the chunks are spread over
+        executor (concurrent.futures.Executor): existing process pool to
+            use instead of starting one with jobs workers
+        growth_data (dict): the output of the growth model by scenario in
+            memory, used instead of reading it (see cell_growth)
+        persist (bool): whether to save the results of every scenario as
+            grid_cell_results.csv in its results
+        report (RunReport): report to add the time of the phases and the
+            counters to
+    Returns:
+        dict: the results of every grid cell by scenario as a dataframe with
+            the GRID_COLUMNS and the index of the output of the growth model,
+            so they can be mapped onto the grid
+    """
+    # Fraction of max calories we want in seaweed
+    seaweed_limit = feed_limit + food_limit + biofuel_limit
+    seaweed_needed = calculate_seaweed_need(
+        global_pop,
+        calories_per_person_per_day,
+        food_waste,
+        calories_per_t_seaweed_wet,
+        seaweed_limit,
+    )
+    arguments = (
+        max_growth,
+        seaweed_needed,
+        harvest_loss,
+        optimal_growth_rate,
+        days_to_run,
+        percent_usable_for_growth,
+    )
+    if executor is None and jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return run_grid_scenarios(
+                scenarios,
+                location,
+                starting_month,
+                chunk_cells,
+                arguments,
+                executor,
+                growth_data,
+                persist,
+                report,
+            )
+    return run_grid_scenarios(
+        scenarios,
+        location,
+        starting_month,
+        chunk_cells,
+        arguments,
+        executor,
+        growth_data,
+        persist,
+        report,
+    )
+
+
+def run_grid_scenarios(
+    scenarios,
+    location,
+    starting_month,
+    chunk_cells,
+    arguments,
+    executor=None,
+    growth_data=None,
+    persist=True,
+    report=None,
+):
+    """
+    Runs the grid cells of all scenarios in chunks, either one chunk after
+    another or on an executor
+    Arguments:
+        scenarios (list): list of scenarios to run
+        location (str): location on the globe
+        starting_month (int): the first month of the growth to use
+        chunk_cells (int): the number of cells simulated at once
+        arguments (tuple): the arguments of simulate_cells after the growth
+        executor (concurrent.futures.Executor): executor to run the chunks on,
+            None to run them one after another
+        growth_data (dict): the output of the growth model by scenario in memory
+        persist (bool): whether to save the results
+        report (RunReport): report to add the phases and counters to
+    Returns:
+        dict: the results of every grid cell by scenario
+    """
+    grid_results = {}
+    for scenario in scenarios:
+        with phase(report, "load"):
+            if growth_data is not None and scenario in growth_data:
+                growth_df = select_months(growth_data[scenario], starting_month)
+            else:
+                growth_df = cell_growth(scenario, location, starting_month)
+        monthly_growth = np.ascontiguousarray(
+            growth_df.drop(columns="cluster").to_numpy(dtype=float)
+        )
+        max_growth, days_to_run = arguments[0], arguments[4]
+        if monthly_growth.shape[1] * max_growth < days_to_run:
+            raise ValueError(
+                "the growth of scenario {} has {} months of {} days from month {} on, "
+                "too short for days_to_run={}".format(
+                    scenario, monthly_growth.shape[1], max_growth, starting_month, days_to_run
+                )
+            )
+        chunks = [
+            monthly_growth[start : start + chunk_cells]
+            for start in range(0, len(monthly_growth), chunk_cells)
+        ]
+        logger.info(
+            "Scenario %s: simulating %s grid cells in %s chunks",
+            scenario,
+            len(monthly_growth),
+            len(chunks),
+        )
+        if executor is None:
+            chunk_results = [simulate_cells(chunk, *arguments, report) for chunk in chunks]
+        else:
+            with phase(report, "simulate"):
+                futures = [executor.submit(simulate_cells, chunk, *arguments) for chunk in chunks]
+                chunk_results = [future.result() for future in futures]
+        cell_results = pd.DataFrame(
+            {
+                column: np.concatenate([chunk[column] for chunk in chunk_results])
+                for column in GRID_COLUMNS[1:]
+            },
+            index=growth_df.index,
+        )
+        cell_results.insert(0, "cluster", growth_df["cluster"].to_numpy())
+        productive = int(cell_results["productivity_day_km2"].notna().sum())
+        logger.info(
+            "Scenario %s: %s of %s grid cells are productive enough for production",
+            scenario,
+            productive,
+            len(cell_results),
+        )
+        if report is not None:
+            report.count("cells_simulated", productive)
+            report.count("days_simulated", arguments[4] * productive)
+        if persist:
+            with phase(report, "write"):
+                cell_results.to_csv(
+                    "results" + os.sep + location + os.sep + scenario + os.sep
+                    + GRID_RESULTS_FILE
+                )
+        grid_results[scenario] = cell_results
+    return grid_results
@@ -0,0 +1,230 @@
+"""
+Loads the growth data prepared for the scale-up model and caches it, so the
+clusters of a scenario do not have to read the same file again
+"""
+import glob
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.growth_timeseries import GrowthTimeseries
+from src.preprocessing import (
+    DAILY_GROWTH_FILE,
+    GROWTH_ARRAY_FILE,
+    GROWTH_SEGMENTS_FILE,
+)
+
+
+class GrowthDataCache:
+    """
+    Keeps the growth timeseries of all clusters of the most recently used
+    scenarios in memory. The growth file of a scenario is only parsed once
+    and every cluster is a view of this single parse. Growth that was prepared
+    in memory can be added, it is used instead of the files and never removed.
+    """
+
+    def __init__(self, max_scenarios=8):
+        """
+        Initialize the cache
+        Arguments:
+            max_scenarios: the maximum number of scenarios kept in memory
+        Returns:
+            None
+        """
+        self.max_scenarios = max_scenarios
+        self.scenarios = OrderedDict()
+        self.prepared = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, cluster):
+        """
+        Looks up the growth timeseries of a cluster and loads the scenario
+        if it is not in memory yet
+        Arguments:
+            path: the path to the scenario
+            cluster: the cluster to use
+        Returns:
+            GrowthTimeseries: the growth timeseries of the cluster
+        """
+        key = os.path.abspath(path)
+        if key in self.prepared:
+            self.hits += 1
+            return self.prepared[key][cluster]
+        if key in self.scenarios:
+            self.scenarios.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.scenarios[key] = load_scenario_growth(path)
+            while len(self.scenarios) > self.max_scenarios:
+                self.scenarios.popitem(last=False)
+        return self.scenarios[key][cluster]
+
+    def add(self, path, growth):
+        """
+        Adds the growth of a scenario prepared in memory
+        Arguments:
+            path: the path the scenario would be read from
+            growth: the growth of the clusters (see scenario_growth_from_memory)
+        Returns:
+            None
+        """
+        self.prepared[os.path.abspath(path)] = scenario_growth_from_memory(growth)
+
+    def clear(self):
+        """
+        Removes all scenarios read from files from memory and resets the counters
+        Arguments:
+            None
+        Returns:
+            None
+        """
+        self.scenarios.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """
+        Summarizes how well the cache worked
+        Arguments:
+            None
+        Returns:
+            dict: number of hits, misses and scenarios in memory
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.scenarios)}
+
+
+def load_cluster_growth(path, cluster):
+    """
+    Loads the growth timeseries of a cluster. Uses the first of these
+    that was prepared:
+        - the binary file of the cluster, which is memory-mapped
+        - the growth segments
+        - the daily growth rate fractions, of which only the column
+          of the cluster is parsed
+    Arguments:
+        path: the path to the scenario
+        cluster: the cluster to use
+    Returns:
+        GrowthTimeseries: the growth timeseries of the cluster
+    """
+    column = "growth_daily_cluster_" + str(cluster)
+    array_path = path + os.sep + GROWTH_ARRAY_FILE.format(cluster)
+    segments_path = path + os.sep + GROWTH_SEGMENTS_FILE
+    if os.path.exists(array_path):
+        return GrowthTimeseries(np.load(array_path, mmap_mode="r"), name=column)
+    if os.path.exists(segments_path):
+        growth_segments = pd.read_csv(segments_path)
+        cluster_segments = growth_segments[growth_segments["cluster"] == cluster]
+        if len(cluster_segments) == 0:
+            raise KeyError(column)
+        return segments_timeseries(cluster_segments, column)
+    growth_timeseries = pd.read_csv(
+        path + os.sep + DAILY_GROWTH_FILE, usecols=[column], dtype=float
+    )
+    return GrowthTimeseries(growth_timeseries[column].to_numpy(), name=column)
+
+
+def load_scenario_growth(path):
+    """
+    Loads the growth timeseries of all clusters of a scenario. Uses the
+    same files as SeaweedScaleUpModel.load_growth_timeseries, but parses
+    them only once for all clusters
+    Arguments:
+        path: the path to the scenario
+    Returns:
+        dict: the GrowthTimeseries of every cluster
+    """
+    array_paths = glob.glob(path + os.sep + GROWTH_ARRAY_FILE.format("*"))
+    if array_paths:
+        scenario_growth = {}
+        for array_path in array_paths:
+            column = os.path.splitext(os.path.basename(array_path))[0]
+            cluster = int(column.replace("growth_daily_cluster_", ""))
+            scenario_growth[cluster] = GrowthTimeseries(
+                np.load(array_path, mmap_mode="r"), name=column
+            )
+        return scenario_growth
+    segments_path = path + os.sep + GROWTH_SEGMENTS_FILE
+    if os.path.exists(segments_path):
+        growth_segments = pd.read_csv(segments_path)
+        return {
+            int(cluster): segments_timeseries(
+                cluster_segments, "growth_daily_cluster_" + str(cluster)
+            )
+            for cluster, cluster_segments in growth_segments.groupby("cluster")
+        }
+    all_clusters_daily = pd.read_csv(path + os.sep + DAILY_GROWTH_FILE, index_col=0)
+    return daily_growth(all_clusters_daily)
+
+
+def daily_growth(all_clusters_daily):
+    """
+    Creates the growth timeseries of all clusters from their daily values
+    Arguments:
+        all_clusters_daily: dataframe with one row per day and one column
+            per cluster, named growth_daily_cluster_ and the cluster
+    Returns:
+        dict: the GrowthTimeseries of every cluster
+    """
+    # One array with a row per cluster, so every cluster is a contiguous view
+    values = np.ascontiguousarray(all_clusters_daily.to_numpy(dtype=float).T)
+    return {
+        int(column.replace("growth_daily_cluster_", "")): GrowthTimeseries(
+            values[index], name=column
+        )
+        for index, column in enumerate(all_clusters_daily.columns)
+    }
+
+
+def scenario_growth_from_memory(growth):
+    """
+    Creates the growth timeseries of all clusters of a scenario from growth
+    prepared in memory, e.g. with the functions of preprocessing.py
+    Arguments:
+        growth: the daily growth as a dataframe with one column per cluster
+            (see preprocessing.monthly_to_daily), the growth segments as a
+            dataframe (see preprocessing.monthly_segments) or a dict with the
+            GrowthTimeseries or the daily values of every cluster
+    Returns:
+        dict: the GrowthTimeseries of every cluster
+    """
+    if isinstance(growth, pd.DataFrame) and "growth_rate" in growth.columns:
+        return {
+            int(cluster): segments_timeseries(
+                cluster_segments, "growth_daily_cluster_" + str(cluster)
+            )
+            for cluster, cluster_segments in growth.groupby("cluster")
+        }
+    if isinstance(growth, pd.DataFrame):
+        return daily_growth(growth)
+    return {
+        int(cluster): values
+        if isinstance(values, GrowthTimeseries)
+        else GrowthTimeseries(
+            np.asarray(values, dtype=float), name="growth_daily_cluster_" + str(cluster)
+        )
+        for cluster, values in growth.items()
+    }
+
+
+def segments_timeseries(cluster_segments, column):
+    """
+    Creates the growth timeseries of a cluster from its segments
+    Arguments:
+        cluster_segments: dataframe with the columns start_day, length and
+            growth_rate of the segments of the cluster
+        column: the name of the timeseries
+    Returns:
+        GrowthTimeseries: the growth timeseries of the cluster
+    """
+    cluster_segments = cluster_segments.sort_values("start_day")
+    lengths = cluster_segments["length"].to_numpy()
+    if np.any(cluster_segments["start_day"].to_numpy() != np.cumsum(lengths) - lengths):
+        raise ValueError("growth segments of {} are not contiguous".format(column))
+    return GrowthTimeseries.from_segments(
+        lengths, cluster_segments["growth_rate"], name=column
+    )
@@ -0,0 +1,148 @@
+"""
+Growth timeseries of a cluster, as used as input for the scale-up model
+"""
+from functools import cached_property
+
+import numpy as np
+
+
+class GrowthTimeseries:
+    """
+    Daily growth rate fractions of a cluster. The values are checked once
+    when the timeseries is created and stored as a read-only float array,
+    so the model does not have to check them again on every run.
+    A timeseries created from segments only expands them to daily values
+    when these are used.
+    """
+
+    def __init__(self, values, name=None):
+        """
+        Initialize the timeseries
+        Arguments:
+            values: the daily growth rate fractions (between 0 and 1)
+            name: optional name of the timeseries, e.g. the column it was read from
+        Returns:
+            None
+        """
+        values = np.ascontiguousarray(values, dtype=float).view()
+        if values.ndim != 1:
+            raise ValueError("growth timeseries must be one-dimensional")
+        check_growth_rate_fractions(values)
+        values.flags.writeable = False
+        self.values = values
+        self.days = len(values)
+        self.name = name
+
+    @classmethod
+    def from_segments(cls, lengths, segment_values, name=None):
+        """
+        Creates a timeseries from segments of days with the same growth rate
+        fraction, e.g. the months of the growth model
+        Arguments:
+            lengths: the number of days of every segment
+            segment_values: the growth rate fraction of every segment
+            name: optional name of the timeseries
+        Returns:
+            GrowthTimeseries
+        """
+        lengths = np.asarray(lengths, dtype=int)
+        segment_values = np.ascontiguousarray(segment_values, dtype=float)
+        if lengths.ndim != 1 or lengths.shape != segment_values.shape:
+            raise ValueError("segments need one length and one value each")
+        if np.any(lengths < 0):
+            raise ValueError("segment lengths must not be negative")
+        check_growth_rate_fractions(segment_values)
+        # Merge neighbouring segments with the same value, as monthly_segments does
+        lengths, segment_values = lengths[lengths > 0], segment_values[lengths > 0]
+        growth_timeseries = cls.__new__(cls)
+        growth_timeseries.days = int(np.sum(lengths))
+        growth_timeseries.name = name
+        growth_timeseries.monthly_segments = []
+        if len(lengths) > 0:
+            first = np.flatnonzero(np.diff(segment_values, prepend=np.nan) != 0)
+            merged_lengths = np.add.reduceat(lengths, first)
+            merged_starts = np.cumsum(merged_lengths) - merged_lengths
+            growth_timeseries.monthly_segments = list(
+                zip(
+                    merged_starts.tolist(),
+                    merged_lengths.tolist(),
+                    segment_values[first].tolist(),
+                )
+            )
+        return growth_timeseries
+
+    def __len__(self):
+        return self.days
+
+    def __getitem__(self, day):
+        return self.values[day]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or np.dtype(dtype) == self.values.dtype:
+            return self.values.copy() if copy else self.values
+        return self.values.astype(dtype)
+
+    def __repr__(self):
+        return "GrowthTimeseries(name={!r}, days={})".format(self.name, len(self))
+
+    @cached_property
+    def values(self):
+        """
+        The daily growth rate fractions, expanded from the segments
+        """
+        lengths = [length for _, length, _ in self.monthly_segments]
+        segment_values = [value for _, _, value in self.monthly_segments]
+        values = np.repeat(np.array(segment_values, dtype=float), lengths)
+        values.flags.writeable = False
+        return values
+
+    @cached_property
+    def mean(self):
+        """
+        The mean growth rate fraction
+        """
+        return float(np.mean(self.values))
+
+    @cached_property
+    def min(self):
+        """
+        The smallest growth rate fraction
+        """
+        return float(np.min(self.values))
+
+    @cached_property
+    def max(self):
+        """
+        The largest growth rate fraction
+        """
+        return float(np.max(self.values))
+
+    @cached_property
+    def monthly_segments(self):
+        """
+        The timeseries as segments of days with the same growth rate fraction.
+        As the monthly growth rates are repeated for every day of the
+        month, these are the months (months with the same value are merged)
+        Returns:
+            list of (start_day, length, value) tuples
+        """
+        if len(self.values) == 0:
+            return []
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(self.values)) + 1))
+        lengths = np.diff(np.append(starts, len(self.values)))
+        return list(zip(starts.tolist(), lengths.tolist(), self.values[starts].tolist()))
+
+
+def check_growth_rate_fractions(values):
+    """
+    Makes sure all growth rate fractions are between 0 and 1
+    Arguments:
+        values: array of growth rate fractions
+    Returns:
+        None
+    """
+    if not np.all((values >= 0) & (values <= 1)):
+        raise ValueError("growth rate fractions must be between 0 and 1")
@@ -0,0 +1,219 @@
+"""
+Instrumentation of the scale-up model. Everything the model reports goes
+through the logging module and is not shown unless logging is enabled.
+A RunReport collects the time spent in the phases of a run (load, calibrate,
+simulate, write and plot), the peak memory and counters like the number of
+days simulated, and saves them as json
+"""
+import contextlib
+import json
+import logging
+import sys
+import time
+import tracemalloc
+
+# Name of the logger all modules of the model log to
+LOGGER_NAME = "src"
+
+
+def enable_logging(level=logging.INFO, stream=None):
+    """
+    Shows the messages of the model, in the same format as the prints
+    they replace
+    Arguments:
+        level: the lowest level to show, logging.DEBUG to also show every harvest
+        stream: the stream to write to, sys.stdout if None
+    Returns:
+        logging.Handler: the handler that was added
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        if getattr(handler, "enabled_by_model", False):
+            logger.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stdout if stream is None else stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler.enabled_by_model = True
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
+
+
+class RecordCollector(logging.Handler):
+    """
+    Keeps the log records of the model, e.g. to pass them from a worker
+    process to the main process
+    """
+
+    def __init__(self):
+        """
+        Initialize the collector
+        Arguments:
+            None
+        Returns:
+            None
+        """
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        """
+        Keeps a record with its message already formatted, so it can be pickled
+        Arguments:
+            record: the log record
+        Returns:
+            None
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        self.records.append(record)
+
+
+@contextlib.contextmanager
+def collect_records(level):
+    """
+    Collects the records the model logs inside the with block instead
+    of showing them
+    Arguments:
+        level: the lowest level to collect
+    Returns:
+        list: the collected records, filled when the block is left
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    collector = RecordCollector()
+    previous_level = logger.level
+    previous_propagate = logger.propagate
+    logger.addHandler(collector)
+    logger.setLevel(level)
+    logger.propagate = False
+    try:
+        yield collector.records
+    finally:
+        logger.removeHandler(collector)
+        logger.setLevel(previous_level)
+        logger.propagate = previous_propagate
+
+
+class RunReport:
+    """
+    Collects how long the phases of a run take, how often they run and
+    counters of the work done. If trace_memory is set, the peak memory
+    allocated during a phase is traced with tracemalloc, which slows
+    the phases down.
+    """
+
+    def __init__(self, trace_memory=False):
+        """
+        Initialize the report
+        Arguments:
+            trace_memory: whether to trace the peak memory
+        Returns:
+            None
+        """
+        self.trace_memory = trace_memory
+        self.phases = {}
+        self.counters = {}
+        self.peak_memory = None
+        self.started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Times the code in the with block as a phase of the run. Phases can
+        be entered several times, the times are added up
+        Arguments:
+            name: the name of the phase
+        Returns:
+            None
+        """
+        # Only the outermost phase starts and stops tracing
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds, calls = self.phases.get(name, (0.0, 0))
+            self.phases[name] = (seconds + time.perf_counter() - start, calls + 1)
+            if tracing:
+                self.peak_memory = max(
+                    self.peak_memory or 0, tracemalloc.get_traced_memory()[1]
+                )
+                tracemalloc.stop()
+
+    def count(self, name, value=1):
+        """
+        Adds to a counter
+        Arguments:
+            name: the name of the counter
+            value: the value to add
+        Returns:
+            None
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, report):
+        """
+        Adds the phases and counters of another report, e.g. of a worker process
+        Arguments:
+            report: a RunReport or a dict created by its to_dict
+        Returns:
+            None
+        """
+        if isinstance(report, RunReport):
+            report = report.to_dict()
+        for name, times in report["phases"].items():
+            seconds, calls = self.phases.get(name, (0.0, 0))
+            self.phases[name] = (seconds + times["seconds"], calls + times["calls"])
+        for name, value in report["counters"].items():
+            self.count(name, value)
+        if report["peak_memory_bytes"] is not None:
+            self.peak_memory = max(self.peak_memory or 0, report["peak_memory_bytes"])
+
+    def to_dict(self):
+        """
+        Converts the report into a dict that can be saved as json
+        Arguments:
+            None
+        Returns:
+            dict: the phases, counters, peak memory and the time since
+                the report was started
+        """
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "phases": {
+                name: {"seconds": seconds, "calls": calls}
+                for name, (seconds, calls) in self.phases.items()
+            },
+            "counters": dict(self.counters),
+            "peak_memory_bytes": self.peak_memory,
+        }
+
+    def save(self, path):
+        """
+        Saves the report as json
+        Arguments:
+            path: the file to save the report in
+        Returns:
+            None
+        """
+        with open(path, "w") as report_file:
+            json.dump(self.to_dict(), report_file, indent=4)
+
+
+@contextlib.contextmanager
+def phase(report, name):
+    """
+    Times the code in the with block if there is a report
+    Arguments:
+        report: the RunReport, None to not time anything
+        name: the name of the phase
+    Returns:
+        None
+    """
+    if report is None:
+        yield
+    else:
+        with report.phase(name):
+            yield
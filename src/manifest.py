@@ -0,0 +1,212 @@
+"""
+Manifests of the results of the scale-up model. Every cluster saves a hash
+of everything its results depend on, so clusters whose inputs did not change
+do not have to be run again and clusters with the same growth as an already
+finished cluster can take over its results
+"""
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from src.scaleup_model import MODEL_VERSION
+
+# Name of the manifest files of a cluster
+MANIFEST_FILE = "manifest_cluster_{}.json"
+
+
+def growth_hash(growth_rate_fraction):
+    """
+    Calculates a hash of a growth rate fraction
+    Arguments:
+        growth_rate_fraction: either a scalar or a timeseries
+    Returns:
+        str: the hash of the growth rate fraction
+    """
+    if np.ndim(growth_rate_fraction) == 0:
+        return repr(float(growth_rate_fraction))
+    return hashlib.sha256(
+        np.ascontiguousarray(growth_rate_fraction, dtype=float).tobytes()
+    ).hexdigest()
+
+
+def input_key(growth_rate_fraction, **parameters):
+    """
+    Calculates a key of the growth, the parameters and the model version
+    Arguments:
+        growth_rate_fraction: the growth rate fraction, either a scalar or
+            a timeseries
+        parameters: all other inputs, as values that can be saved as json
+    Returns:
+        str: the hex digest identifying the inputs
+    """
+    inputs = [MODEL_VERSION, growth_hash(growth_rate_fraction), parameters]
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def output_key(simulation_key, **parameters):
+    """
+    Calculates a key of the inputs of the simulation and of the parameters
+    that only change how the results are saved
+    Arguments:
+        simulation_key (str): the key of the inputs of the simulation
+            (see input_key)
+        parameters: the other inputs, as values that can be saved as json
+    Returns:
+        str: the hex digest identifying the inputs
+    """
+    inputs = [simulation_key, parameters]
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def manifest_path(location, scenario, cluster):
+    """
+    The file the manifest of a cluster is saved in
+    Arguments:
+        location (str): location on the globe
+        scenario (str): the scenario
+        cluster (int): the cluster
+    Returns:
+        str: path of the manifest
+    """
+    return (
+        "results"
+        + os.sep
+        + location
+        + os.sep
+        + scenario
+        + os.sep
+        + MANIFEST_FILE.format(cluster)
+    )
+
+
+def save_manifest(path, key, simulation_key, outputs):
+    """
+    Saves the manifest of a cluster
+    Arguments:
+        path (str): the file to save the manifest in
+        key (str): the key of all inputs of the outputs
+        simulation_key (str): the key of the inputs of the simulation, which
+            other clusters can share
+        outputs (list): the files the results were saved in
+    Returns:
+        None
+    """
+    # Write to a temporary file first, so other processes never
+    # read a half written manifest
+    temporary_path = path + ".{}.tmp".format(os.getpid())
+    with open(temporary_path, "w") as manifest:
+        json.dump(
+            {
+                "model_version": MODEL_VERSION,
+                "key": key,
+                "simulation_key": simulation_key,
+                "outputs": list(outputs),
+            },
+            manifest,
+        )
+    os.replace(temporary_path, path)
+
+
+def load_manifest(path):
+    """
+    Loads a manifest saved with save_manifest
+    Arguments:
+        path (str): the file the manifest is saved in
+    Returns:
+        dict: the manifest, None if there is none
+    """
+    try:
+        with open(path) as manifest:
+            saved = json.load(manifest)
+        if not isinstance(saved, dict):
+            return None
+        return saved
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def outputs_exist(manifest):
+    """
+    Checks if all outputs listed in a manifest are still there
+    Arguments:
+        manifest (dict): the manifest
+    Returns:
+        bool: whether all outputs exist
+    """
+    return all(os.path.exists(path) for path in manifest.get("outputs", []))
+
+
+def unchanged(path, key):
+    """
+    Checks if the results described by a manifest were made with the given
+    inputs and are still there
+    Arguments:
+        path (str): the file the manifest is saved in
+        key (str): the key of the current inputs
+    Returns:
+        bool: whether the results can be reused
+    """
+    manifest = load_manifest(path)
+    return manifest is not None and manifest.get("key") == key and outputs_exist(
+        manifest
+    )
+
+
+class SimulationIndex:
+    """
+    The manifests of all clusters of a location, read once, so looking up a
+    cluster with the same inputs does not read the manifests of all clusters
+    again. Only the manifest of a cluster that is found is read again, in case
+    that cluster was run again since
+    """
+
+    def __init__(self, location):
+        """
+        Reads the manifests of all scenarios of the location
+        Arguments:
+            location (str): location on the globe
+        Returns:
+            None
+        """
+        self.simulation_keys = {}
+        pattern = os.path.join("results", location, "*", MANIFEST_FILE.format("*"))
+        for path in glob.glob(pattern):
+            manifest = load_manifest(path)
+            if manifest is not None:
+                self.simulation_keys[path] = manifest.get("simulation_key")
+
+    def add(self, path, simulation_key):
+        """
+        Adds the manifest of a cluster that was saved after the index was read
+        Arguments:
+            path (str): the file the manifest is saved in
+            simulation_key (str): the key of the inputs of the simulation
+        Returns:
+            None
+        """
+        self.simulation_keys[path] = simulation_key
+
+    def find(self, simulation_key):
+        """
+        Looks for a cluster of any scenario of the location that was simulated
+        with the same inputs
+        Arguments:
+            simulation_key (str): the key of the inputs of the simulation
+        Returns:
+            str: the file with the results of that cluster, None if there is none
+        """
+        for path in sorted(self.simulation_keys):
+            if self.simulation_keys[path] != simulation_key:
+                continue
+            manifest = load_manifest(path)
+            if (
+                manifest is not None
+                and manifest.get("simulation_key") == simulation_key
+                and manifest.get("outputs")
+                and outputs_exist(manifest)
+            ):
+                return manifest["outputs"][0]
+        return None
@@ -0,0 +1,105 @@
+"""
+Metrics of how much of the food demand the seaweed satisfies. They are
+computed for many clusters and scenarios at once on NumPy arrays, from
+results in memory or read from disk, so the plots only have to draw them
+"""
+import numpy as np
+import pandas as pd
+
+# Columns of the results the metrics need
+METRIC_COLUMNS = ["harvest_for_food", "harvest_intervall", "seaweed_needed_per_day"]
+# Days the satisfied need is averaged over
+ROLLING_DAYS = 20
+
+
+def forward_fill(values):
+    """
+    Fills the missing values of every column with the last value before them
+    Arguments:
+        values (np.ndarray): 2D array with one column per series
+    Returns:
+        np.ndarray: the filled array, leading missing values stay missing
+    """
+    rows = np.arange(values.shape[0])[:, None]
+    last_valid = np.where(np.isnan(values), 0, rows)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    return values[last_valid, np.arange(values.shape[1])]
+
+
+def backward_fill(values):
+    """
+    Fills the missing values of every column with the next value after them
+    Arguments:
+        values (np.ndarray): 2D array with one column per series
+    Returns:
+        np.ndarray: the filled array, trailing missing values stay missing
+    """
+    return forward_fill(values[::-1])[::-1]
+
+
+def stack_columns(results, column):
+    """
+    Stacks a column of several results into one array, padding shorter
+    results with missing values at the end. Results without the column,
+    e.g. of clusters that were never harvested, are missing completely
+    Arguments:
+        results (list): the results as DataFrames
+        column (str): the column to stack
+    Returns:
+        np.ndarray: 2D array with one column per result
+    """
+    days = max(len(result) for result in results)
+    stacked = np.full((days, len(results)), np.nan)
+    for position, result in enumerate(results):
+        if column in result:
+            stacked[: len(result), position] = result[column].to_numpy()
+    return stacked
+
+
+def satisfaction_metrics(results, percent_need):
+    """
+    Calculates how much of the food demand is satisfied every day. The mean
+    daily harvest of a day is the last harvest for food, 0 before the first one,
+    divided by the length of the harvest intervall the day belongs to.
+    The satisfied need is averaged over ROLLING_DAYS days.
+    Arguments:
+        results (dict): the results of the model by key, e.g. by cluster or by
+            scenario and cluster, as DataFrames with the METRIC_COLUMNS, like
+            the harvest_df of a cluster in memory or read with read_harvest_df
+        percent_need (float): the percent of the food demand seaweed should cover
+    Returns:
+        pd.DataFrame: the percent of the food demand satisfied every day,
+            one column per key
+        pd.DataFrame: the mean daily harvest for food, one column per key
+    """
+    keys = list(results.keys())
+    if not keys:
+        return pd.DataFrame(), pd.DataFrame()
+    frames = [results[key] for key in keys]
+    lengths = [len(frame) for frame in frames]
+    index = frames[int(np.argmax(lengths))].index
+    harvest_for_food = stack_columns(frames, "harvest_for_food")
+    harvest_intervall = stack_columns(frames, "harvest_intervall")
+    seaweed_need = stack_columns(frames, "seaweed_needed_per_day")
+    # The harvest lasts until the next one, before the first harvest there is none
+    has_harvest = ~np.isnan(harvest_for_food).all(axis=0)
+    harvest_for_food = forward_fill(harvest_for_food)
+    harvest_for_food[:, has_harvest] = np.nan_to_num(harvest_for_food[:, has_harvest])
+    # Every day of an intervall uses the length of the intervall it ends with
+    harvest_intervall = forward_fill(backward_fill(harvest_intervall))
+    seaweed_need = forward_fill(seaweed_need)
+    mean_daily_harvest = harvest_for_food / harvest_intervall
+    daily_need_satisfied = (mean_daily_harvest / seaweed_need) * 100
+    # Padding of shorter results is not part of the metrics
+    for position, length in enumerate(lengths):
+        mean_daily_harvest[length:, position] = np.nan
+        daily_need_satisfied[length:, position] = np.nan
+    daily_need_satisfied = (
+        pd.DataFrame(daily_need_satisfied, index=index).rolling(ROLLING_DAYS).mean()
+    )
+    satisfied_need_df = (daily_need_satisfied / 100) * percent_need
+    satisfied_need_df.columns = pd.Index(keys, tupleize_cols=False)
+    mean_daily_harvest_df = pd.DataFrame(
+        mean_daily_harvest, index=index, columns=pd.Index(keys, tupleize_cols=False)
+    )
+    return satisfied_need_df, mean_daily_harvest_df
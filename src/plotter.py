@@ -1,57 +1,77 @@
+import functools
+import logging
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
 import numpy as np
 import pandas as pd
-from matplotlib.lines import Line2D
 
-from src.scaleup_model import self_shading
+from src.instrumentation import LOGGER_NAME, RunReport, collect_records, phase
+from src.metrics import satisfaction_metrics
+from src.results_store import read_harvest_df
+from src.scaleup_model import RunResults, self_shading
 
-plt.style.use(
-    "https://raw.githubusercontent.com/allfed/ALLFED-matplotlib-style-sheet/main/ALLFED.mplstyle"
-)
+# The ALLFED style sheet, shipped with the model so plotting works offline
+STYLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ALLFED.mplstyle")
+# Environment variable with the path of another style sheet to use instead
+STYLE_VARIABLE = "ALLFED_MPLSTYLE"
+# Backend used unless another one was chosen, so plots can be made without a display
+DEFAULT_BACKEND = "Agg"
+
+# Columns of the results needed for the plots
+PLOT_COLUMNS = [
+    "harvest_for_food",
+    "harvest_intervall",
+    "seaweed_needed_per_day",
+    "max_area",
+]
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def pyplot():
+    """
+    Imports matplotlib when the first plot is made and applies the ALLFED style
+    shipped with the model, or the style sheet at the path in ALLFED_MPLSTYLE.
+    Uses the Agg backend, unless matplotlib was imported before or MPLBACKEND is
+    set, e.g. to show the plots in a notebook
+    Arguments:
+        None
+    Returns:
+        module: matplotlib.pyplot
+    """
+    if "matplotlib" not in sys.modules and "MPLBACKEND" not in os.environ:
+        import matplotlib
+
+        matplotlib.use(DEFAULT_BACKEND)
+    import matplotlib.pyplot as plt
+
+    plt.style.use(os.environ.get(STYLE_VARIABLE, STYLE_FILE))
+    return plt
 
 
 def plot_satisfaction_results(clusters, percent_need, scenario, location):
     """
     Plots the results of the model
     Arguments:
-        cluster_df (pd.DataFrame): The results of the model
+        clusters (dict): The results of the model by cluster, read from disk or
+            in memory
         percent_need (int): The percent of the population that needs to be satisfied
         scenario (str): The scenario name
     Returns:
         None, but plots and saves the results
     """
-    counter = 0
-    satisfied_need_df = pd.DataFrame()
-    # Iterate over all growth rate results and plot them
-    for cluster, cluster_df in clusters.items():
-        food = cluster_df.loc[
-            :, ["harvest_for_food", "harvest_intervall", "seaweed_needed_per_day"]
+    plt = pyplot()
+    satisfied_need, mean_daily_harvest = satisfaction_metrics(clusters, percent_need)
+    columns = {}
+    for cluster in clusters:
+        columns["Cluster " + str(cluster)] = satisfied_need[cluster]
+        columns["Cluster " + str(cluster) + " Mean Harvest Day"] = mean_daily_harvest[
+            cluster
         ]
-        # backfill to calulcate averages
-        food["harvest_for_food"].interpolate(
-            "zero", fill_value=0, limit_direction="backward", inplace=True
-        )
-        food["harvest_intervall"].fillna(method="backfill", inplace=True)
-        food.fillna(method="ffill", inplace=True)
-        # Calculate the food needed
-        food["mean_daily_harvest"] = (
-            food["harvest_for_food"] / food["harvest_intervall"]
-        )
-        food["daily_need"] = food["seaweed_needed_per_day"]
-        food["daily_need_satisfied"] = (
-            food["mean_daily_harvest"] / food["daily_need"]
-        ) * 100
-        daily_need_satisfied = food["daily_need_satisfied"].rolling(20).mean()
-        # Convert back to the 30 % of the need
-        daily_need_satisfied = (daily_need_satisfied / 100) * percent_need
-        satisfied_need_df["Cluster " + str(cluster)] = daily_need_satisfied
-        satisfied_need_df["Cluster " + str(cluster) + " Mean Harvest Day"] = food[
-            "mean_daily_harvest"
-        ]
-        counter += 1
+    satisfied_need_df = pd.DataFrame(columns)
     available_clusters = ["Cluster " + str(i) for i in clusters.keys()]
     # Convert to months
     satisfied_need_df.index = satisfied_need_df.index / 30
@@ -95,15 +115,22 @@ def plot_satisfaction_results(clusters, percent_need, scenario, location):
     plt.close()
 
 
-def plot_scenario_comparison(percent_need, scenario_max_growth_rates_df, location):
+def plot_scenario_comparison(
+    percent_need, scenario_max_growth_rates_df, location, results=None
+):
     """
     Plots the results of the model from all scenarios and compares the
     cluster with the highest growth rate for a given scenario.
     Arguments:
         percent_need (int): The percent of the population that needs to be satisfied
+        results (dict): the results by scenario and cluster in memory,
+            read from disk if None
     Returns:
         None, but plots and saves the results
     """
+    plt = pyplot()
+    from matplotlib.lines import Line2D
+
     # Define the colors starting with #3A913F for the 150 tg scenario
     # and adding 6 very distinct green colors
     colors = {
@@ -116,52 +143,28 @@ def plot_scenario_comparison(percent_need, scenario_max_growth_rates_df, locatio
         "Control": "#95c091",
     }
 
-    # Create a figure to plot in
-    fig, ax = plt.subplots(1, 1)
-    # Iterate over all scenarios
-    for scenario in ["control"] + [str(i) + "tg" for i in [5, 16, 27, 37, 47, 150]]:
-        # Find the cluster with the highest growth rate
+    scenarios = ["control"] + [str(i) + "tg" for i in [5, 16, 27, 37, 47, 150]]
+    # Use the cluster with the highest growth rate of every scenario
+    best_clusters = {}
+    for scenario in scenarios:
         scenario_growth = scenario_max_growth_rates_df[
             scenario_max_growth_rates_df["scenario"] == scenario
         ]
         max_growth_rate_index = scenario_growth["max_growth_rate"].idxmax()
         max_growth_rate_cluster = scenario_growth.loc[max_growth_rate_index, "cluster"]
-        # Read in the results for the cluster with the highest growth rate
-        cluster_df = pd.read_csv(
-            "results"
-            + os.sep
-            + location
-            + os.sep
-            + scenario
-            + os.sep
-            + "harvest_df_cluster_"
-            + str(max_growth_rate_cluster)
-            + ".csv"
-        )
-        # Calculate the food needed
-        food = cluster_df.loc[
-            :, ["harvest_for_food", "harvest_intervall", "seaweed_needed_per_day"]
-        ]
-        # backfill to calulcate averages
-        food["harvest_for_food"].interpolate(
-            "zero", fill_value=0, limit_direction="backward", inplace=True
-        )
-        food["harvest_intervall"].fillna(method="backfill", inplace=True)
-        food.fillna(method="ffill", inplace=True)
-        # Calculate the food needed
-        food["mean_daily_harvest"] = (
-            food["harvest_for_food"] / food["harvest_intervall"]
-        )
-        food["daily_need"] = food["seaweed_needed_per_day"]
-        food["daily_need_satisfied"] = (
-            food["mean_daily_harvest"] / food["daily_need"]
-        ) * 100
-        daily_need_satisfied = food["daily_need_satisfied"].rolling(20).mean()
-        # Convert back to the 30 % of the need
-        daily_need_satisfied = (daily_need_satisfied / 100) * percent_need
-
-        # Convert to months
-        daily_need_satisfied.index = daily_need_satisfied.index / 30
+        if results is not None:
+            best_clusters[scenario] = results[scenario][max_growth_rate_cluster]
+        else:
+            best_clusters[scenario] = read_harvest_df(
+                location, scenario, max_growth_rate_cluster, columns=PLOT_COLUMNS
+            )
+    satisfied_need, _ = satisfaction_metrics(best_clusters, percent_need)
+    # Convert to months
+    satisfied_need.index = satisfied_need.index / 30
+    # Create a figure to plot in
+    fig, ax = plt.subplots(1, 1)
+    for scenario in scenarios:
+        daily_need_satisfied = satisfied_need[scenario]
         # Plot the results
         ax = daily_need_satisfied.plot(color="black", linewidth=2.5, label=None, ax=ax)
         if scenario != "control":
@@ -259,6 +262,9 @@ def plot_area_results(clusters, scenario, location):
     Returns:
         None, but plots and saves the results
     """
+    plt = pyplot()
+    from matplotlib import ticker
+
     areas_dict = {}
     for cluster, cluster_df in clusters.items():
         # Skip emtpy dfs
@@ -297,6 +303,7 @@ def plot_self_shading():
     Returns:
         None
     """
+    plt = pyplot()
     # Create a new figure
     fig, ax = plt.subplots(1, 1)
     # Creates the x-axis
@@ -329,6 +336,10 @@ def create_plots(
     number_of_clusters,
     with_self_shading=False,
     with_comparison=True,
+    report=None,
+    results=None,
+    jobs=1,
+    executor=None,
 ):
     """
     Main function to run the plotter and read the data
@@ -337,48 +348,163 @@ def create_plots(
         consumption_aim (float): The consumption aim in percent
         with_self_shading (bool): Whether to plot the self shading factor
         with_comparison (bool): Whether to plot the scenario comparison
+        report (RunReport): report to add the time of reading and plotting to,
+            e.g. the one of run_model. It is saved as plot_report.json in the
+            results of the location at the end
+        results (dict): the results of the clusters by scenario and cluster
+            in memory instead of reading them from disk, e.g. the RunResults
+            returned by run_model
+        jobs (int): number of worker processes the scenarios and the comparison
+            are plotted in, with the Agg backend. The figures are the same as
+            when they are plotted one after another
+        executor (concurrent.futures.Executor): existing process pool to
+            use instead of starting one with jobs workers
     Returns:
         None
     """
-    # Make the overall comparison plot
-    scenario_max_growth_rates_df = pd.read_csv(
-        "results" + os.sep + location + os.sep + "scenario_max_growth_rates.csv"
-    )
+    plots = []
     if with_comparison:
+        plots.append((plot_comparison, (consumption_aim, location, results)))
+    for scenario in scenarios:
+        clusters = None if results is None else results[scenario]
+        plots.append(
+            (
+                plot_scenario,
+                (location, scenario, consumption_aim, number_of_clusters, clusters),
+            )
+        )
+    if executor is None and jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            run_plots(plots, executor, report)
+    else:
+        run_plots(plots, executor, report)
+    if with_self_shading:
+        with phase(report, "plot"):
+            plot_self_shading()
+    if report is not None:
+        report.save("results" + os.sep + location + os.sep + "plot_report.json")
+
+
+def run_plots(plots, executor=None, report=None):
+    """
+    Makes plots one after another or in parallel on an executor. The log
+    messages of the parallel plots are logged in the same order as when
+    they are made one after another
+    Arguments:
+        plots (list): (function, arguments) of every plot
+        executor (concurrent.futures.Executor): executor to plot on,
+            None to plot one after another
+        report (RunReport): report to add the time of reading and plotting to
+    Returns:
+        None
+    """
+    if executor is None:
+        for function, arguments in plots:
+            function(*arguments, report=report)
+        return
+    log_level = logging.getLogger(LOGGER_NAME).getEffectiveLevel()
+    futures = [
+        executor.submit(plot_captured, function, arguments, log_level, report is not None)
+        for function, arguments in plots
+    ]
+    for future in futures:
+        records, plot_report = future.result()
+        for record in records:
+            logging.getLogger(record.name).handle(record)
+        if report is not None:
+            report.merge(plot_report)
+
+
+def plot_captured(function, arguments, log_level=logging.WARNING, with_report=False):
+    """
+    Makes a plot in a worker process with the Agg backend and collects
+    everything it logs, so the messages of parallel plots do not get mixed up
+    Arguments:
+        function: the plot function, plot_comparison or plot_scenario
+        arguments (tuple): the arguments of the function
+        log_level: the lowest level of the messages to collect
+        with_report: whether to collect the time of reading and plotting
+    Returns:
+        tuple: the collected log records and the report of the plot as
+            a dict (None if with_report is False)
+    """
+    import matplotlib
+
+    matplotlib.use(DEFAULT_BACKEND)
+    report = RunReport() if with_report else None
+    with collect_records(log_level) as records:
+        function(*arguments, report=report)
+    return records, None if report is None else report.to_dict()
+
+
+def plot_comparison(consumption_aim, location, results=None, report=None):
+    """
+    Reads the growth rates of the clusters and plots the scenario comparison
+    Arguments:
+        consumption_aim (float): The consumption aim in percent
+        location (str): The location to plot
+        results (dict): the results by scenario and cluster in memory,
+            read from disk if None. The growth rates are taken from RunResults
+        report (RunReport): report to add the time of plotting to
+    Returns:
+        None
+    """
+    if isinstance(results, RunResults):
+        scenario_max_growth_rates_df = results.scenario_max_growth_rates
+    else:
+        scenario_max_growth_rates_df = pd.read_csv(
+            "results" + os.sep + location + os.sep + "scenario_max_growth_rates.csv"
+        )
+    with phase(report, "plot"):
         plot_scenario_comparison(
-            consumption_aim, scenario_max_growth_rates_df, location
+            consumption_aim, scenario_max_growth_rates_df, location, results
         )
-    # Plot the results for all scenarios
-    for scenario in scenarios:
-        print("Plotting results for scenario " + scenario)
-        clusters = {}
-        for cluster in range(number_of_clusters + 1):
-            try:
-                clusters[cluster] = pd.read_csv(
-                    "results"
-                    + os.sep
-                    + location
-                    + os.sep
-                    + scenario
-                    + os.sep
-                    + "harvest_df_cluster_"
-                    + str(cluster)
-                    + ".csv"
-                )
-                print(
-                    "Reading in results for cluster "
-                    + str(cluster)
-                    + " in scenario "
-                    + scenario
-                )
-            except FileNotFoundError:
-                print(
-                    "No results for cluster "
-                    + str(cluster)
-                    + " in scenario "
-                    + scenario
-                )
+
+
+def plot_scenario(
+    location, scenario, consumption_aim, number_of_clusters, clusters=None, report=None
+):
+    """
+    Reads the results of a scenario and plots its area and satisfaction
+    Arguments:
+        location (str): The location to plot
+        scenario (str): The scenario
+        consumption_aim (float): The consumption aim in percent
+        number_of_clusters (int): The number of clusters
+        clusters (dict): the results by cluster in memory, read from disk if None
+        report (RunReport): report to add the time of reading and plotting to
+    Returns:
+        None
+    """
+    logger.info("Plotting results for scenario %s", scenario)
+    if clusters is None:
+        clusters = read_clusters(location, scenario, number_of_clusters, report)
+    with phase(report, "plot"):
         plot_area_results(clusters, scenario, location)
         plot_satisfaction_results(clusters, consumption_aim, scenario, location)
-    if with_self_shading:
-        plot_self_shading()
+
+
+def read_clusters(location, scenario, number_of_clusters, report=None):
+    """
+    Reads the results of the clusters of a scenario that have results
+    Arguments:
+        location (str): The location to plot
+        scenario (str): The scenario
+        number_of_clusters (int): The number of clusters
+        report (RunReport): report to add the time of reading to
+    Returns:
+        dict: the results by cluster
+    """
+    clusters = {}
+    for cluster in range(number_of_clusters + 1):
+        try:
+            with phase(report, "load"):
+                clusters[cluster] = read_harvest_df(
+                    location, scenario, cluster, columns=PLOT_COLUMNS
+                )
+            logger.info(
+                "Reading in results for cluster %s in scenario %s", cluster, scenario
+            )
+        except FileNotFoundError:
+            logger.info("No results for cluster %s in scenario %s", cluster, scenario)
+    return clusters
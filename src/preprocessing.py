@@ -1,65 +1,510 @@
 """
 Prepares the output of the growth model to be used in the upscaling model
+
+Usage:
+    python -m src.preprocessing [--scenarios 150tg ...] [--locations AUS ...]
+        [--clusters N] [--jobs N] [--no-daily-csv] [--block-months N]
 """
+import argparse
+import glob
+import json
+import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
 
+from src.growth_timeseries import GrowthTimeseries
+
+
+# File with the daily growth rate fractions of all clusters (one column per cluster)
+DAILY_GROWTH_FILE = "actual_growth_rate_by_cluster.csv"
+# File with the growth rate fractions of all clusters as segments of days
+# with the same growth rate fraction (one row per cluster and month)
+GROWTH_SEGMENTS_FILE = "growth_segments_by_cluster.csv"
+# Binary file with the daily growth rate fractions of a single cluster,
+# which can be memory-mapped
+GROWTH_ARRAY_FILE = "growth_daily_cluster_{}.npy"
+# Name of the output of the growth model, without the file extension
+GROWTH_MODEL_FILE = "seaweed_growth_rate_clustered_{}"
+# Extension of the output of the growth model in the columnar format
+COLUMNAR_EXTENSION = ".npz"
+# Keys of the arrays of the columnar format
+MONTH_KEY = "month_{}"
+MONTHS_KEY = "__months__"
+CLUSTER_KEY = "cluster"
+# Keys of the levels of the index of the grid cells and of their names
+INDEX_KEY = "__index_{}__"
+INDEX_NAMES_KEY = "__index_names__"
+# Number of months read at once from the columnar format
+BLOCK_MONTHS = 12
+
+logger = logging.getLogger(__name__)
 
-def prep_data(scenario, location, num_clusters, starting_month=0, max_growth=30):
+
+def prep_data(
+    scenario,
+    location,
+    num_clusters,
+    starting_month=0,
+    max_growth=30,
+    daily_csv=True,
+    daily_arrays=True,
+    block_months=BLOCK_MONTHS,
+):
     """
     Changes the data from the growth model, so that it is a
     single time series for all the clusters.
 
     The data at this point is still in fraction of maximum growth rate and not in % per day
 
+    If the output of the growth model was converted to the columnar format
+    (see write_columnar_growth), it is read in blocks of months, so the memory
+    needed does not depend on the number of months.
+
     Arguments:
-        path (str): path to the data
+        scenario (str): the scenario to prepare
+        location (str): location on the globe
+        num_clusters (int): number of clusters
+        starting_month (int): the first month to use
+        max_growth (int): the number of days every month is used for
+        daily_csv (bool): whether to also write the growth rate fraction of every
+            day, as used by older versions of the model. Otherwise an existing
+            daily csv is removed
+        daily_arrays (bool): whether to also write the growth rate fraction of every
+            day as a binary file per cluster. Otherwise existing binary files
+            are removed
+        block_months (int): the number of months read at once from the
+            columnar format
     Returns:
-        None, only writes to a csv
+        None, only writes to files
+    """
+    path = "data" + os.sep + location + os.sep + scenario
+    columnar_path = growth_model_path(scenario, location, COLUMNAR_EXTENSION)
+    if os.path.exists(columnar_path):
+        monthly_growth = columnar_cluster_medians(
+            columnar_path, num_clusters, starting_month, block_months
+        )
+    else:
+        growth_df = pd.read_pickle(growth_model_path(scenario, location))
+        monthly_growth = cluster_medians(growth_df, num_clusters, starting_month)
+    monthly_segments(monthly_growth, max_growth).to_csv(
+        path + os.sep + GROWTH_SEGMENTS_FILE, index=False
+    )
+    if daily_csv or daily_arrays:
+        all_clusters_daily = monthly_to_daily(monthly_growth, max_growth)
+    # Files of an earlier preparation that are not written again are removed,
+    # as the model would otherwise prefer the old daily arrays
+    if daily_csv:
+        all_clusters_daily.to_csv(path + os.sep + DAILY_GROWTH_FILE)
+    elif os.path.exists(path + os.sep + DAILY_GROWTH_FILE):
+        os.remove(path + os.sep + DAILY_GROWTH_FILE)
+    if daily_arrays:
+        write_growth_arrays(path, all_clusters_daily)
+    else:
+        remove_growth_arrays(path)
+
+
+def growth_model_path(scenario, location, extension=".pkl"):
+    """
+    Path of the output of the growth model for a scenario
+    Arguments:
+        scenario (str): the scenario
+        location (str): location on the globe
+        extension (str): ".pkl" for the pickle of the growth model or
+            COLUMNAR_EXTENSION for the columnar format
+    Returns:
+        str: the path of the file with the growth of every grid cell
+    """
+    return (
+        "data" + os.sep + location + os.sep + scenario + os.sep
+        + GROWTH_MODEL_FILE.format(location) + extension
+    )
+
+
+def growth_model_exists(scenario, location):
+    """
+    Checks if there is output of the growth model for a scenario
+    Arguments:
+        scenario (str): the scenario
+        location (str): location on the globe
+    Returns:
+        bool: whether the pickle or the columnar format exists
+    """
+    return any(
+        os.path.exists(growth_model_path(scenario, location, extension))
+        for extension in [".pkl", COLUMNAR_EXTENSION]
+    )
+
+
+def write_columnar_growth(growth_df, path, compress=False):
+    """
+    Saves the output of the growth model in the columnar format, a npz
+    file with one array per month, so the months can be read in blocks.
+    Every level of the index of the grid cells, e.g. latitude and longitude,
+    is saved as an array as well, with the names of the levels
+    Arguments:
+        growth_df (pd.DataFrame): the output of the growth model, one row per
+            grid cell with the growth of every month and its cluster
+        path (str): the file to save it in
+        compress (bool): whether to compress the file. The growth hardly
+            compresses and reading compressed months is about three times slower
+    Returns:
+        None
+    """
+    months = [month for month in growth_df.columns if month != "cluster"]
+    arrays = {MONTH_KEY.format(month): growth_df[month].to_numpy() for month in months}
+    arrays[CLUSTER_KEY] = growth_df["cluster"].to_numpy()
+    arrays[MONTHS_KEY] = np.array(months)
+    for level in range(growth_df.index.nlevels):
+        values = growth_df.index.get_level_values(level).to_numpy()
+        # Object arrays could only be read back with pickle
+        if values.dtype == object:
+            values = values.astype(str)
+        arrays[INDEX_KEY.format(level)] = values
+    arrays[INDEX_NAMES_KEY] = np.array(json.dumps(list(growth_df.index.names)))
+    with open(path, "wb") as columnar_file:
+        if compress:
+            np.savez_compressed(columnar_file, **arrays)
+        else:
+            np.savez(columnar_file, **arrays)
+
+
+def columnar_index(columnar_file):
+    """
+    Rebuilds the index of the grid cells saved in the columnar format
+    Arguments:
+        columnar_file (np.lib.npyio.NpzFile): the opened file in the columnar format
+    Returns:
+        pd.Index: the index of the output of the growth model, a RangeIndex
+            for files saved without it
+    """
+    if INDEX_NAMES_KEY not in columnar_file.files:
+        return pd.RangeIndex(len(columnar_file[CLUSTER_KEY]))
+    names = json.loads(str(columnar_file[INDEX_NAMES_KEY]))
+    levels = [columnar_file[INDEX_KEY.format(level)] for level in range(len(names))]
+    if len(levels) == 1:
+        return pd.Index(levels[0], name=names[0])
+    return pd.MultiIndex.from_arrays(levels, names=names)
+
+
+def convert_growth_model_output(scenario, location):
+    """
+    Converts the pickle of the growth model of a scenario to the columnar
+    format, which prep_data then prefers. The pickle is read completely once
+    Arguments:
+        scenario (str): the scenario
+        location (str): location on the globe
+    Returns:
+        None
     """
-    growth_df = pd.read_pickle(
-        "data"
-        + os.sep
-        + location
-        + os.sep
-        + scenario
-        + os.sep
-        + "seaweed_growth_rate_clustered_"
-        + location
-        + ".pkl"
+    write_columnar_growth(
+        pd.read_pickle(growth_model_path(scenario, location)),
+        growth_model_path(scenario, location, COLUMNAR_EXTENSION),
     )
+
+
+def columnar_cluster_medians(path, num_clusters, starting_month=0, block_months=BLOCK_MONTHS):
+    """
+    Calculates the median growth of all clusters and months from the columnar
+    format. Only block_months months are in memory at once and the months
+    before starting_month are not read at all. The medians are the same as
+    the ones of cluster_medians
+    Arguments:
+        path (str): the file in the columnar format
+        num_clusters (int): number of clusters
+        starting_month (int): the first month to use
+        block_months (int): the number of months read at once
+    Returns:
+        pd.DataFrame: one row per cluster (starting at 0) and one column
+            per month, sorted by month
+    """
+    with np.load(path) as columnar_file:
+        clusters = columnar_file[CLUSTER_KEY]
+        months = np.sort(columnar_file[MONTHS_KEY])
+        months = months[months >= starting_month]
+        blocks = []
+        for start in range(0, len(months), block_months):
+            block = months[start : start + block_months]
+            growth_block = pd.DataFrame(
+                {month: columnar_file[MONTH_KEY.format(month)] for month in block}
+            )
+            blocks.append(growth_block.groupby(clusters).median())
+    median_growth_cluster = pd.concat(blocks, axis=1)
+    median_growth_cluster.columns = months.tolist()
+    median_growth_cluster.index.name = "cluster"
+    return median_growth_cluster.loc[list(range(num_clusters))]
+
+
+def cluster_medians(growth_df, num_clusters, starting_month=0):
+    """
+    Calculates the median growth of all clusters and months in one go
+    Arguments:
+        growth_df (pd.DataFrame): the output of the growth model, one row per
+            grid cell with the growth of every month and its cluster
+        num_clusters (int): number of clusters
+        starting_month (int): the first month to use
+    Returns:
+        pd.DataFrame: one row per cluster (starting at 0) and one column
+            per month, sorted by month
+    """
     median_growth_cluster = growth_df.groupby("cluster").median()
-    clusters = []
-    for cluster in range(num_clusters):
-        cluster_df = pd.DataFrame(median_growth_cluster.loc[cluster, :])
-        cluster_df.columns = ["growth_rate_month"]
-        cluster_df["month"] = cluster_df.index
-        # Only use the months after the nuclear war started
-        cluster_df = cluster_df[cluster_df["month"] >= starting_month]
-        cluster_df_daily = (
-            pd.concat([cluster_df] * max_growth)
-            .assign(growth_rate_daily=lambda x: x["growth_rate_month"])
-            .sort_values("month")
+    # Only use the months after the nuclear war started
+    months = median_growth_cluster.columns
+    months = months[months >= starting_month].sort_values()
+    return median_growth_cluster.loc[list(range(num_clusters)), months]
+
+
+def monthly_segments(monthly_growth, max_growth):
+    """
+    Converts the monthly growth of the clusters to segments, every month is a
+    segment of max_growth days
+    Arguments:
+        monthly_growth (pd.DataFrame): one row per cluster (starting at 0)
+            and one column per month
+        max_growth (int): the number of days every month is used for
+    Returns:
+        pd.DataFrame: the segments of all clusters with the columns
+            cluster, start_day, length and growth_rate
+    """
+    clusters, months = monthly_growth.shape
+    return pd.DataFrame(
+        {
+            "cluster": np.repeat(monthly_growth.index.to_numpy() + 1, months),
+            "start_day": np.tile(np.arange(months) * max_growth, clusters),
+            "length": max_growth,
+            "growth_rate": monthly_growth.to_numpy().ravel(),
+        }
+    )
+
+
+def monthly_to_daily(monthly_growth, max_growth):
+    """
+    Expands the monthly growth of the clusters to the growth rate fraction
+    of every day with a single repeat
+    Arguments:
+        monthly_growth (pd.DataFrame): one row per cluster (starting at 0)
+            and one column per month
+        max_growth (int): the number of days every month is used for
+    Returns:
+        pd.DataFrame: one row per day and one column per cluster
+    """
+    return pd.DataFrame(
+        np.repeat(monthly_growth.to_numpy(), max_growth, axis=1).T,
+        columns=[
+            "growth_daily_cluster_" + str(cluster + 1) for cluster in monthly_growth.index
+        ],
+    )
+
+
+def prep_scenarios(scenarios, locations, num_clusters, jobs=1, executor=None, **kwargs):
+    """
+    Prepares the growth data of several scenarios and locations. Scenarios
+    without output of the growth model for a location are skipped
+    Arguments:
+        scenarios (list): the scenarios to prepare
+        locations (list): the locations on the globe
+        num_clusters (int or dict): number of clusters, or the number of
+            clusters by location
+        jobs (int): number of worker processes the scenarios are prepared in
+        executor (concurrent.futures.Executor): existing process pool to
+            use instead of starting one with jobs workers
+        kwargs: further arguments of prep_data
+    Returns:
+        list: (scenario, location) of every prepared scenario
+    """
+    prepared = []
+    for location in locations:
+        for scenario in scenarios:
+            if growth_model_exists(scenario, location):
+                prepared.append((scenario, location))
+            else:
+                logger.warning(
+                    "No output of the growth model for scenario %s in %s, skipping it",
+                    scenario,
+                    location,
+                )
+    runs = [
+        (
+            scenario,
+            location,
+            num_clusters[location] if isinstance(num_clusters, dict) else num_clusters,
         )
-        cluster_df_daily.reset_index(inplace=True, drop=True)
-        cluster_df_daily = cluster_df_daily["growth_rate_daily"]
-        clusters.append(cluster_df_daily)
-    all_clusters_daily = pd.concat(clusters, axis=1)
-    all_clusters_daily.columns = [
-        "growth_daily_cluster_" + str(cluster + 1)
-        for cluster in median_growth_cluster.index
+        for scenario, location in prepared
     ]
-    all_clusters_daily.to_csv(
-        "data"
-        + os.sep
-        + location
-        + os.sep
-        + scenario
-        + os.sep
-        + "actual_growth_rate_by_cluster.csv"
+    if executor is None and jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            prep_runs(runs, executor, kwargs)
+    else:
+        prep_runs(runs, executor, kwargs)
+    return prepared
+
+
+def prep_runs(runs, executor, kwargs):
+    """
+    Runs prep_data one after another or in parallel on an executor
+    Arguments:
+        runs (list): (scenario, location, number of clusters) of every run
+        executor (concurrent.futures.Executor): executor to run on,
+            None to run one after another
+        kwargs: further arguments of prep_data
+    Returns:
+        None
+    """
+    if executor is None:
+        for run in runs:
+            prep_data(*run, **kwargs)
+        return
+    futures = [executor.submit(prep_data, *run, **kwargs) for run in runs]
+    for (scenario, location, _), future in zip(runs, futures):
+        future.result()
+        logger.info("Prepared scenario %s in %s", scenario, location)
+
+
+def segments_to_daily(growth_segments):
+    """
+    Expands the growth segments to the growth rate fraction of every day
+    Arguments:
+        growth_segments (pd.DataFrame): the segments of all clusters with the columns
+            cluster, start_day, length and growth_rate
+    Returns:
+        pd.DataFrame: one row per day and one column per cluster
+    """
+    all_clusters_daily = {}
+    for cluster, cluster_segments in growth_segments.groupby("cluster", sort=True):
+        cluster_segments = cluster_segments.sort_values("start_day")
+        all_clusters_daily["growth_daily_cluster_" + str(cluster)] = np.repeat(
+            cluster_segments["growth_rate"].to_numpy(),
+            cluster_segments["length"].to_numpy(),
+        )
+    return pd.DataFrame(all_clusters_daily)
+
+
+def daily_to_segments(all_clusters_daily):
+    """
+    Compresses the growth rate fraction of every day to segments of days
+    with the same growth rate fraction
+    Arguments:
+        all_clusters_daily (pd.DataFrame): one row per day and one column per cluster
+    Returns:
+        pd.DataFrame: the segments of all clusters with the columns
+            cluster, start_day, length and growth_rate
+    """
+    segments = []
+    for column in all_clusters_daily.columns:
+        cluster = int(column.replace("growth_daily_cluster_", ""))
+        growth_timeseries = GrowthTimeseries(
+            all_clusters_daily[column].to_numpy(), name=column
+        )
+        cluster_segments = pd.DataFrame(
+            growth_timeseries.monthly_segments,
+            columns=["start_day", "length", "growth_rate"],
+        )
+        cluster_segments.insert(0, "cluster", cluster)
+        segments.append(cluster_segments)
+    return pd.concat(segments, ignore_index=True)
+
+
+def write_growth_segments(path):
+    """
+    Writes the segments of a scenario that was only prepared as daily
+    growth rate fractions
+    Arguments:
+        path (str): path to the scenario
+    Returns:
+        None, only writes to a csv
+    """
+    all_clusters_daily = pd.read_csv(path + os.sep + DAILY_GROWTH_FILE, index_col=0)
+    daily_to_segments(all_clusters_daily).to_csv(
+        path + os.sep + GROWTH_SEGMENTS_FILE, index=False
+    )
+
+
+def write_growth_arrays(path, all_clusters_daily=None):
+    """
+    Writes the daily growth rate fractions of every cluster into its own
+    binary file, so the model can load a single cluster without parsing
+    the others
+    Arguments:
+        path (str): path to the scenario
+        all_clusters_daily (pd.DataFrame): one row per day and one column per
+            cluster, None to read them from the prepared csv files
+    Returns:
+        None, only writes to npy files
+    """
+    if all_clusters_daily is None:
+        if os.path.exists(path + os.sep + GROWTH_SEGMENTS_FILE):
+            all_clusters_daily = segments_to_daily(
+                pd.read_csv(path + os.sep + GROWTH_SEGMENTS_FILE)
+            )
+        else:
+            all_clusters_daily = pd.read_csv(
+                path + os.sep + DAILY_GROWTH_FILE, index_col=0
+            )
+    # Clusters that no longer exist must not be loaded
+    remove_growth_arrays(path)
+    for column in all_clusters_daily.columns:
+        cluster = int(column.replace("growth_daily_cluster_", ""))
+        np.save(
+            path + os.sep + GROWTH_ARRAY_FILE.format(cluster),
+            all_clusters_daily[column].to_numpy(dtype=float),
+        )
+
+
+def remove_growth_arrays(path):
+    """
+    Removes the binary files with the daily growth rate fractions of all
+    clusters of a scenario
+    Arguments:
+        path (str): path to the scenario
+    Returns:
+        None
+    """
+    for array_path in glob.glob(path + os.sep + GROWTH_ARRAY_FILE.format("*")):
+        os.remove(array_path)
+
+
+def main(arguments=None):
+    """
+    Prepares scenarios from the command line
+    Arguments:
+        arguments (list): the command line arguments, sys.argv if None
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        description="Prepares the output of the growth model for the upscaling model"
+    )
+    parser.add_argument("--scenarios", nargs="+", default=["150tg"])
+    parser.add_argument("--locations", nargs="+", default=["AUS"])
+    parser.add_argument("--clusters", type=int, default=2, help="number of clusters")
+    parser.add_argument("--starting-month", type=int, default=0)
+    parser.add_argument("--max-growth", type=int, default=30)
+    parser.add_argument("--jobs", type=int, default=1, help="number of worker processes")
+    parser.add_argument(
+        "--block-months",
+        type=int,
+        default=BLOCK_MONTHS,
+        help="number of months read at once from the columnar format",
+    )
+    parser.add_argument(
+        "--no-daily-csv",
+        action="store_true",
+        help="do not write the daily csv, which only older versions of the model read",
+    )
+    arguments = parser.parse_args(arguments)
+    prep_scenarios(
+        arguments.scenarios,
+        arguments.locations,
+        arguments.clusters,
+        jobs=arguments.jobs,
+        starting_month=arguments.starting_month,
+        max_growth=arguments.max_growth,
+        daily_csv=not arguments.no_daily_csv,
+        block_months=arguments.block_months,
     )
 
 
 if __name__ == "__main__":
-    prep_data("150tg", "AUS", 2)
+    main()
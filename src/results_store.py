@@ -0,0 +1,121 @@
+"""
+Binary store for the results of the scale-up model. Every cluster of every
+scenario of a location is saved as a compressed npz file, which can be read
+again column by column
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Name of the result files of a cluster, without the file extension
+RESULTS_FILE = "harvest_df_cluster_{}"
+# Key of the column names in the npz files
+COLUMNS_KEY = "__columns__"
+# Key of the index in the npz files
+INDEX_KEY = "__index__"
+
+
+def results_path(location, scenario, cluster, extension=".npz"):
+    """
+    The file the results of a cluster are saved in
+    Arguments:
+        location (str): location on the globe
+        scenario (str): the scenario
+        cluster (int): the cluster
+        extension (str): ".npz" for the binary store or ".csv" for the csv export
+    Returns:
+        str: path of the results
+    """
+    return (
+        "results"
+        + os.sep
+        + location
+        + os.sep
+        + scenario
+        + os.sep
+        + RESULTS_FILE.format(cluster)
+        + extension
+    )
+
+
+def save_results(harvest_df, path, dtype="float64", compress=True):
+    """
+    Saves a dataframe of results into a npz file with one array per column
+    Arguments:
+        harvest_df (pd.DataFrame): the results
+        path (str): the file to save the results in
+        dtype (str): the type to store the floating point columns as, e.g.
+            "float32" to halve the size
+        compress (bool): whether to compress the file
+    Returns:
+        None
+    """
+    arrays = {}
+    for column in harvest_df.columns:
+        values = harvest_df[column].to_numpy()
+        if np.issubdtype(values.dtype, np.floating):
+            values = values.astype(dtype)
+        arrays[column] = values
+    arrays[COLUMNS_KEY] = np.array(harvest_df.columns, dtype=str)
+    arrays[INDEX_KEY] = harvest_df.index.to_numpy()
+    with open(path, "wb") as results_file:
+        if compress:
+            np.savez_compressed(results_file, **arrays)
+        else:
+            np.savez(results_file, **arrays)
+
+
+def load_results(path, columns=None):
+    """
+    Loads results saved with save_results. Only the requested columns are read
+    Arguments:
+        path (str): the file the results are saved in
+        columns (list): the columns to load, None to load all columns
+    Returns:
+        pd.DataFrame: the results
+    """
+    with np.load(path) as results_file:
+        stored_columns = results_file[COLUMNS_KEY].tolist()
+        if columns is None:
+            columns = stored_columns
+        else:
+            missing_columns = [
+                column for column in columns if column not in stored_columns
+            ]
+            if missing_columns:
+                raise KeyError(missing_columns)
+        index = results_file[INDEX_KEY]
+        if np.array_equal(index, np.arange(len(index))):
+            index = pd.RangeIndex(len(index))
+        return pd.DataFrame(
+            {column: results_file[column] for column in columns},
+            index=index,
+            columns=columns,
+        )
+
+
+def read_harvest_df(location, scenario, cluster, columns=None):
+    """
+    Reads the results of a cluster from the binary store or, if the results
+    were only exported as csv, from the csv file
+    Arguments:
+        location (str): location on the globe
+        scenario (str): the scenario
+        cluster (int): the cluster
+        columns (list): the columns to read, None to read all columns
+    Returns:
+        pd.DataFrame: the results of the cluster
+    """
+    path = results_path(location, scenario, cluster)
+    if os.path.exists(path):
+        return load_results(path, columns)
+    path = results_path(location, scenario, cluster, extension=".csv")
+    if columns is None:
+        return pd.read_csv(path, index_col=0)
+    # The first column is the index
+    index_column = pd.read_csv(path, nrows=0).columns[0]
+    harvest_df = pd.read_csv(
+        path, index_col=0, usecols=[index_column] + list(columns)
+    )
+    return harvest_df[list(columns)]
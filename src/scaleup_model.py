@@ -1,19 +1,103 @@
 """
 Model to calculate the time it takes to scale-up global seaweed production
 """
+import contextlib
+import hashlib
+import logging
 import math
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
 
+from src.growth_data import GrowthDataCache, load_cluster_growth
+from src.growth_timeseries import GrowthTimeseries
+from src.instrumentation import LOGGER_NAME, RunReport, collect_records, phase
+from src.results_store import load_results, results_path, save_results
+
+# Density of the seaweed left in the field after a harvest in t/km²
+MIN_DENSITY = 1200
+# Density at which the seaweed is harvested in t/km²
+MAX_DENSITY = 3600
+# Days to run the calibration of the productivity
+# (has to be longer than time needed to saturate farms)
+CALIBRATION_DAYS = 500
+# Modules the results of the model are calculated in
+MODEL_MODULES = ("scaleup_model.py", "batch_model.py", "event_model.py")
+
+
+def model_version(directory=os.path.dirname(os.path.abspath(__file__))):
+    """
+    Calculates the version of the model calculations from the source code
+    of the MODEL_MODULES, so it changes with every change of the model
+    Arguments:
+        directory (str): the directory of the modules
+    Returns:
+        str: the hex digest of the source code
+    """
+    digest = hashlib.sha256()
+    for module in MODEL_MODULES:
+        with open(os.path.join(directory, module), "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+# Version of the model calculations. Cached results of other versions are not reused
+MODEL_VERSION = model_version()
+
+# Columns of the dataframe created by SeaweedScaleUpModel.seaweed_growth
+# in the order in which they are calculated during a simulated day
+HARVEST_DF_COLUMNS = (
+    "new_module_area_per_day",
+    "actual_growth_rate_multiplicator",
+    "harvest_intervall",
+    "seaweed_remaining_to_grow",
+    "harvest_wet",
+    "harvest_wet_with_loss",
+    "harvest_for_food",
+    "new_area_used",
+    "current_seaweed_need",
+    "current_area_built",
+    "current_area_used",
+    "current_seaweed",
+    "current_density",
+    "cumulative_harvest_for_food",
+)
+(
+    NEW_MODULE_AREA,
+    GROWTH_RATE_MULTIPLICATOR,
+    HARVEST_INTERVALL,
+    SEAWEED_REMAINING_TO_GROW,
+    HARVEST_WET,
+    HARVEST_WET_WITH_LOSS,
+    HARVEST_FOR_FOOD,
+    NEW_AREA_USED,
+    CURRENT_SEAWEED_NEED,
+    CURRENT_AREA_BUILT,
+    CURRENT_AREA_USED,
+    CURRENT_SEAWEED,
+    CURRENT_DENSITY,
+    CUMULATIVE_HARVEST_FOR_FOOD,
+) = range(len(HARVEST_DF_COLUMNS))
+# Columns that are only written on harvest days
+HARVEST_ONLY_COLUMNS = HARVEST_DF_COLUMNS[HARVEST_INTERVALL:CURRENT_SEAWEED_NEED]
+# Columns that are written every day
+DAILY_STATE_COLUMNS = (
+    HARVEST_DF_COLUMNS[:HARVEST_INTERVALL] + HARVEST_DF_COLUMNS[CURRENT_SEAWEED_NEED:]
+)
+
+logger = logging.getLogger(__name__)
+
 
 class SeaweedScaleUpModel:
     """
     Class that loads the data, calculates the scaleup and saves it into a csv
     """
 
-    def __init__(self, path, cluster, seaweed_need, harvest_loss):
+    def __init__(
+        self, path, cluster, seaweed_need, harvest_loss, growth_data_cache=None
+    ):
         """
         Initialize the model
         Arguments:
@@ -21,28 +105,30 @@ class SeaweedScaleUpModel:
             cluster: the cluster to use
             seaweed_need: the amount of seaweed needed
             harvest_loss: the harvest loss in percent
+            growth_data_cache: GrowthDataCache to share the loaded growth data
+                between models
         Returns:
             None
         """
         self.seaweed_need = seaweed_need
         self.harvest_loss = harvest_loss
-        self.load_growth_timeseries(path, cluster)
+        self.load_growth_timeseries(path, cluster, growth_data_cache)
 
-    def load_growth_timeseries(self, path, cluster):
+    def load_growth_timeseries(self, path, cluster, growth_data_cache=None):
         """
-        Loads the growth timeseries from the file
+        Loads the growth timeseries from the file (see growth_data.load_cluster_growth)
         Arguments:
             path: the path to the timeseries
             cluster: the cluster to use
+            growth_data_cache: GrowthDataCache to take the timeseries from,
+                None to only read the cluster from the file
         Returns:
             None
         """
-        growth_timeseries = pd.read_csv(
-            path + os.sep + "actual_growth_rate_by_cluster.csv"
-        )
-        self.growth_timeseries = growth_timeseries[
-            "growth_daily_cluster_" + str(cluster)
-        ].to_list()
+        if growth_data_cache is None:
+            self.growth_timeseries = load_cluster_growth(path, cluster)
+        else:
+            self.growth_timeseries = growth_data_cache.get(path, cluster)
 
     def seaweed_growth(
         self,
@@ -59,7 +145,11 @@ class SeaweedScaleUpModel:
         percent_usable_for_growth,
         days_to_run,
         verbose=False,
-        calibration_run=False
+        calibration_run=False,
+        fast_forward=False,
+        event_driven=False,
+        split_harvests=False,
+        initial_state=None,
     ):
         """
         Calculates the seaweed growth and creatss a dataframe of all important
@@ -73,32 +163,106 @@ class SeaweedScaleUpModel:
             max_density: The maximum density in t/km²
             max_area: The maximum area in km²
             optimal_growth_rate: The optimal growth rate in %
-            growth_rate_fraction: The fraction of the growth rate (can either be scalar or list)
+            growth_rate_fraction: The fraction of the growth rate (can either be scalar,
+                list or GrowthTimeseries)
             initial_lag: The initial lag in days
             percent_usable_for_growth: The percent usable for growth in %
             days_to_run: The number of days to run
+            verbose: log every harvest (at the DEBUG level)
+            calibration_run: whether this is a run to determine the productivity
+            fast_forward: whether to detect when the farm is in a periodic state
+                (same state after a harvest as after an earlier harvest, with the
+                same growth rate fractions in between) and repeat the cycle instead
+                of simulating it. The repeated days are marked in the column
+                "extrapolated"
+            event_driven: whether to jump from harvest to harvest instead of
+                simulating the complete farm every day (see
+                event_model.event_seaweed_growth). Gives the same results,
+                fast_forward is not needed then. The growth with self shading
+                is still stepped day by day, so the run still takes time
+                proportional to the days, only less per day
+            split_harvests: whether to return the daily state and the harvests
+                as two separate dataframes (see split_harvest_df)
+            initial_state: SimulationState to continue a run from (see
+                checkpoint.SimulationState). The initial values are then taken
+                from it and only the days from initial_state.day on are
+                simulated, always day by day
         Returns:
-            A dataframe with all important growth numbers
+            A dataframe with all important growth numbers or, if split_harvests
+            is True, a dataframe with the daily state and one with the harvests
         """
+        if event_driven and initial_state is None:
+            from src.event_model import event_seaweed_growth
+
+            harvest_df = event_seaweed_growth(
+                growth_rate_fraction,
+                initial_seaweed,
+                initial_area_built,
+                initial_area_used,
+                new_module_area_per_day,
+                min_density,
+                max_density,
+                max_area,
+                optimal_growth_rate,
+                self.harvest_loss,
+                initial_lag,
+                percent_usable_for_growth,
+                days_to_run,
+                verbose=verbose,
+                calibration_run=calibration_run,
+            )
+            if split_harvests:
+                return split_harvest_df(harvest_df)
+            return harvest_df
         # Initialize
-        current_area_built = initial_area_built
-        current_area_used = initial_area_used
-        current_seaweed = initial_seaweed
-        current_density = current_seaweed / current_area_used
-        track_max_area = False
-
-        cumulative_harvest_for_food = 0
-        current_seaweed_need = 0
-        harvest_intervall = 0
-        # collect all the harvest_intervall values to find the most common at the end
-        harvest_intervall_all = []
-        df = pd.DataFrame(index=range(days_to_run))
-        for current_day in range(days_to_run):
-            # Calculate the area that can be built on that day
-            # Check if it is larger than 0, because this means that
-            # the model is running to estimate the productivity on a fixed area
-            if new_module_area_per_day > 0:
-                new_module_area_per_day = seaweed_farm_area_per_day(current_day)
+        if initial_state is None:
+            first_day = 0
+            current_area_built = initial_area_built
+            current_area_used = initial_area_used
+            current_seaweed = initial_seaweed
+            current_density = current_seaweed / current_area_used
+            track_max_area = False
+
+            cumulative_harvest_for_food = 0
+            current_seaweed_need = 0
+            harvest_intervall = 0
+        else:
+            first_day = initial_state.day
+            current_area_built = initial_state.current_area_built
+            current_area_used = initial_state.current_area_used
+            current_seaweed = initial_state.current_seaweed
+            current_density = initial_state.current_density
+            track_max_area = initial_state.max_area_reached
+
+            cumulative_harvest_for_food = initial_state.cumulative_harvest_for_food
+            current_seaweed_need = initial_state.current_seaweed_need
+            harvest_intervall = initial_state.harvest_intervall
+        # Check the growth rate fraction once and convert it to one value per day
+        growth_rate_fractions = daily_growth_rate_fractions(
+            growth_rate_fraction, days_to_run
+        )
+        # Calculate the area that can be built on each day
+        # Check if it is larger than 0, because this means that
+        # the model is running to estimate the productivity on a fixed area
+        if new_module_area_per_day > 0:
+            module_area_per_day = seaweed_farm_area_per_day(
+                np.arange(days_to_run)
+            ).tolist()
+        else:
+            module_area_per_day = [new_module_area_per_day] * days_to_run
+        # All daily values are collected in a preallocated array and only
+        # converted to a dataframe once the run is finished
+        records = np.full((days_to_run, len(HARVEST_DF_COLUMNS)), np.nan)
+        if fast_forward:
+            extrapolated = np.zeros(days_to_run, dtype=bool)
+            # Day of the last harvest after which the farm was in a given state
+            harvest_states = {}
+            builds_with_curve = new_module_area_per_day > 0
+            growth_rate_fraction_array = np.asarray(growth_rate_fractions)
+        current_day = first_day
+        while current_day < days_to_run:
+            record = records[current_day]
+            new_module_area_per_day = module_area_per_day[current_day]
             # We can only use a fraction of the module area to grow seaweed
             growth_area_per_day = new_module_area_per_day * (
                 percent_usable_for_growth / 100
@@ -107,50 +271,33 @@ class SeaweedScaleUpModel:
             if current_day > initial_lag:
                 # Build more seaweed farms if maximum is not reached
                 if current_area_built < max_area:
-                    df.loc[
-                        current_day, "new_module_area_per_day"
-                    ] = new_module_area_per_day
+                    record[NEW_MODULE_AREA] = new_module_area_per_day
                     current_area_built += growth_area_per_day
                     if current_area_built > max_area:
                         current_area_built = max_area
                 else:
-                    df.loc[current_day, "new_module_area_per_day"] = 0
+                    record[NEW_MODULE_AREA] = 0
                     if not track_max_area and not calibration_run:
-                        print("max area reached at month ", current_day / 30)
+                        logger.info("max area reached at month %s", current_day / 30)
                         track_max_area = True
             else:
-                df.loc[current_day, "new_module_area_per_day"] = 0
+                record[NEW_MODULE_AREA] = 0
             self_shading_factor = self_shading(
                 current_density / 1000
             )  # convert to kg/m² from t/km2
             # Let the seaweed grow
-            # This can be done with a fixed value for the growth rate fraction
-            # or with a timeseries of the growth rate fraction
-            if isinstance(growth_rate_fraction, float):
-                # Make sure the growth rate fraction is between 0 and 1
-                assert self_shading_factor <= 1 and self_shading_factor >= 0
-                actual_growth_rate = 1 + (
-                    (optimal_growth_rate * growth_rate_fraction * self_shading_factor)
-                    / 100
-                )
-            elif isinstance(growth_rate_fraction, list):
-                # Make sure all the values in the growth rate fraction list are between 0 and 1
-                assert all(
-                    self_shading_factor <= 1 and self_shading_factor >= 0
-                    for self_shading_factor in growth_rate_fraction
-                )
-                actual_growth_rate = 1 + (
-                    (
-                        optimal_growth_rate
-                        * growth_rate_fraction[current_day]
-                        * self_shading_factor
-                    )
-                    / 100
+            # Make sure the self shading factor is between 0 and 1
+            assert self_shading_factor <= 1 and self_shading_factor >= 0
+            actual_growth_rate = 1 + (
+                (
+                    optimal_growth_rate
+                    * growth_rate_fractions[current_day]
+                    * self_shading_factor
                 )
-            else:
-                raise TypeError("growth_rate_fraction must be float or list")
+                / 100
+            )
             # Make sure the actual growth rate is in a reasonable range
-            df.loc[current_day, "actual_growth_rate_multiplicator"] = actual_growth_rate
+            record[GROWTH_RATE_MULTIPLICATOR] = actual_growth_rate
             assert actual_growth_rate <= 2 and actual_growth_rate >= 0
             current_seaweed = current_seaweed * actual_growth_rate
             # Calculate the seaweed density, so we know when to harvest
@@ -158,29 +305,26 @@ class SeaweedScaleUpModel:
             # Check if we have reached harvest density
             if current_density >= max_density:
                 if verbose:
-                    print("harvesting at day ", current_day)
-                    print("days since last harvest: ", harvest_intervall)
+                    logger.debug("harvesting at day %s", current_day)
+                    logger.debug("days since last harvest: %s", harvest_intervall)
                 # Saving the harvest intervall
-                df.loc[current_day, "harvest_intervall"] = harvest_intervall
-                harvest_intervall_all.append(harvest_intervall)
+                record[HARVEST_INTERVALL] = harvest_intervall
                 # Reset the intervall, as we just have harvested
                 harvest_intervall = 0
                 # calculate the amount of seaweed we have to leave in the field
                 seaweed_remaining_to_grow = current_area_used * min_density
-                df.loc[
-                    current_day, "seaweed_remaining_to_grow"
-                ] = seaweed_remaining_to_grow
+                record[SEAWEED_REMAINING_TO_GROW] = seaweed_remaining_to_grow
                 # calulate the amount harvested
                 harvest_wet = current_seaweed - seaweed_remaining_to_grow
-                df.loc[current_day, "harvest_wet"] = harvest_wet
+                record[HARVEST_WET] = harvest_wet
                 if verbose:
-                    print("harvest_wet", harvest_wet)
+                    logger.debug("harvest_wet %s", harvest_wet)
                 # calculate harvest loss
                 # make it a fraction
                 harvest_loss = self.harvest_loss / 100
                 assert harvest_loss <= 1 and harvest_loss >= 0
                 harvest_wet_with_loss = harvest_wet * (1 - harvest_loss)
-                df.loc[current_day, "harvest_wet_with_loss"] = harvest_wet_with_loss
+                record[HARVEST_WET_WITH_LOSS] = harvest_wet_with_loss
                 # calculate how much seaweed we would need to stock all aready built area
                 current_seaweed_need = (
                     current_area_built - current_area_used
@@ -192,85 +336,502 @@ class SeaweedScaleUpModel:
                     current_seaweed = seaweed_remaining_to_grow + harvest_wet_with_loss
                 else:
                     harvest_for_food = harvest_wet_with_loss - current_seaweed_need
-                    df.loc[current_day, "harvest_for_food"] = harvest_for_food
+                    record[HARVEST_FOR_FOOD] = harvest_for_food
                     cumulative_harvest_for_food += harvest_for_food
                     new_area_used = current_seaweed_need / min_density
                     # calculate the new amount of current seaweed with the
                     # newly stocked area
                     current_area_used += new_area_used
                     current_seaweed = current_area_used * min_density
-                df.loc[current_day, "new_area_used"] = new_area_used
+                record[NEW_AREA_USED] = new_area_used
             # Increment the harvest counter
             harvest_intervall += 1
-            df.loc[current_day, "current_seaweed_need"] = current_seaweed_need
-            df.loc[current_day, "current_area_built"] = current_area_built
-            df.loc[current_day, "current_area_used"] = current_area_used
-            df.loc[current_day, "current_seaweed"] = current_seaweed
-            df.loc[current_day, "current_density"] = current_density
-            df.loc[
-                current_day, "cumulative_harvest_for_food"
-            ] = cumulative_harvest_for_food
-        return df
+            record[CURRENT_SEAWEED_NEED:] = (
+                current_seaweed_need,
+                current_area_built,
+                current_area_used,
+                current_seaweed,
+                current_density,
+                cumulative_harvest_for_food,
+            )
+            # The density is only below the harvest density on days without harvest
+            if fast_forward and current_density >= max_density:
+                # The future only depends on the state after the harvest, as long
+                # as no more area is built. So if the state is the same as after
+                # an earlier harvest the days in between repeat themselves
+                state = (
+                    current_area_built,
+                    current_area_used,
+                    current_seaweed,
+                    current_density,
+                    current_seaweed_need,
+                )
+                first_harvest_day = harvest_states.get(state)
+                harvest_states[state] = current_day
+                if (
+                    first_harvest_day is not None
+                    and first_harvest_day > initial_lag
+                    and (current_area_built >= max_area or not builds_with_curve)
+                ):
+                    days_repeated = repeat_cycle(
+                        records,
+                        growth_rate_fraction_array,
+                        first_harvest_day,
+                        current_day,
+                    )
+                    if days_repeated > 0:
+                        extrapolated[
+                            current_day + 1:current_day + 1 + days_repeated
+                        ] = True
+                        current_day += days_repeated
+                        (
+                            current_seaweed_need,
+                            current_area_built,
+                            current_area_used,
+                            current_seaweed,
+                            current_density,
+                            cumulative_harvest_for_food,
+                        ) = records[current_day, CURRENT_SEAWEED_NEED:].tolist()
+                        last_harvest_day = current_day - np.flatnonzero(
+                            ~np.isnan(records[current_day::-1, HARVEST_INTERVALL])
+                        )[0]
+                        harvest_intervall = current_day - last_harvest_day + 1
+            current_day += 1
+        if split_harvests:
+            daily_df, harvest_events = split_records(records[first_day:], first_day)
+            if fast_forward:
+                daily_df["extrapolated"] = extrapolated[first_day:]
+            return daily_df, harvest_events
+        harvest_df = build_harvest_df(records[first_day:], first_day)
+        if fast_forward:
+            harvest_df["extrapolated"] = extrapolated[first_day:]
+        return harvest_df
+
+    def iter_seaweed_growth(
+        self,
+        initial_seaweed,
+        initial_area_built,
+        initial_area_used,
+        new_module_area_per_day,
+        min_density,
+        max_density,
+        max_area,
+        optimal_growth_rate,
+        growth_rate_fraction,
+        initial_lag,
+        percent_usable_for_growth,
+        days_to_run,
+        harvests_only=False,
+        stop=None,
+        verbose=False,
+        calibration_run=False,
+    ):
+        """
+        Calculates the seaweed growth and yields the results of every day
+        while they are calculated, so the run can be ended early (see
+        event_model.iter_seaweed_growth)
+        Arguments:
+            initial_seaweed: The initial amount of seaweed in t
+            initial_area_built: The initial area built in km²
+            initial_area_used: The initial area used in km²
+            new_module_area_per_day: The area built per day in km²
+            min_density: The minimum density in t/km²
+            max_density: The maximum density in t/km²
+            max_area: The maximum area in km²
+            optimal_growth_rate: The optimal growth rate in %
+            growth_rate_fraction: The fraction of the growth rate (can either be scalar,
+                list or GrowthTimeseries)
+            initial_lag: The initial lag in days
+            percent_usable_for_growth: The percent usable for growth in %
+            days_to_run: The number of days to run
+            harvests_only: whether to only yield the harvest days
+            stop: function or list of functions that get every record and
+                return True to end the run after it
+            verbose: log every harvest (at the DEBUG level)
+            calibration_run: whether this is a run to determine the productivity
+        Returns:
+            generator of dicts with the day and the values written on it
+        """
+        from src.event_model import iter_seaweed_growth
+
+        return iter_seaweed_growth(
+            growth_rate_fraction,
+            initial_seaweed,
+            initial_area_built,
+            initial_area_used,
+            new_module_area_per_day,
+            min_density,
+            max_density,
+            max_area,
+            optimal_growth_rate,
+            self.harvest_loss,
+            initial_lag,
+            percent_usable_for_growth,
+            days_to_run,
+            harvests_only=harvests_only,
+            stop=stop,
+            verbose=verbose,
+            calibration_run=calibration_run,
+        )
 
     def determine_average_productivity(
         self,
         growth_rate_fraction,
         days_to_run,
         percent_usable_for_growth,
-        optimal_growth_rate
+        optimal_growth_rate,
+        cache=None,
+        solver="auto"
     ):
         """
         Let the model run for one km² to determine the productivity
         per area and day and the harvest intervall
         Arguments:
-            growth_rate_fraction: float or list of the growth rate of seaweed
+            growth_rate_fraction: float, list or GrowthTimeseries of the growth
+                rate of seaweed
             days_to_run: int, number of days to run the model
             percent_usable_for_growth: float, the percentage of the module area
                 that can be used for growth
             optimal_growth_rate: float, the optimal growth rate of the seaweed
+            cache: CalibrationCache to look up and save the productivity in
+            solver: "simulation" to simulate the calibration day by day,
+                "steady_state" to calculate the stable harvest cycle directly
+                (only for a constant growth rate fraction, falls back to the
+                simulation if the cycle does not converge) or "auto" to use the
+                steady state solver whenever the growth rate fraction is constant
         Returns:
             productivity: float, the average productivity per km² and day
         """
-        harvest_df = self.seaweed_growth(
-            initial_seaweed=1,
-            initial_area_built=1,
-            initial_area_used=1,
-            new_module_area_per_day=0,
-            min_density=1200,
-            max_density=3600,
-            max_area=1,
-            optimal_growth_rate=optimal_growth_rate,  # % per day
-            growth_rate_fraction=growth_rate_fraction,
-            initial_lag=0,
-            percent_usable_for_growth=percent_usable_for_growth,
-            days_to_run=days_to_run,
-            calibration_run=True
-        )
-        # Get the stabilized values
-        try:
-            stable_harvest_intervall = harvest_df.loc[
-                harvest_df["harvest_intervall"].last_valid_index(), "harvest_intervall"
-            ]
-            stable_harvest_for_food = harvest_df.loc[
-                harvest_df["harvest_for_food"].last_valid_index(), "harvest_for_food"
-            ]
-        except KeyError:
-            stable_harvest_intervall = None
-            stable_harvest_for_food = None
-        print("stable_harvest_intervall every {} days".format(
-            stable_harvest_intervall)
-        )
-        print("Stable harvest for food is {} t".format(stable_harvest_for_food))
+        if cache is not None:
+            key = cache.key(
+                growth_rate_fraction,
+                days_to_run,
+                percent_usable_for_growth,
+                optimal_growth_rate,
+                self.harvest_loss,
+            )
+            found, productivity_day_km2 = cache.get(key)
+            if found:
+                logger.info("productivity_day_km2 %s (cached)", productivity_day_km2)
+                return productivity_day_km2
+        if solver not in ("auto", "simulation", "steady_state"):
+            raise ValueError("solver must be 'auto', 'simulation' or 'steady_state'")
+        constant_growth = isinstance(growth_rate_fraction, float)
+        if solver == "steady_state" and not constant_growth:
+            raise TypeError("the steady state solver needs a constant growth_rate_fraction")
+        stable_harvest = None
+        if solver != "simulation" and constant_growth:
+            stable_harvest = steady_state_calibration(
+                growth_rate_fraction,
+                days_to_run,
+                optimal_growth_rate,
+                self.harvest_loss,
+            )
+        if stable_harvest is not None:
+            stable_harvest_intervall, stable_harvest_for_food = stable_harvest
+        else:
+            harvest_df = self.seaweed_growth(
+                initial_seaweed=1,
+                initial_area_built=1,
+                initial_area_used=1,
+                new_module_area_per_day=0,
+                min_density=MIN_DENSITY,
+                max_density=MAX_DENSITY,
+                max_area=1,
+                optimal_growth_rate=optimal_growth_rate,  # % per day
+                growth_rate_fraction=growth_rate_fraction,
+                initial_lag=0,
+                percent_usable_for_growth=percent_usable_for_growth,
+                days_to_run=days_to_run,
+                calibration_run=True,
+                # Only changes the cumulative harvest, which is not used here
+                fast_forward=True
+            )
+            # Get the stabilized values
+            try:
+                stable_harvest_intervall = harvest_df.loc[
+                    harvest_df["harvest_intervall"].last_valid_index(),
+                    "harvest_intervall",
+                ]
+                stable_harvest_for_food = harvest_df.loc[
+                    harvest_df["harvest_for_food"].last_valid_index(),
+                    "harvest_for_food",
+                ]
+            except KeyError:
+                stable_harvest_intervall = None
+                stable_harvest_for_food = None
+        logger.info("stable_harvest_intervall every %s days", stable_harvest_intervall)
+        logger.info("Stable harvest for food is %s t", stable_harvest_for_food)
         # Calculate productivity per km² per day
         if stable_harvest_intervall is not None and stable_harvest_for_food is not None:
             productivity_day_km2 = stable_harvest_for_food / stable_harvest_intervall
         else:
             productivity_day_km2 = None
-        print("productivity_day_km2", productivity_day_km2)
-        print("This productivity refers to the area that is usable for growth")
+        logger.info("productivity_day_km2 %s", productivity_day_km2)
+        logger.info("This productivity refers to the area that is usable for growth")
+        if cache is not None:
+            cache.put(key, productivity_day_km2)
         return productivity_day_km2
 
 
+def build_harvest_df(records, first_day=0):
+    """
+    Converts the daily records of a growth simulation into a dataframe.
+    Columns that were never written (e.g. harvest_for_food if the
+    harvest was never used for food) are left out and the remaining
+    columns are sorted by the day they were first written, so the dataframe
+    looks the same as if it had been filled day by day
+    Arguments:
+        records: array of shape (days, len(HARVEST_DF_COLUMNS)), NaN where
+            no value was written on that day
+        first_day: the day of the first record
+    Returns:
+        A dataframe with one row per day
+    """
+    written = ~np.isnan(records)
+    first_written = written.argmax(axis=0)
+    columns = sorted(
+        np.flatnonzero(written.any(axis=0)),
+        key=lambda column: (first_written[column], column),
+    )
+    return pd.DataFrame(
+        {HARVEST_DF_COLUMNS[column]: records[:, column] for column in columns},
+        index=range(first_day, first_day + records.shape[0]),
+    )
+
+
+def split_records(records, first_day=0):
+    """
+    Converts the daily records of a growth simulation into a dataframe
+    with the daily state and a dataframe with the harvests
+    Arguments:
+        records: array of shape (days, len(HARVEST_DF_COLUMNS)), NaN where
+            no value was written on that day
+        first_day: the day of the first record
+    Returns:
+        tuple: dataframe with one row per day and the DAILY_STATE_COLUMNS,
+            dataframe with one row per harvest, indexed by the day of the
+            harvest, with the HARVEST_ONLY_COLUMNS
+    """
+    daily_columns = [HARVEST_DF_COLUMNS.index(column) for column in DAILY_STATE_COLUMNS]
+    daily_df = pd.DataFrame(
+        records[:, daily_columns],
+        columns=DAILY_STATE_COLUMNS,
+        index=range(first_day, first_day + records.shape[0]),
+    )
+    harvest_days = np.flatnonzero(~np.isnan(records[:, HARVEST_INTERVALL]))
+    harvest_events = pd.DataFrame(
+        records[harvest_days, HARVEST_INTERVALL:CURRENT_SEAWEED_NEED],
+        columns=HARVEST_ONLY_COLUMNS,
+        index=pd.Index(first_day + harvest_days, name="day"),
+    )
+    return daily_df, harvest_events
+
+
+def split_harvest_df(harvest_df):
+    """
+    Splits the results of a growth simulation into the daily state and the
+    harvests. Most days are no harvest days, so this saves the memory of
+    the harvest columns, which are NaN on all other days
+    Arguments:
+        harvest_df: the dataframe created by SeaweedScaleUpModel.seaweed_growth,
+            can also contain additional columns (e.g. max_area)
+    Returns:
+        tuple: dataframe with all columns that are written every day,
+            dataframe with one row per harvest, indexed by the day of the
+            harvest, with the HARVEST_ONLY_COLUMNS
+    """
+    harvest_columns = [
+        column for column in HARVEST_ONLY_COLUMNS if column in harvest_df.columns
+    ]
+    daily_df = harvest_df.drop(columns=harvest_columns)
+    if "harvest_intervall" in harvest_df.columns:
+        harvested = harvest_df["harvest_intervall"].notna().to_numpy()
+    else:
+        harvested = np.zeros(len(harvest_df), dtype=bool)
+    harvest_events = harvest_df.loc[harvested].reindex(columns=HARVEST_ONLY_COLUMNS)
+    harvest_events.index = pd.Index(np.flatnonzero(harvested), name="day")
+    return daily_df, harvest_events
+
+
+def merge_harvest_df(daily_df, harvest_events):
+    """
+    Rebuilds the dataframe created by SeaweedScaleUpModel.seaweed_growth
+    from the daily state and the harvests
+    Arguments:
+        daily_df: dataframe with all columns that are written every day
+        harvest_events: dataframe with one row per harvest, indexed by the day
+            of the harvest
+    Returns:
+        A dataframe with one row per day with all columns of both dataframes
+    """
+    records = np.full((len(daily_df), len(HARVEST_DF_COLUMNS)), np.nan)
+    for column in daily_df.columns.intersection(HARVEST_DF_COLUMNS):
+        records[:, HARVEST_DF_COLUMNS.index(column)] = daily_df[column]
+    harvest_days = harvest_events.index.to_numpy(dtype=int)
+    for column in harvest_events.columns.intersection(HARVEST_DF_COLUMNS):
+        records[harvest_days, HARVEST_DF_COLUMNS.index(column)] = harvest_events[
+            column
+        ]
+    harvest_df = build_harvest_df(records)
+    harvest_df.index = daily_df.index
+    # Columns added after the simulation stay at the end
+    for column in daily_df.columns.difference(HARVEST_DF_COLUMNS, sort=False):
+        harvest_df[column] = daily_df[column]
+    return harvest_df
+
+
+def daily_growth_rate_fractions(growth_rate_fraction, days_to_run):
+    """
+    Checks the growth rate fraction and converts it to one value per day
+    Arguments:
+        growth_rate_fraction: The fraction of the growth rate (can either be scalar,
+            list or GrowthTimeseries)
+        days_to_run: The number of days to run
+    Returns:
+        list with the growth rate fraction of every day
+    """
+    if isinstance(growth_rate_fraction, float):
+        return [growth_rate_fraction] * days_to_run
+    elif isinstance(growth_rate_fraction, GrowthTimeseries):
+        # Already checked when the timeseries was created
+        return growth_rate_fraction.values.tolist()
+    elif isinstance(growth_rate_fraction, list):
+        growth_rate_fractions = np.asarray(growth_rate_fraction, dtype=float)
+        # Make sure all the values in the growth rate fraction list are between 0 and 1
+        assert np.all((growth_rate_fractions >= 0) & (growth_rate_fractions <= 1))
+        return growth_rate_fractions.tolist()
+    else:
+        raise TypeError("growth_rate_fraction must be float, list or GrowthTimeseries")
+
+
+def repeat_cycle(records, growth_rate_fractions, first_harvest_day, harvest_day):
+    """
+    Repeats the days after first_harvest_day up to harvest_day for as long as
+    the growth rate fractions repeat as well. Used by
+    SeaweedScaleUpModel.seaweed_growth when the state after harvest_day is
+    the same as the state after first_harvest_day
+    Arguments:
+        records: the daily records of the run, filled up to harvest_day
+        growth_rate_fractions: array with the growth rate fraction of every day
+        first_harvest_day: the day of the earlier harvest
+        harvest_day: the day of the harvest with the same state
+    Returns:
+        int: the number of days filled in after harvest_day
+    """
+    days_to_run = records.shape[0]
+    period = harvest_day - first_harvest_day
+    upcoming = growth_rate_fractions[harvest_day + 1:days_to_run]
+    repeated = growth_rate_fractions[harvest_day + 1 - period:days_to_run - period]
+    changes = np.flatnonzero(upcoming != repeated)
+    days = changes[0] if len(changes) > 0 else len(upcoming)
+    if days == 0:
+        return 0
+    offsets = np.arange(days)
+    target_days = harvest_day + 1 + offsets
+    source_days = first_harvest_day + 1 + offsets % period
+    records[target_days] = records[source_days]
+    # The harvest for food adds up over the cycles
+    harvest_per_cycle = (
+        records[harvest_day, CUMULATIVE_HARVEST_FOR_FOOD]
+        - records[first_harvest_day, CUMULATIVE_HARVEST_FOR_FOOD]
+    )
+    records[target_days, CUMULATIVE_HARVEST_FOR_FOOD] += harvest_per_cycle * (
+        offsets // period + 1
+    )
+    return int(days)
+
+
+def steady_state_calibration(
+    growth_rate_fraction,
+    days_to_run,
+    optimal_growth_rate,
+    harvest_loss,
+    min_density=MIN_DENSITY,
+    max_density=MAX_DENSITY,
+    max_cycles=100,
+):
+    """
+    Calculates the last harvest of the productivity calibration run
+    (1 t of seaweed on 1 km²) for a constant growth rate fraction without
+    simulating every day. Until self shading starts the seaweed grows
+    geometrically, so this part is solved in closed form. After that only
+    the days of the harvest cycles are stepped, until a cycle starts with
+    the same density as the one before, after which all cycles are the same.
+    Arguments:
+        growth_rate_fraction: float, the constant fraction of the growth rate
+        days_to_run: int, number of days the calibration runs
+        optimal_growth_rate: float, the optimal growth rate of the seaweed
+        harvest_loss: float, the harvest loss in percent
+        min_density: the density left after a harvest in t/km²
+        max_density: the harvest density in t/km²
+        max_cycles: the number of harvest cycles after which the cycle
+            is considered not to converge
+    Returns:
+        tuple: the stable harvest intervall and harvest for food (both None if
+            there is no harvest in days_to_run) or None if the calibration
+            has to be simulated instead
+    """
+    # density below which there is no self shading in t/km²
+    unshaded_density = 400
+    unshaded_growth_rate = 1 + (optimal_growth_rate * growth_rate_fraction) / 100
+    if unshaded_growth_rate <= 1:
+        # The seaweed never grows, so it is never harvested
+        return None, None
+    if unshaded_growth_rate > 2 or max_density <= unshaded_density:
+        return None
+    # Number of days until the density is large enough for self shading
+    unshaded_days = max(
+        math.ceil(math.log(unshaded_density) / math.log(unshaded_growth_rate)), 1
+    )
+    while (
+        unshaded_days > 1
+        and unshaded_growth_rate ** (unshaded_days - 1) >= unshaded_density
+    ):
+        unshaded_days -= 1
+    while unshaded_growth_rate ** unshaded_days < unshaded_density:
+        unshaded_days += 1
+    if unshaded_days >= days_to_run:
+        return None, None
+    # The area used is 1 km², so the amount of seaweed is the same as the density
+    current_seaweed = current_density = unshaded_growth_rate ** unshaded_days
+    harvest_intervall = unshaded_days
+    harvest_loss = harvest_loss / 100
+    assert harvest_loss <= 1 and harvest_loss >= 0
+    last_harvest = (None, None)
+    last_harvest_density = None
+    cycles = 0
+    for _ in range(unshaded_days, days_to_run):
+        actual_growth_rate = 1 + (
+            (
+                optimal_growth_rate
+                * growth_rate_fraction
+                * self_shading(current_density / 1000)
+            )
+            / 100
+        )
+        assert actual_growth_rate <= 2 and actual_growth_rate >= 0
+        current_seaweed = current_seaweed * actual_growth_rate
+        current_density = current_seaweed
+        if current_density >= max_density:
+            # All harvest can be used for food, as there is no new area to stock
+            harvest_for_food = (current_seaweed - min_density) * (1 - harvest_loss)
+            harvest = (float(harvest_intervall), harvest_for_food)
+            # The density before the harvest determines the growth on the
+            # next day, so if it is the same the next cycles will be the same
+            if current_density == last_harvest_density and harvest == last_harvest:
+                return harvest
+            last_harvest = harvest
+            last_harvest_density = current_density
+            cycles += 1
+            if cycles > max_cycles:
+                return None
+            harvest_intervall = 0
+            current_seaweed = float(min_density)
+        harvest_intervall += 1
+    return last_harvest
+
+
 def self_shading(density):
     """
     Calculates how much the growth rate is reduced due to self shading.
@@ -372,6 +933,21 @@ def run_model(
     scenarios,
     location,
     number_of_clusters,
+    engine="serial",
+    jobs=1,
+    executor=None,
+    calibration_cache=None,
+    fast_forward=False,
+    event_driven=False,
+    growth_data_cache=None,
+    csv_export=False,
+    results_dtype="float64",
+    checkpoints=False,
+    force=False,
+    report=None,
+    growth_data=None,
+    persist=True,
+    return_results=False,
 ):
     """
     Run the model
@@ -390,9 +966,49 @@ def run_model(
         scenarios (list): list of scenarios to run
         location (str): location on the globe
         number_of_clusters (int): number of clusters
+        engine (str): "serial" to simulate the clusters one after another or
+            "batch" to simulate all scenarios and clusters in one vectorized pass
+        jobs (int): number of worker processes the serial engine spreads
+            the clusters over
+        executor (concurrent.futures.Executor): existing process pool to
+            use instead of starting one with jobs workers
+        calibration_cache (CalibrationCache): cache for the productivity
+            calibration of the clusters
+        fast_forward (bool): whether the serial engine repeats periodic harvest
+            cycles instead of simulating them (see SeaweedScaleUpModel.seaweed_growth)
+        event_driven (bool): whether the serial engine jumps from harvest to harvest
+            instead of simulating every day (see SeaweedScaleUpModel.seaweed_growth)
+        growth_data_cache (GrowthDataCache): cache for the growth data, so every
+            scenario is only read once. A new one is used if None. Parallel runs
+            read the clusters in the worker processes instead
+        csv_export (bool): whether to also save the results of every cluster as csv
+        results_dtype (str): the type to store the results as, e.g. "float32"
+        checkpoints (bool): whether the serial engine saves the state at the end
+            of every cluster and continues from it when the same cluster is run
+            again with more days (see checkpoint.py). Only results stored as
+            float64 are continued
+        force (bool): whether the serial engine runs all clusters again. Otherwise
+            clusters whose inputs did not change since their last run keep their
+            results and clusters with the same growth as an already finished
+            cluster take over its results (see manifest.py). The batch engine
+            always runs all clusters and removes their manifests
+        report (RunReport): report to add the time of the phases of the run and
+            the counters to (see instrumentation.py). It is saved as
+            run_report.json in the results of the location at the end
+        growth_data (dict): growth prepared in memory by scenario, used instead
+            of reading the prepared files of these scenarios, e.g. the daily
+            growth from preprocessing.monthly_to_daily (see
+            growth_data.scenario_growth_from_memory for all formats)
+        persist (bool): whether to save the results, the manifests and the
+            run report. Otherwise nothing is written, e.g. for sweeps that
+            only use the returned results
+        return_results (bool): whether to return the results
     Returns:
-        None
+        RunResults: the results of the clusters by scenario and cluster,
+            None if return_results is False
     """
+    if checkpoints and not persist:
+        raise ValueError("checkpoints need the results to be saved")
     # Fraction of max calories we want in seaweed
     seaweed_limit = feed_limit + food_limit + biofuel_limit
     # Calculate the seaweed needed per day to feed everyone, given the iodine limit
@@ -403,80 +1019,671 @@ def run_model(
         calories_per_t_seaweed_wet,
         seaweed_limit,
     )
+    if growth_data_cache is None:
+        growth_data_cache = GrowthDataCache()
+    for scenario, growth in (growth_data or {}).items():
+        growth_data_cache.add("data" + os.sep + location + os.sep + scenario, growth)
+    results = None
+    if return_results:
+        results = RunResults()
+        for scenario in scenarios:
+            results[scenario] = {}
+    if engine == "serial":
+        simulation_index = None
+        if persist and not force:
+            # Imported here, as the manifests build on this module
+            from src.manifest import SimulationIndex
+
+            simulation_index = SimulationIndex(location)
+        cluster_arguments = (
+            location,
+            seaweed_needed,
+            harvest_loss,
+            optimal_growth_rate,
+            days_to_run,
+            percent_usable_for_growth,
+            calibration_cache,
+            fast_forward,
+            event_driven,
+            csv_export,
+            results_dtype,
+            checkpoints,
+            force,
+            persist,
+            simulation_index,
+        )
+        if (executor is None and jobs <= 1) or growth_data:
+            # The clusters run in this process, so they can share the growth data.
+            # Growth prepared in memory is sent along to the worker processes
+            cluster_arguments += (growth_data_cache,)
+        if executor is None and jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                scenario_max_growth_rates = run_clusters(
+                    scenarios,
+                    number_of_clusters,
+                    cluster_arguments,
+                    executor,
+                    report,
+                    results,
+                )
+        else:
+            scenario_max_growth_rates = run_clusters(
+                scenarios, number_of_clusters, cluster_arguments, executor, report, results
+            )
+    elif engine == "batch":
+        if force:
+            logger.warning("The batch engine always runs all clusters, force has no effect")
+        scenario_max_growth_rates = run_batch(
+            scenarios,
+            number_of_clusters,
+            location,
+            seaweed_needed,
+            harvest_loss,
+            optimal_growth_rate,
+            days_to_run,
+            percent_usable_for_growth,
+            calibration_cache,
+            growth_data_cache,
+            csv_export,
+            results_dtype,
+            report,
+            results,
+            persist,
+        )
+    else:
+        raise ValueError("engine must be 'serial' or 'batch'")
+    # Convert the results to a dataframe
+    with phase(report, "write"):
+        scenario_max_growth_rates_df = pd.DataFrame(
+            scenario_max_growth_rates,
+            columns=["scenario", "cluster", "max_growth_rate"],
+        )
+        if persist:
+            scenario_max_growth_rates_df.to_csv(
+                "results" + os.sep + location + os.sep + "scenario_max_growth_rates.csv"
+            )
+    if report is not None and persist:
+        report_path = "results" + os.sep + location + os.sep + "run_report.json"
+        report.save(report_path)
+        logger.info("Saved the run report to %s", report_path)
+    if results is not None:
+        results.scenario_max_growth_rates = scenario_max_growth_rates_df
+    return results
+
+
+class RunResults(dict):
+    """
+    The results of run_model by scenario and cluster, e.g. results["150tg"][1]
+    is the harvest_df of cluster 1 of scenario 150tg, with the same columns as
+    the saved results. Clusters that are not productive enough have no results.
+    The mean growth rate fraction of all clusters is in scenario_max_growth_rates,
+    the same table as scenario_max_growth_rates.csv
+    """
+
+    def __init__(self):
+        """
+        Initialize the results
+        Arguments:
+            None
+        Returns:
+            None
+        """
+        super().__init__()
+        self.scenario_max_growth_rates = None
+
+
+def run_clusters(
+    scenarios,
+    number_of_clusters,
+    cluster_arguments,
+    executor=None,
+    report=None,
+    results=None,
+):
+    """
+    Runs all clusters of all scenarios with the serial engine, either one
+    after another or in parallel on an executor. The log messages of the
+    parallel runs are collected and logged in the same order as in a serial run.
+    Arguments:
+        scenarios (list): list of scenarios to run
+        number_of_clusters (int): number of clusters
+        cluster_arguments (tuple): the remaining arguments of run_cluster
+        executor (concurrent.futures.Executor): executor to run the clusters on,
+            None to run them one after another
+        report (RunReport): report to add the phases and counters of the clusters to
+        results (dict): dict to add the results of the clusters to, by scenario
+            and cluster
+    Returns:
+        list: (scenario, cluster, mean growth rate fraction) for every cluster
+    """
+    if executor is not None:
+        log_level = logging.getLogger(LOGGER_NAME).getEffectiveLevel()
+        futures = {
+            (scenario, cluster): executor.submit(
+                run_cluster_captured,
+                (scenario, cluster) + tuple(cluster_arguments),
+                log_level,
+                report is not None,
+                results is not None,
+            )
+            for scenario in scenarios
+            for cluster in range(1, number_of_clusters + 1)
+        }
     # Save the results for each scenario
     scenario_max_growth_rates = []
     # Run for all scenarios
     for scenario in scenarios:
-        print("Running scenario {}".format(scenario))
-        # Initialize the model
+        logger.info("Running scenario %s", scenario)
         for cluster in range(1, number_of_clusters + 1):
-            path = "data" + os.sep + location + os.sep + scenario
-            model = SeaweedScaleUpModel(path, cluster, seaweed_needed, harvest_loss)
-            growth_rate_fraction = np.mean(model.growth_timeseries)
-            print(
-                "Cluster {}: mean growth rate of {} percent per day before self shading".format(
-                    cluster, round(growth_rate_fraction * 30, 2)
+            if executor is None:
+                growth_rate_fraction = run_cluster(
+                    scenario, cluster, *cluster_arguments, report=report, results=results
                 )
-            )
+            else:
+                growth_rate_fraction, records, cluster_report, cluster_results = futures[
+                    (scenario, cluster)
+                ].result()
+                for record in records:
+                    logging.getLogger(record.name).handle(record)
+                if report is not None:
+                    report.merge(cluster_report)
+                if results is not None:
+                    for result_scenario, clusters in cluster_results.items():
+                        results.setdefault(result_scenario, {}).update(clusters)
             scenario_max_growth_rates.append((scenario, cluster, growth_rate_fraction))
-            # calculate how much area we need to satisfy the daily
-            # seaweed need with the given productivity
-            productivity_day_km2 = model.determine_average_productivity(
-                growth_rate_fraction,
-                500,  # days to calibrate run (has to be longer than time needed to saturate farms)
-                percent_usable_for_growth,
-                optimal_growth_rate,
+        logger.info("done with scenario\n\n")
+    return scenario_max_growth_rates
+
+
+def run_cluster_captured(
+    args, log_level=logging.WARNING, with_report=False, with_results=False
+):
+    """
+    Runs run_cluster and collects everything it logs, so the messages of
+    parallel runs do not get mixed up
+    Arguments:
+        args: the arguments of run_cluster
+        log_level: the lowest level of the messages to collect
+        with_report: whether to collect the phases and counters of the run
+        with_results: whether to return the results of the cluster
+    Returns:
+        tuple: the result of run_cluster, the collected log records, the
+            report of the run as a dict (None if with_report is False) and
+            the results by scenario and cluster (None if with_results is False)
+    """
+    report = RunReport() if with_report else None
+    results = {} if with_results else None
+    with collect_records(log_level) as records:
+        growth_rate_fraction = run_cluster(*args, report=report, results=results)
+    return (
+        growth_rate_fraction,
+        records,
+        None if report is None else report.to_dict(),
+        results,
+    )
+
+
+def run_cluster(
+    scenario,
+    cluster,
+    location,
+    seaweed_needed,
+    harvest_loss,
+    optimal_growth_rate,
+    days_to_run,
+    percent_usable_for_growth,
+    calibration_cache=None,
+    fast_forward=False,
+    event_driven=False,
+    csv_export=False,
+    results_dtype="float64",
+    checkpoints=False,
+    force=False,
+    persist=True,
+    simulation_index=None,
+    growth_data_cache=None,
+    report=None,
+    results=None,
+):
+    """
+    Calibrates and runs the model for a single cluster of a scenario
+    and saves the results
+    Arguments:
+        scenario (str): the scenario to run
+        cluster (int): the cluster to run
+        location (str): location on the globe
+        seaweed_needed (float): the seaweed needed per day in t
+        harvest_loss (float): Fraction of harvest lost
+        optimal_growth_rate (float): the optimal growth rate
+        days_to_run (int): the number of days to run the model
+        percent_usable_for_growth (float): how much of the harvest is usable for growth
+        calibration_cache (CalibrationCache): cache for the productivity calibration
+        fast_forward (bool): whether to repeat periodic harvest cycles
+        event_driven (bool): whether to jump from harvest to harvest
+        csv_export (bool): whether to also save the results as csv
+        results_dtype (str): the type to store the results as
+        checkpoints (bool): whether to continue from and save a checkpoint
+        force (bool): whether to run the cluster even if its inputs did not change
+        persist (bool): whether to save the results and use the manifests.
+            Otherwise nothing is read from or written to the results
+        simulation_index (SimulationIndex): the manifests of the location, to
+            look for a cluster with the same inputs. They are read if None
+        growth_data_cache (GrowthDataCache): cache to take the growth data from
+        report (RunReport): report to add the phases and counters of the run to
+        results (dict): dict to add the results of the cluster to, by scenario
+            and cluster
+    Returns:
+        float: the mean growth rate fraction of the cluster
+    """
+    # Initialize the model
+    path = "data" + os.sep + location + os.sep + scenario
+    with phase(report, "load"):
+        model = SeaweedScaleUpModel(
+            path, cluster, seaweed_needed, harvest_loss, growth_data_cache
+        )
+    growth_rate_fraction = model.growth_timeseries.mean
+    logger.info(
+        "Cluster %s: mean growth rate of %s percent per day before self shading",
+        cluster,
+        round(growth_rate_fraction * 30, 2),
+    )
+    # Imported here, as the manifests build on this module
+    from src.manifest import (
+        SimulationIndex,
+        input_key,
+        load_manifest,
+        manifest_path,
+        output_key,
+        save_manifest,
+        unchanged,
+    )
+
+    simulation_key = input_key(
+        model.growth_timeseries.values,
+        seaweed_needed=float(seaweed_needed),
+        harvest_loss=float(harvest_loss),
+        optimal_growth_rate=float(optimal_growth_rate),
+        days_to_run=int(days_to_run),
+        percent_usable_for_growth=float(percent_usable_for_growth),
+        calibration_days=CALIBRATION_DAYS,
+        fast_forward=bool(fast_forward),
+        results_dtype=str(results_dtype),
+    )
+    key = output_key(simulation_key, cluster=cluster, csv_export=bool(csv_export))
+    manifest = manifest_path(location, scenario, cluster)
+    if persist and not force and unchanged(manifest, key):
+        logger.info("inputs of cluster %s did not change, keeping its results", cluster)
+        logger.info("done with cluster\n")
+        if report is not None:
+            report.count("clusters_unchanged")
+        if results is not None and load_manifest(manifest)["outputs"]:
+            with phase(report, "load"):
+                results.setdefault(scenario, {})[cluster] = load_results(
+                    results_path(location, scenario, cluster)
+                )
+        return growth_rate_fraction
+    # calculate how much area we need to satisfy the daily
+    # seaweed need with the given productivity
+    with phase(report, "calibrate"):
+        productivity_day_km2 = model.determine_average_productivity(
+            growth_rate_fraction,
+            CALIBRATION_DAYS,
+            percent_usable_for_growth,
+            optimal_growth_rate,
+            cache=calibration_cache,
+        )
+    # check if the area is even productive enough to be used
+    if productivity_day_km2 is not None:
+        logger.info("calculating yield for cluster %s", cluster)
+        max_area = seaweed_needed / productivity_day_km2
+        growth_parameters = dict(
+            initial_seaweed=10000,
+            initial_area_built=100,
+            initial_area_used=100,
+            new_module_area_per_day=100,
+            min_density=MIN_DENSITY,
+            max_density=MAX_DENSITY,
+            max_area=max_area,
+            optimal_growth_rate=optimal_growth_rate,
+            initial_lag=0,  # 0 because this is taken care of with the logistic growth
+            percent_usable_for_growth=percent_usable_for_growth,
+        )
+        initial_state = None
+        same_simulation = None
+        if persist and not force:
+            if simulation_index is None:
+                simulation_index = SimulationIndex(location)
+            same_simulation = simulation_index.find(simulation_key)
+        if same_simulation is not None:
+            logger.info("same inputs as %s, taking over its results", same_simulation)
+            with phase(report, "load"):
+                harvest_df = load_results(same_simulation).drop(
+                    columns=["max_area", "cluster", "seaweed_needed_per_day"]
+                )
+            if report is not None:
+                report.count("clusters_taken_over")
+        elif checkpoints:
+            # Imported here, as the checkpoints build on this module
+            from src.checkpoint import (
+                SimulationState,
+                checkpoint_path,
+                extend_harvest_df,
+                load_previous_run,
+                run_key,
+                save_checkpoint,
+            )
+
+            checkpoint_key = run_key(
+                model.growth_timeseries.values,
+                harvest_loss=harvest_loss,
+                **growth_parameters
             )
-            # check if the area is even productive enough to be used
-            if productivity_day_km2 is not None:
-                print("calculating yield for cluster {}".format(cluster))
-                max_area = seaweed_needed / productivity_day_km2
+            initial_state, previous_df = load_previous_run(
+                location, scenario, cluster, checkpoint_key
+            )
+            if initial_state is not None and initial_state.day >= days_to_run:
+                # Nothing left to continue, so the cluster is run again
+                initial_state = None
+            elif initial_state is not None:
+                logger.info(
+                    "continuing from the checkpoint at day %s", initial_state.day
+                )
+        if same_simulation is None:
+            with phase(report, "simulate"):
                 harvest_df = model.seaweed_growth(
-                    initial_seaweed=10000,
-                    initial_area_built=100,
-                    initial_area_used=100,
-                    new_module_area_per_day=100,
-                    min_density=1200,
-                    max_density=3600,
-                    max_area=max_area,
-                    optimal_growth_rate=optimal_growth_rate,
                     growth_rate_fraction=model.growth_timeseries,
-                    initial_lag=0,  # 0 because this is taken care of with the logistic growth
-                    percent_usable_for_growth=percent_usable_for_growth,
                     days_to_run=days_to_run,
+                    fast_forward=fast_forward,
+                    event_driven=event_driven,
+                    initial_state=initial_state,
+                    **growth_parameters
                 )
-                # The productivity assumes that the whole area is used for growth
-                # but we can only use a fraction of it. Therefore, we have to multiply
-                # the productivity by the fraction of the area that is usable for growth
-                print("The complete area is {} km²".format(
-                    round(max_area / (percent_usable_for_growth / 100), 0))
+            if report is not None:
+                report.count("clusters_simulated")
+                report.count("days_simulated", len(harvest_df))
+                if "harvest_intervall" in harvest_df.columns:
+                    report.count(
+                        "harvest_events", int(harvest_df["harvest_intervall"].count())
+                    )
+        if checkpoints and same_simulation is None:
+            save_checkpoint(
+                SimulationState.from_harvest_df(
+                    harvest_df, max_area, 0, initial_state=initial_state
+                ),
+                checkpoint_path(location, scenario, cluster),
+                checkpoint_key,
+            )
+            if initial_state is not None:
+                harvest_df = extend_harvest_df(previous_df, harvest_df)
+        if persist:
+            with phase(report, "write"):
+                save_harvest_df(
+                    harvest_df,
+                    max_area,
+                    cluster,
+                    seaweed_needed,
+                    percent_usable_for_growth,
+                    location,
+                    scenario,
+                    csv_export,
+                    results_dtype,
                 )
-                harvest_df["max_area"] = max_area / (percent_usable_for_growth / 100)
-                harvest_df["cluster"] = cluster
-                harvest_df["seaweed_needed_per_day"] = seaweed_needed
-                harvest_df.to_csv(
-                    "results"
-                    + os.sep
-                    + location
-                    + os.sep
-                    + scenario
-                    + os.sep
-                    + "harvest_df_cluster_"
-                    + str(cluster)
-                    + ".csv"
+        else:
+            add_run_information(
+                harvest_df, max_area, cluster, seaweed_needed, percent_usable_for_growth
+            )
+        if results is not None:
+            results.setdefault(scenario, {})[cluster] = harvest_df
+        outputs = [results_path(location, scenario, cluster)]
+        if csv_export:
+            outputs.append(results_path(location, scenario, cluster, extension=".csv"))
+    else:
+        logger.info(
+            "Not enough productivity in cluster for production %s, skipping it", cluster
+        )
+        outputs = []
+    if persist:
+        save_manifest(manifest, key, simulation_key, outputs)
+        if simulation_index is not None:
+            simulation_index.add(manifest, simulation_key)
+    logger.info("done with cluster\n")
+    return growth_rate_fraction
+
+
+def run_batch(
+    scenarios,
+    number_of_clusters,
+    location,
+    seaweed_needed,
+    harvest_loss,
+    optimal_growth_rate,
+    days_to_run,
+    percent_usable_for_growth,
+    calibration_cache=None,
+    growth_data_cache=None,
+    csv_export=False,
+    results_dtype="float64",
+    report=None,
+    results=None,
+    persist=True,
+):
+    """
+    Calibrates and runs the model for all clusters of all scenarios
+    with the batched engine and saves the results
+    Arguments:
+        scenarios (list): list of scenarios to run
+        number_of_clusters (int): number of clusters
+        location (str): location on the globe
+        seaweed_needed (float): the seaweed needed per day in t
+        harvest_loss (float): Fraction of harvest lost
+        optimal_growth_rate (float): the optimal growth rate
+        days_to_run (int): the number of days to run the model
+        percent_usable_for_growth (float): how much of the harvest is usable for growth
+        calibration_cache (CalibrationCache): cache for the productivity calibration
+        growth_data_cache (GrowthDataCache): cache to take the growth data from
+        csv_export (bool): whether to also save the results as csv
+        results_dtype (str): the type to store the results as
+        report (RunReport): report to add the phases and counters of the run to
+        results (dict): dict to add the results of the clusters to, by scenario
+            and cluster
+        persist (bool): whether to save the results
+    Returns:
+        list: (scenario, cluster, mean growth rate fraction) for every cluster
+    """
+    # Imported here, as the batched engine builds on this module
+    from src.batch_model import (
+        batch_determine_average_productivity,
+        batch_seaweed_growth,
+    )
+    from src.manifest import manifest_path
+
+    runs = []
+    growth_timeseries = []
+    scenario_max_growth_rates = []
+    for scenario in scenarios:
+        for cluster in range(1, number_of_clusters + 1):
+            path = "data" + os.sep + location + os.sep + scenario
+            with phase(report, "load"):
+                model = SeaweedScaleUpModel(
+                    path, cluster, seaweed_needed, harvest_loss, growth_data_cache
                 )
-            else:
-                print(
-                    "Not enough productivity in cluster for production {}, skipping it".format(
-                        cluster
-                    )
+            growth_rate_fraction = model.growth_timeseries.mean
+            logger.info(
+                "Scenario %s cluster %s: mean growth rate of %s percent per day "
+                "before self shading",
+                scenario,
+                cluster,
+                round(growth_rate_fraction * 30, 2),
+            )
+            runs.append((scenario, cluster))
+            growth_timeseries.append(model.growth_timeseries)
+            scenario_max_growth_rates.append((scenario, cluster, growth_rate_fraction))
+    # Calibrate all clusters that are not cached at once
+    growth_rates = [growth_rate for _, _, growth_rate in scenario_max_growth_rates]
+    productivity_day_km2 = np.full(len(runs), np.nan)
+    uncalibrated = list(range(len(runs)))
+    if calibration_cache is not None:
+        keys = [
+            calibration_cache.key(
+                growth_rate,
+                CALIBRATION_DAYS,
+                percent_usable_for_growth,
+                optimal_growth_rate,
+                harvest_loss,
+            )
+            for growth_rate in growth_rates
+        ]
+        uncalibrated = []
+        for run, key in enumerate(keys):
+            found, productivity = calibration_cache.get(key)
+            if not found:
+                uncalibrated.append(run)
+            elif productivity is not None:
+                productivity_day_km2[run] = productivity
+    if uncalibrated:
+        with phase(report, "calibrate"):
+            productivity_day_km2[uncalibrated] = batch_determine_average_productivity(
+                [growth_rates[run] for run in uncalibrated],
+                CALIBRATION_DAYS,
+                percent_usable_for_growth,
+                optimal_growth_rate,
+                harvest_loss,
+            )
+    if calibration_cache is not None:
+        for run in uncalibrated:
+            productivity = productivity_day_km2[run]
+            calibration_cache.put(
+                keys[run], None if np.isnan(productivity) else productivity
+            )
+    # Only run the clusters that are productive enough to be used
+    productive = np.flatnonzero(~np.isnan(productivity_day_km2))
+    for run in np.flatnonzero(np.isnan(productivity_day_km2)):
+        logger.info(
+            "Not enough productivity in scenario %s cluster %s for production, "
+            "skipping it",
+            *runs[run]
+        )
+    max_area = seaweed_needed / productivity_day_km2[productive]
+    with phase(report, "simulate"):
+        records = batch_seaweed_growth(
+            [growth_timeseries[run] for run in productive],
+            initial_seaweed=10000,
+            initial_area_built=100,
+            initial_area_used=100,
+            new_module_area_per_day=100,
+            min_density=MIN_DENSITY,
+            max_density=MAX_DENSITY,
+            max_area=max_area,
+            optimal_growth_rate=optimal_growth_rate,
+            harvest_loss=harvest_loss,
+            initial_lag=0,  # 0 because this is taken care of with the logistic growth
+            percent_usable_for_growth=percent_usable_for_growth,
+            days_to_run=days_to_run,
+        )
+    if report is not None:
+        report.count("clusters_simulated", len(productive))
+        report.count("days_simulated", days_to_run * len(productive))
+        report.count(
+            "harvest_events", int(np.count_nonzero(~np.isnan(records[:, HARVEST_INTERVALL])))
+        )
+    removed_manifests = 0
+    for batch_run, run in enumerate(productive):
+        scenario, cluster = runs[run]
+        harvest_df = build_harvest_df(records[:, :, batch_run])
+        if persist:
+            with phase(report, "write"):
+                save_harvest_df(
+                    harvest_df,
+                    max_area[batch_run],
+                    cluster,
+                    seaweed_needed,
+                    percent_usable_for_growth,
+                    location,
+                    scenario,
+                    csv_export,
+                    results_dtype,
                 )
-            print("done with cluster\n")
-        print("done with scenario\n\n")
-    # Convert the results to a dataframe
-    scenario_max_growth_rates_df = pd.DataFrame(
-        scenario_max_growth_rates, columns=["scenario", "cluster", "max_growth_rate"]
+            # The serial engine must not take these results for its own
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(manifest_path(location, scenario, cluster))
+                removed_manifests += 1
+        else:
+            add_run_information(
+                harvest_df,
+                max_area[batch_run],
+                cluster,
+                seaweed_needed,
+                percent_usable_for_growth,
+            )
+        if results is not None:
+            results.setdefault(scenario, {})[cluster] = harvest_df
+    if removed_manifests:
+        logger.warning(
+            "The batch engine does not skip unchanged clusters, ran %s clusters with "
+            "manifests again and removed their manifests",
+            removed_manifests,
+        )
+    return scenario_max_growth_rates
+
+
+def save_harvest_df(
+    harvest_df,
+    max_area,
+    cluster,
+    seaweed_needed,
+    percent_usable_for_growth,
+    location,
+    scenario,
+    csv_export=False,
+    results_dtype="float64",
+):
+    """
+    Adds the run information to the results of a cluster and saves them
+    in the results store (see results_store.save_results)
+    Arguments:
+        harvest_df (pd.DataFrame): the results of seaweed_growth
+        max_area (float): the maximum area used for growth in km²
+        cluster (int): the cluster
+        seaweed_needed (float): the seaweed needed per day in t
+        percent_usable_for_growth (float): how much of the harvest is usable for growth
+        location (str): location on the globe
+        scenario (str): the scenario
+        csv_export (bool): whether to also save the results as csv
+        results_dtype (str): the type to store the results as
+    Returns:
+        None
+    """
+    add_run_information(
+        harvest_df, max_area, cluster, seaweed_needed, percent_usable_for_growth
     )
-    scenario_max_growth_rates_df.to_csv(
-        "results" + os.sep + location + os.sep + "scenario_max_growth_rates.csv"
+    save_results(
+        harvest_df, results_path(location, scenario, cluster), dtype=results_dtype
+    )
+    if csv_export:
+        harvest_df.to_csv(results_path(location, scenario, cluster, extension=".csv"))
+
+
+def add_run_information(
+    harvest_df, max_area, cluster, seaweed_needed, percent_usable_for_growth
+):
+    """
+    Adds the area, the cluster and the seaweed needed to the results of a cluster
+    Arguments:
+        harvest_df (pd.DataFrame): the results of seaweed_growth
+        max_area (float): the maximum area used for growth in km²
+        cluster (int): the cluster
+        seaweed_needed (float): the seaweed needed per day in t
+        percent_usable_for_growth (float): how much of the harvest is usable for growth
+    Returns:
+        None, the columns are added to harvest_df
+    """
+    # The productivity assumes that the whole area is used for growth
+    # but we can only use a fraction of it. Therefore, we have to multiply
+    # the productivity by the fraction of the area that is usable for growth
+    logger.info(
+        "The complete area is %s km²",
+        round(max_area / (percent_usable_for_growth / 100), 0),
     )
+    harvest_df["max_area"] = max_area / (percent_usable_for_growth / 100)
+    harvest_df["cluster"] = cluster
+    harvest_df["seaweed_needed_per_day"] = seaweed_needed
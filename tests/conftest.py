@@ -0,0 +1,45 @@
+"""
+Fixtures and helpers shared by the tests.
+"""
+import os
+
+import pytest
+
+from src.scaleup_model import run_model
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """
+    Working directory with the bundled data and empty result folders
+    """
+    os.symlink(os.path.join(REPOSITORY, "data"), tmp_path / "data")
+    for scenario in ["150tg", "control"]:
+        os.makedirs(tmp_path / "results" / "global" / scenario)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def run_global_model(days_to_run=400, **kwargs):
+    """
+    Runs the model for two global scenarios with the default parameters
+    """
+    return run_model(
+        optimal_growth_rate=30,
+        days_to_run=days_to_run,
+        global_pop=8000000000,
+        calories_per_person_per_day=2100,
+        harvest_loss=20,
+        food_waste=13,
+        calories_per_t_seaweed_wet=288200,
+        food_limit=0.15,
+        feed_limit=0.05,
+        biofuel_limit=0.25,
+        percent_usable_for_growth=85,
+        scenarios=["150tg", "control"],
+        location="global",
+        number_of_clusters=3,
+        **kwargs
+    )
@@ -0,0 +1,82 @@
+"""
+Tests the batched version of the upscaling model.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.batch_model import (
+    batch_determine_average_productivity,
+    batch_harvest_dfs,
+    batch_seaweed_growth,
+)
+from src.scaleup_model import SeaweedScaleUpModel
+
+
+def test_batch_seaweed_growth_matches_single_runs():
+    """
+    Tests if the batched runs give the same results as running
+    the clusters one after another
+    """
+    models = [
+        SeaweedScaleUpModel("data" + os.sep + "global" + os.sep + "150tg", cluster, 1000, 20)
+        for cluster in (1, 3)
+    ]
+    max_areas = [5000, 20000]
+    records = batch_seaweed_growth(
+        [model.growth_timeseries for model in models],
+        initial_seaweed=10000,
+        initial_area_built=100,
+        initial_area_used=100,
+        new_module_area_per_day=100,
+        min_density=1200,
+        max_density=3600,
+        max_area=max_areas,
+        optimal_growth_rate=30,
+        harvest_loss=20,
+        initial_lag=0,
+        percent_usable_for_growth=85,
+        days_to_run=1000,
+    )
+    for model, max_area, batch_df in zip(models, max_areas, batch_harvest_dfs(records)):
+        harvest_df = model.seaweed_growth(
+            initial_seaweed=10000,
+            initial_area_built=100,
+            initial_area_used=100,
+            new_module_area_per_day=100,
+            min_density=1200,
+            max_density=3600,
+            max_area=max_area,
+            optimal_growth_rate=30,
+            growth_rate_fraction=model.growth_timeseries,
+            initial_lag=0,
+            percent_usable_for_growth=85,
+            days_to_run=1000,
+        )
+        pd.testing.assert_frame_equal(batch_df, harvest_df, rtol=1e-9)
+
+
+def test_batch_determine_productivity():
+    """
+    Tests if the batched calibration gives the same productivity as
+    the single calibration and NaN for unproductive runs
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 2, 1000, 20
+    )
+    productivity_day_km2 = batch_determine_average_productivity(
+        [0.5, 0.0, 0.2],
+        days_to_run=300,
+        percent_usable_for_growth=50,
+        optimal_growth_rate=30,
+        harvest_loss=20,
+    )
+    assert productivity_day_km2[0] == pytest.approx(
+        model.determine_average_productivity(0.5, 300, 50, 30)
+    )
+    assert np.isnan(productivity_day_km2[1])
+    assert productivity_day_km2[2] == pytest.approx(
+        model.determine_average_productivity(0.2, 300, 50, 30)
+    )
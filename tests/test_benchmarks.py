@@ -0,0 +1,45 @@
+"""
+Tests the synthetic data and the comparison of the benchmarks.
+"""
+import numpy as np
+import pytest
+
+from benchmarks.run_benchmarks import compare, relative_results
+from benchmarks.synthetic import GROWTH_KINDS, clustered_growth_table, growth_timeseries
+
+
+@pytest.mark.parametrize("kind", GROWTH_KINDS)
+def test_growth_timeseries(kind):
+    """
+    Tests if the synthetic growth is reproducible, between 0 and 1 and
+    constant within a month
+    """
+    growth = growth_timeseries(kind, 1000)
+    values = np.asarray(growth.values)
+    assert len(values) == 1000
+    assert values.min() >= 0 and values.max() <= 1
+    assert np.array_equal(values, np.asarray(growth_timeseries(kind, 1000).values))
+    assert (values[:30] == values[0]).all()
+    if kind != "constant":
+        assert values.std() > 0
+    growth_df = clustered_growth_table(kind, 4, 24, cells_per_cluster=3)
+    assert growth_df.shape == (12, 25)
+    assert list(growth_df["cluster"].unique()) == [0, 1, 2, 3]
+
+
+def test_compare():
+    """
+    Tests if only losses of throughput relative to the reference and increases
+    of memory beyond the thresholds are regressions
+    """
+    baselines = {"case": {"relative_throughput": 0.5, "peak_memory_bytes": 1000}}
+    reference = {"throughput": 200.0}
+    result = {"throughput": 80.0, "unit": "days per second", "peak_memory_bytes": 1400}
+    results = relative_results({"case": result, "new": result}, reference)
+    assert results["case"]["relative_throughput"] == 0.4
+    assert compare(results, baselines) == []
+    # A slower machine is slower in the reference too
+    assert compare(relative_results({"case": result}, {"throughput": 160.0}), baselines) == []
+    result["throughput"] = 70.0
+    result["peak_memory_bytes"] = 1600
+    assert len(compare(relative_results({"case": result}, reference), baselines)) == 2
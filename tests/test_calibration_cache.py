@@ -0,0 +1,65 @@
+"""
+Tests the cache for the productivity calibration.
+"""
+import os
+
+import pytest
+
+from src.calibration_cache import CalibrationCache
+from src.scaleup_model import SeaweedScaleUpModel
+
+
+def test_calibration_cache_reuses_productivity(tmp_path):
+    """
+    Tests if a cached calibration gives the same productivity and
+    is found again by a new cache with the same directory
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 2, 1000, 20
+    )
+    cache = CalibrationCache(tmp_path)
+    productivity_day_km2 = model.determine_average_productivity(
+        0.5, 100, 50, 30, cache=cache
+    )
+    assert cache.stats() == {"hits": 0, "misses": 1, "entries": 1}
+    assert model.determine_average_productivity(
+        0.5, 100, 50, 30, cache=cache
+    ) == productivity_day_km2
+    assert cache.hits == 1
+    new_cache = CalibrationCache(tmp_path)
+    assert new_cache.get(new_cache.key(0.5, 100, 50, 30, 20)) == (
+        True,
+        pytest.approx(productivity_day_km2),
+    )
+    # Unproductive calibrations are cached as well
+    assert model.determine_average_productivity(0.0, 100, 50, 30, cache=cache) is None
+    assert cache.get(cache.key(0.0, 100, 50, 30, 20)) == (True, None)
+
+
+def test_calibration_cache_key():
+    """
+    Tests if the key changes with every input of the calibration
+    """
+    key = CalibrationCache.key(0.5, 500, 85, 30, 20)
+    assert key == CalibrationCache.key(0.5, 500, 85.0, 30.0, 20.0)
+    assert key != CalibrationCache.key(0.51, 500, 85, 30, 20)
+    assert key != CalibrationCache.key(0.5, 500, 85, 30, 25)
+    assert key != CalibrationCache.key(0.5, 500, 85, 30, 20, min_density=1000)
+    assert key != CalibrationCache.key([0.5] * 500, 500, 85, 30, 20)
+
+
+def test_calibration_cache_eviction(tmp_path):
+    """
+    Tests if the least recently used entries are removed
+    """
+    cache = CalibrationCache(tmp_path, max_entries=2, max_disk_entries=3)
+    for entry in range(3):
+        cache.put(str(entry), float(entry))
+        # Make sure the entries are ordered even on file systems with a coarse clock
+        os.utime(cache.path(str(entry)), (entry, entry))
+    cache.put("3", 3.0)
+    assert list(cache.entries) == ["2", "3"]
+    assert len(os.listdir(tmp_path)) == 3
+    assert cache.get("0") == (False, None)
+    assert cache.get("1") == (True, 1.0)
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 2}
@@ -0,0 +1,72 @@
+"""
+Tests the checkpoints of the scale-up model.
+"""
+import json
+import os
+
+import pytest
+
+from src.checkpoint import SimulationState, checkpoint_path, load_checkpoint
+from src.scaleup_model import SeaweedScaleUpModel
+from tests.conftest import run_global_model
+
+
+@pytest.mark.parametrize("first_days", [1, 40, 65, 66, 300])
+@pytest.mark.parametrize("event_driven", [False, True])
+def test_continue_from_state(first_days, event_driven):
+    """
+    Tests if continuing a run from its state gives the same results
+    as the uninterrupted run
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 3, 1000, 20
+    )
+    parameters = dict(
+        initial_seaweed=10000,
+        initial_area_built=100,
+        initial_area_used=100,
+        new_module_area_per_day=100,
+        min_density=1200,
+        max_density=3600,
+        max_area=5000,
+        optimal_growth_rate=30,
+        growth_rate_fraction=model.growth_timeseries,
+        initial_lag=0,
+        percent_usable_for_growth=85,
+        event_driven=event_driven,
+    )
+    harvest_df = model.seaweed_growth(days_to_run=500, **parameters)
+    first_df = model.seaweed_growth(days_to_run=first_days, **parameters)
+    state = SimulationState.from_harvest_df(first_df, 5000, 0)
+    # The state survives being saved as json
+    state = SimulationState.from_dict(json.loads(json.dumps(state.to_dict())))
+    assert state.day == first_days
+    continued_df = model.seaweed_growth(
+        days_to_run=500, initial_state=state, **parameters
+    )
+    assert list(continued_df.index) == list(range(first_days, 500))
+    assert continued_df.equals(
+        harvest_df.loc[first_days:, list(continued_df.columns)]
+    )
+    assert SimulationState.from_harvest_df(
+        continued_df, 5000, 0, initial_state=state
+    ) == SimulationState.from_harvest_df(harvest_df, 5000, 0)
+
+
+def test_run_model_checkpoints(workspace):
+    """
+    Tests if extending the days of a run with checkpoints gives the
+    same results as running all days at once
+    """
+    cluster_results = workspace / "results" / "global" / "150tg"
+    run_global_model(days_to_run=400, csv_export=True)
+    harvest = (cluster_results / "harvest_df_cluster_3.csv").read_text()
+    run_global_model(days_to_run=250, csv_export=True, checkpoints=True)
+    with open(checkpoint_path("global", "150tg", 3)) as checkpoint:
+        assert json.load(checkpoint)["state"]["day"] == 250
+    run_global_model(days_to_run=400, csv_export=True, checkpoints=True)
+    assert (cluster_results / "harvest_df_cluster_3.csv").read_text() == harvest
+    with open(checkpoint_path("global", "150tg", 3)) as checkpoint:
+        assert json.load(checkpoint)["state"]["day"] == 400
+    # Checkpoints of other runs are not used
+    assert load_checkpoint(checkpoint_path("global", "150tg", 3), "other") is None
@@ -0,0 +1,226 @@
+"""
+Tests the event-driven scale-up model.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.event_model import (
+    area_saturated,
+    build_farm_area,
+    day_budget,
+    event_seaweed_growth,
+    need_satisfied,
+)
+from src.scaleup_model import SeaweedScaleUpModel
+
+# Parameters of a run in which the maximum area is reached
+GROWTH_PARAMETERS = dict(
+    initial_seaweed=10000,
+    initial_area_built=100,
+    initial_area_used=100,
+    new_module_area_per_day=100,
+    min_density=1200,
+    max_density=3600,
+    max_area=5000,
+    optimal_growth_rate=30,
+    initial_lag=0,
+    percent_usable_for_growth=85,
+    days_to_run=1000,
+)
+
+
+@pytest.mark.parametrize(
+    "growth_rate_fraction, new_module_area_per_day, max_area, initial_lag",
+    [
+        (None, 100, 1000, 0),
+        (None, 100, 1e7, 30),
+        (0.5, 0, 1, 0),
+        (0.0, 100, 1000, 0),
+    ],
+)
+def test_event_model_matches_daily_model(
+    growth_rate_fraction, new_module_area_per_day, max_area, initial_lag
+):
+    """
+    Tests if jumping from harvest to harvest gives exactly the same
+    results as simulating every day
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 2, 1000, 20
+    )
+    if growth_rate_fraction is None:
+        growth_rate_fraction = model.growth_timeseries
+    parameters = dict(
+        initial_seaweed=10000,
+        initial_area_built=100,
+        initial_area_used=100,
+        new_module_area_per_day=new_module_area_per_day,
+        min_density=1200,
+        max_density=3600,
+        max_area=max_area,
+        optimal_growth_rate=30,
+        growth_rate_fraction=growth_rate_fraction,
+        initial_lag=initial_lag,
+        percent_usable_for_growth=85,
+        days_to_run=1000,
+    )
+    harvest_df = model.seaweed_growth(**parameters)
+    harvest_df_event = model.seaweed_growth(event_driven=True, **parameters)
+    assert list(harvest_df_event.columns) == list(harvest_df.columns)
+    assert harvest_df_event.equals(harvest_df)
+
+
+@pytest.mark.parametrize("max_density", [300, 3600])
+def test_event_model_unshaded_growth(max_density):
+    """
+    Tests if solving the days until self shading directly gives exactly the
+    same results as simulating every day, also over many months
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 3, 1000, 20
+    )
+    parameters = dict(
+        GROWTH_PARAMETERS,
+        initial_seaweed=1,
+        min_density=100,
+        max_density=max_density,
+        optimal_growth_rate=10,
+        growth_rate_fraction=model.growth_timeseries,
+    )
+    harvest_df = model.seaweed_growth(**parameters)
+    assert harvest_df["current_density"].iloc[:90].lt(min(400, max_density)).all()
+    assert harvest_df["harvest_intervall"].notna().any()
+    harvest_df_event = model.seaweed_growth(event_driven=True, **parameters)
+    assert harvest_df_event.equals(harvest_df)
+
+
+def test_event_model_harvest_events():
+    """
+    Tests if the harvest events are the harvest days of the daily model
+    """
+    parameters = dict(
+        initial_seaweed=10000,
+        initial_area_built=100,
+        initial_area_used=100,
+        new_module_area_per_day=100,
+        min_density=1200,
+        max_density=3600,
+        max_area=1000,
+        optimal_growth_rate=30,
+        harvest_loss=20,
+        initial_lag=0,
+        percent_usable_for_growth=85,
+        days_to_run=365,
+    )
+    harvest_df = event_seaweed_growth(0.5, **parameters)
+    harvest_events = event_seaweed_growth(0.5, daily=False, **parameters)
+    harvest_days = harvest_df.index[harvest_df["harvest_intervall"].notna()]
+    assert list(harvest_events.index) == list(harvest_days)
+    assert harvest_events["harvest_intervall"].sum() == harvest_days[-1]
+    assert np.array_equal(
+        harvest_events.to_numpy(dtype=float),
+        harvest_df.loc[harvest_days, list(harvest_events.columns)].to_numpy(),
+        equal_nan=True,
+    )
+
+
+def test_build_farm_area():
+    """
+    Tests if nothing is built without new module area or if the
+    maximum area is already built
+    """
+    new_module_area, area_built, max_area_day = build_farm_area(
+        initial_area_built=1,
+        new_module_area_per_day=0,
+        max_area=3.5,
+        initial_lag=1,
+        percent_usable_for_growth=100,
+        days_to_run=6,
+    )
+    assert np.array_equal(area_built, [1, 1, 1, 1, 1, 1])
+    assert max_area_day is None
+    new_module_area, area_built, max_area_day = build_farm_area(
+        initial_area_built=1,
+        new_module_area_per_day=100,
+        max_area=1,
+        initial_lag=1,
+        percent_usable_for_growth=100,
+        days_to_run=6,
+    )
+    assert np.array_equal(area_built, [1, 1, 1, 1, 1, 1])
+    assert np.array_equal(new_module_area, [0, 0, 0, 0, 0, 0])
+    assert max_area_day == 2
+
+
+def test_iter_seaweed_growth():
+    """
+    Tests if the records of a complete run give the dataframe
+    of seaweed_growth
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 3, 1000, 20
+    )
+    harvest_df = model.seaweed_growth(
+        growth_rate_fraction=model.growth_timeseries, **GROWTH_PARAMETERS
+    )
+    records = list(
+        model.iter_seaweed_growth(
+            growth_rate_fraction=model.growth_timeseries, **GROWTH_PARAMETERS
+        )
+    )
+    assert [record["day"] for record in records] == list(range(1000))
+    assert pd.DataFrame(records).set_index("day").rename_axis(None).equals(harvest_df)
+    harvests = list(
+        model.iter_seaweed_growth(
+            growth_rate_fraction=model.growth_timeseries,
+            harvests_only=True,
+            **GROWTH_PARAMETERS
+        )
+    )
+    assert [record["day"] for record in harvests] == list(
+        harvest_df.index[harvest_df["harvest_intervall"].notna()]
+    )
+
+
+def test_iter_seaweed_growth_stop():
+    """
+    Tests if the run ends on the day a stop condition is met
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 3, 1000, 20
+    )
+    harvest_df = model.seaweed_growth(
+        growth_rate_fraction=model.growth_timeseries, **GROWTH_PARAMETERS
+    )
+    records = list(
+        model.iter_seaweed_growth(
+            growth_rate_fraction=model.growth_timeseries,
+            stop=area_saturated(5000),
+            **GROWTH_PARAMETERS
+        )
+    )
+    assert records[-1]["day"] == (harvest_df["current_area_built"] >= 5000).idxmax()
+    saturation_day = records[-1]["day"]
+    for days in [saturation_day - 10, saturation_day + 10]:
+        records = list(
+            model.iter_seaweed_growth(
+                growth_rate_fraction=model.growth_timeseries,
+                stop=[day_budget(days), area_saturated(5000)],
+                **GROWTH_PARAMETERS
+            )
+        )
+        assert len(records) == min(days, saturation_day + 1)
+    seaweed_need = 100000
+    records = list(
+        model.iter_seaweed_growth(
+            growth_rate_fraction=model.growth_timeseries,
+            harvests_only=True,
+            stop=need_satisfied(seaweed_need),
+            **GROWTH_PARAMETERS
+        )
+    )
+    daily_harvest = harvest_df["harvest_for_food"] / harvest_df["harvest_intervall"]
+    assert records[-1]["day"] == (daily_harvest >= seaweed_need).idxmax()
@@ -0,0 +1,168 @@
+"""
+Tests running the model for every grid cell.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.grid_model import GRID_COLUMNS, GRID_RESULTS_FILE, cell_growth, run_grid_model
+from src.preprocessing import convert_growth_model_output, growth_model_path
+from src.scaleup_model import run_model
+from tests.conftest import REPOSITORY
+
+PARAMETERS = dict(
+    optimal_growth_rate=30,
+    days_to_run=400,
+    global_pop=8000000000,
+    calories_per_person_per_day=2100,
+    harvest_loss=20,
+    food_waste=13,
+    calories_per_t_seaweed_wet=288200,
+    food_limit=0.15,
+    feed_limit=0.05,
+    biofuel_limit=0.25,
+    percent_usable_for_growth=85,
+)
+
+
+def median_cells(scenario):
+    """
+    Grid cells with the same monthly growth as the clusters of a scenario,
+    in the format of the growth model, and the daily growth of the clusters
+    """
+    all_clusters_daily = pd.read_csv(
+        os.path.join(
+            REPOSITORY, "data", "global", scenario, "actual_growth_rate_by_cluster.csv"
+        ),
+        index_col=0,
+    )
+    growth_df = pd.DataFrame(all_clusters_daily.iloc[::30].to_numpy().T)
+    growth_df["cluster"] = range(len(growth_df))
+    return growth_df, all_clusters_daily
+
+
+def test_run_grid_model(tmp_path, monkeypatch):
+    """
+    Tests if grid cells with the growth of a cluster give the same results
+    as the cluster, in chunks of any size and in parallel
+    """
+    monkeypatch.chdir(tmp_path)
+    scenarios = ["150tg", "control"]
+    growth_data = {}
+    all_clusters_daily = {}
+    for scenario in scenarios:
+        growth_data[scenario], all_clusters_daily[scenario] = median_cells(scenario)
+    grid_results = run_grid_model(
+        **PARAMETERS, scenarios=scenarios, location="global", growth_data=growth_data,
+        persist=False,
+    )
+    results = run_model(
+        **PARAMETERS, scenarios=scenarios, location="global", number_of_clusters=3,
+        engine="batch", growth_data=all_clusters_daily, persist=False,
+        return_results=True,
+    )
+    assert os.listdir(tmp_path) == []
+    for scenario in scenarios:
+        cell_results = grid_results[scenario]
+        assert list(cell_results.columns) == GRID_COLUMNS
+        assert list(cell_results["cluster"]) == [0, 1, 2]
+        for cell, cluster in enumerate(range(1, 4)):
+            if cluster not in results[scenario]:
+                assert cell_results.loc[cell, GRID_COLUMNS[2:]].isna().all()
+                continue
+            harvest_df = results[scenario][cluster]
+            if "harvest_for_food" in harvest_df:
+                assert cell_results.loc[cell, "days_to_productivity"] == (
+                    harvest_df["harvest_for_food"].first_valid_index()
+                )
+            else:
+                assert np.isnan(cell_results.loc[cell, "days_to_productivity"])
+            assert cell_results.loc[cell, "harvests"] == (
+                harvest_df["harvest_intervall"].notna().sum()
+            )
+            assert cell_results.loc[cell, "max_area"] == pytest.approx(
+                harvest_df["max_area"].iloc[0], rel=1e-12
+            )
+            assert cell_results.loc[cell, "cumulative_harvest_for_food"] == pytest.approx(
+                harvest_df["cumulative_harvest_for_food"].iloc[-1], rel=1e-12
+            )
+    assert grid_results["150tg"]["days_to_productivity"].notna().any()
+    for kwargs in [dict(chunk_cells=1), dict(chunk_cells=2, jobs=2)]:
+        other_results = run_grid_model(
+            **PARAMETERS, scenarios=scenarios, location="global",
+            growth_data=growth_data, persist=False, **kwargs
+        )
+        for scenario in scenarios:
+            assert other_results[scenario].equals(grid_results[scenario])
+
+
+def test_run_grid_model_files(tmp_path, monkeypatch):
+    """
+    Tests if the grid cells are read from the pickle and the columnar format
+    of the growth model and their results are saved with the grid cells
+    """
+    monkeypatch.chdir(tmp_path)
+    growth_df, _ = median_cells("150tg")
+    growth_df.index = pd.MultiIndex.from_tuples(
+        [(-10.5, 20.5), (-10.5, 21.5), (12.5, 20.5)], names=["lat", "lon"]
+    )
+    # The first month is left out and the months are not sorted in the pickle
+    growth_df.insert(0, -1, 0.0)
+    growth_df = growth_df[[-1, "cluster"] + list(range(len(growth_df.columns) - 2))[::-1]]
+    os.makedirs(tmp_path / "data" / "global" / "150tg")
+    os.makedirs(tmp_path / "results" / "global" / "150tg")
+    growth_df.to_pickle(growth_model_path("150tg", "global"))
+    monthly_growth = cell_growth("150tg", "global")
+    assert list(monthly_growth.columns) == list(range(len(growth_df.columns) - 2)) + ["cluster"]
+    assert monthly_growth.index.equals(growth_df.index)
+    cell_results = run_grid_model(**PARAMETERS, scenarios=["150tg"], location="global")["150tg"]
+    assert cell_results.index.equals(growth_df.index)
+    saved = pd.read_csv(
+        os.path.join("results", "global", "150tg", GRID_RESULTS_FILE), index_col=[0, 1]
+    )
+    assert np.allclose(saved, cell_results, equal_nan=True)
+    convert_growth_model_output("150tg", "global")
+    os.remove(growth_model_path("150tg", "global"))
+    columnar_growth = cell_growth("150tg", "global")
+    assert columnar_growth.equals(monthly_growth)
+    columnar_results = run_grid_model(
+        **PARAMETERS, scenarios=["150tg"], location="global", persist=False
+    )["150tg"]
+    assert columnar_results.index.equals(growth_df.index)
+    assert columnar_results.equals(cell_results)
+
+
+def test_cell_growth_index(tmp_path, monkeypatch):
+    """
+    Tests if the grid cells of the growth model keep their coordinates
+    when they are read from the columnar format
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(tmp_path / "data" / "AUS" / "150tg")
+    os.symlink(
+        os.path.join(REPOSITORY, "data", "AUS", "150tg", "seaweed_growth_rate_clustered_AUS.pkl"),
+        growth_model_path("150tg", "AUS"),
+    )
+    growth_df = cell_growth("150tg", "AUS", starting_month=1)
+    assert isinstance(growth_df.index, pd.MultiIndex)
+    convert_growth_model_output("150tg", "AUS")
+    os.remove(growth_model_path("150tg", "AUS"))
+    assert cell_growth("150tg", "AUS", starting_month=1).equals(growth_df)
+
+
+def test_run_grid_model_too_short(tmp_path, monkeypatch):
+    """
+    Tests if running longer than the growth of the grid cells gives a clear error
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(tmp_path / "data" / "AUS" / "150tg")
+    os.symlink(
+        os.path.join(REPOSITORY, "data", "AUS", "150tg", "seaweed_growth_rate_clustered_AUS.pkl"),
+        growth_model_path("150tg", "AUS"),
+    )
+    # The growth model covers 33 months from month 0 on
+    parameters = dict(PARAMETERS, days_to_run=1020)
+    with pytest.raises(ValueError, match="33 months of 30 days"):
+        run_grid_model(**parameters, scenarios=["150tg"], location="AUS", persist=False)
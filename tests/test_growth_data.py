@@ -0,0 +1,101 @@
+"""
+Tests loading and caching the growth data.
+"""
+import os
+
+import numpy as np
+
+import pandas as pd
+
+from src.growth_data import (
+    GrowthDataCache,
+    load_cluster_growth,
+    load_scenario_growth,
+    scenario_growth_from_memory,
+)
+from src.preprocessing import (
+    DAILY_GROWTH_FILE,
+    monthly_segments,
+    monthly_to_daily,
+    write_growth_arrays,
+    write_growth_segments,
+)
+from src.scaleup_model import SeaweedScaleUpModel
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_load_scenario_growth(tmp_path):
+    """
+    Tests if all files give the same timeseries for every cluster
+    """
+    path = os.path.join(REPOSITORY, "data", "global", "150tg")
+    os.symlink(os.path.join(path, DAILY_GROWTH_FILE), tmp_path / DAILY_GROWTH_FILE)
+    scenario_growth = load_scenario_growth(str(tmp_path))
+    assert sorted(scenario_growth) == [1, 2, 3]
+    write_growth_segments(str(tmp_path))
+    scenario_growth_segments = load_scenario_growth(str(tmp_path))
+    write_growth_arrays(str(tmp_path))
+    scenario_growth_arrays = load_scenario_growth(str(tmp_path))
+    for cluster in range(1, 4):
+        values = load_cluster_growth(path, cluster).values
+        assert scenario_growth[cluster].name == "growth_daily_cluster_" + str(cluster)
+        assert np.array_equal(scenario_growth[cluster].values, values)
+        assert np.array_equal(scenario_growth_segments[cluster].values, values)
+        assert np.array_equal(scenario_growth_arrays[cluster].values, values)
+
+
+def test_growth_data_cache():
+    """
+    Tests if every scenario is only loaded once and the least recently
+    used scenarios are removed
+    """
+    growth_data_cache = GrowthDataCache(max_scenarios=1)
+    models = [
+        SeaweedScaleUpModel(
+            os.path.join("data", "global", scenario), cluster, 1000, 20, growth_data_cache
+        )
+        for scenario in ["150tg", "control"]
+        for cluster in range(1, 4)
+    ]
+    assert growth_data_cache.stats() == {"hits": 4, "misses": 2, "entries": 1}
+    assert models[0].growth_timeseries.values.base is models[1].growth_timeseries.values.base
+    assert np.array_equal(
+        models[4].growth_timeseries.values,
+        SeaweedScaleUpModel(
+            os.path.join("data", "global", "control"), 2, 1000, 20
+        ).growth_timeseries.values,
+    )
+    growth_data_cache.get(os.path.join("data", "global", "150tg"), 1)
+    assert list(growth_data_cache.scenarios) == [
+        os.path.abspath(os.path.join("data", "global", "150tg"))
+    ]
+
+
+def test_scenario_growth_from_memory():
+    """
+    Tests if growth prepared in memory gives the same timeseries in every
+    format and is used by the cache instead of the files
+    """
+    monthly_growth = pd.DataFrame(np.random.default_rng(0).uniform(size=(3, 24)))
+    all_clusters_daily = monthly_to_daily(monthly_growth, 30)
+    scenario_growth = scenario_growth_from_memory(all_clusters_daily)
+    scenario_growth_segments = scenario_growth_from_memory(
+        monthly_segments(monthly_growth, 30)
+    )
+    scenario_growth_arrays = scenario_growth_from_memory(
+        {cluster: all_clusters_daily.iloc[:, cluster - 1].to_numpy() for cluster in range(1, 4)}
+    )
+    assert sorted(scenario_growth) == [1, 2, 3]
+    for cluster in range(1, 4):
+        values = np.repeat(monthly_growth.loc[cluster - 1].to_numpy(), 30)
+        assert np.array_equal(scenario_growth[cluster].values, values)
+        assert np.array_equal(scenario_growth_segments[cluster].values, values)
+        assert np.array_equal(scenario_growth_arrays[cluster].values, values)
+    growth_data_cache = GrowthDataCache()
+    growth_data_cache.add(os.path.join("data", "global", "150tg"), scenario_growth)
+    model = SeaweedScaleUpModel(
+        os.path.join("data", "global", "150tg"), 2, 1000, 20, growth_data_cache
+    )
+    assert model.growth_timeseries is scenario_growth[2]
+    assert growth_data_cache.stats() == {"hits": 1, "misses": 0, "entries": 0}
@@ -0,0 +1,91 @@
+"""
+Tests the growth timeseries.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from src.growth_timeseries import GrowthTimeseries
+from src.scaleup_model import SeaweedScaleUpModel
+
+
+def test_growth_timeseries_statistics():
+    """
+    Tests if the statistics and segments of the timeseries are correct
+    """
+    growth_timeseries = GrowthTimeseries([0.2] * 30 + [0.4] * 30 + [0.1] * 15)
+    assert len(growth_timeseries) == 75
+    assert growth_timeseries[31] == 0.4
+    assert growth_timeseries.mean == pytest.approx(0.26)
+    assert growth_timeseries.min == 0.1
+    assert growth_timeseries.max == 0.4
+    assert growth_timeseries.monthly_segments == [
+        (0, 30, 0.2),
+        (30, 30, 0.4),
+        (60, 15, 0.1),
+    ]
+    assert np.asarray(growth_timeseries).dtype == float
+    with pytest.raises(ValueError):
+        growth_timeseries.values[0] = 0.5
+
+
+def test_growth_timeseries_validation():
+    """
+    Tests if invalid growth rate fractions are rejected
+    """
+    with pytest.raises(ValueError):
+        GrowthTimeseries([0.2, 1.5])
+    with pytest.raises(ValueError):
+        GrowthTimeseries([0.2, np.nan])
+    with pytest.raises(ValueError):
+        GrowthTimeseries([[0.2, 0.3]])
+
+
+def test_growth_timeseries_in_model():
+    """
+    Tests if the loaded timeseries gives the same results as a list
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 2, 1000, 20
+    )
+    assert isinstance(model.growth_timeseries, GrowthTimeseries)
+    parameters = dict(
+        initial_seaweed=10000,
+        initial_area_built=100,
+        initial_area_used=100,
+        new_module_area_per_day=100,
+        min_density=1200,
+        max_density=3600,
+        max_area=1000,
+        optimal_growth_rate=30,
+        initial_lag=0,
+        percent_usable_for_growth=85,
+        days_to_run=365,
+    )
+    harvest_df = model.seaweed_growth(
+        growth_rate_fraction=model.growth_timeseries, **parameters
+    )
+    harvest_df_list = model.seaweed_growth(
+        growth_rate_fraction=list(model.growth_timeseries.values), **parameters
+    )
+    assert harvest_df.equals(harvest_df_list)
+
+
+def test_growth_timeseries_from_segments():
+    """
+    Tests if a timeseries from segments is the same as the daily values
+    """
+    growth_timeseries = GrowthTimeseries.from_segments(
+        [30, 30, 0, 15], [0.2, 0.2, 0.3, 0.1], name="growth_daily_cluster_1"
+    )
+    assert len(growth_timeseries) == 75
+    assert growth_timeseries.monthly_segments == [(0, 60, 0.2), (60, 15, 0.1)]
+    # The daily values are only created when needed
+    assert "values" not in vars(growth_timeseries)
+    assert np.array_equal(growth_timeseries.values, [0.2] * 60 + [0.1] * 15)
+    assert growth_timeseries.mean == GrowthTimeseries([0.2] * 60 + [0.1] * 15).mean
+    with pytest.raises(ValueError):
+        GrowthTimeseries.from_segments([30, 30], [0.2, 1.5])
+    with pytest.raises(ValueError):
+        GrowthTimeseries.from_segments([30], [0.2, 0.3])
@@ -0,0 +1,56 @@
+"""
+Tests the instrumentation of the model.
+"""
+import io
+import json
+import logging
+
+from src.instrumentation import LOGGER_NAME, RunReport, enable_logging
+from tests.conftest import run_global_model
+
+
+def test_run_model_quiet(workspace, capsys):
+    """
+    Tests if the model does not print anything unless logging is enabled,
+    and logs the same messages in the same order in parallel runs
+    """
+    run_global_model()
+    assert capsys.readouterr().out == ""
+    logger = logging.getLogger(LOGGER_NAME)
+    output = io.StringIO()
+    handler = enable_logging(stream=output)
+    try:
+        run_global_model(force=True)
+        serial_output = output.getvalue()
+        output.truncate(0)
+        output.seek(0)
+        run_global_model(jobs=2, force=True)
+        parallel_output = output.getvalue()
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+    assert "Running scenario 150tg" in serial_output
+    assert "done with cluster\n\n" in serial_output
+    assert parallel_output == serial_output
+
+
+def test_run_report(workspace):
+    """
+    Tests if the run report contains the phases and counters of the run
+    """
+    report = RunReport(trace_memory=True)
+    run_global_model(report=report)
+    with open(workspace / "results" / "global" / "run_report.json") as report_file:
+        saved = json.load(report_file)
+    assert set(saved["phases"]) == {"load", "calibrate", "simulate", "write"}
+    assert saved["phases"]["simulate"]["calls"] == saved["counters"]["clusters_simulated"]
+    assert (
+        saved["counters"]["days_simulated"]
+        == 400 * saved["counters"]["clusters_simulated"]
+    )
+    assert saved["counters"]["harvest_events"] > 0
+    assert saved["peak_memory_bytes"] > 0
+    parallel_report = RunReport()
+    run_global_model(jobs=2, force=True, report=parallel_report)
+    assert parallel_report.counters == report.counters
+    assert parallel_report.peak_memory is None
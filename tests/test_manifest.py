@@ -0,0 +1,142 @@
+"""
+Tests the manifests of the results.
+"""
+import logging
+import os
+import shutil
+
+from src.manifest import SimulationIndex, input_key, load_manifest, manifest_path
+from src.scaleup_model import MODEL_MODULES, MODEL_VERSION, model_version, run_model
+from tests.conftest import REPOSITORY, run_global_model
+
+
+def test_input_key():
+    """
+    Tests if the key changes with every input
+    """
+    key = input_key([0.5, 0.25], days_to_run=100, harvest_loss=20.0)
+    assert key == input_key([0.5, 0.25], harvest_loss=20.0, days_to_run=100)
+    assert key != input_key([0.5, 0.2], days_to_run=100, harvest_loss=20.0)
+    assert key != input_key([0.5, 0.25], days_to_run=101, harvest_loss=20.0)
+    assert input_key(0.5) != input_key(0.25)
+
+
+def test_model_version(tmp_path):
+    """
+    Tests if the model version changes with the source code of the model
+    """
+    for module in MODEL_MODULES:
+        shutil.copy(os.path.join(REPOSITORY, "src", module), tmp_path)
+    assert model_version(str(tmp_path)) == MODEL_VERSION
+    with open(tmp_path / MODEL_MODULES[-1], "a") as source:
+        source.write("\n")
+    assert model_version(str(tmp_path)) != MODEL_VERSION
+
+
+def logged(caplog):
+    """
+    Takes the messages logged so far
+    """
+    messages = "\n".join(caplog.messages)
+    caplog.clear()
+    return messages
+
+
+def test_run_model_skips_unchanged(workspace, caplog):
+    """
+    Tests if clusters are only run again if their inputs changed
+    or if this is forced
+    """
+    caplog.set_level(logging.INFO, logger="src")
+    results = workspace / "results" / "global" / "150tg"
+    run_global_model(csv_export=True)
+    harvest = (results / "harvest_df_cluster_3.csv").read_text()
+    assert load_manifest(manifest_path("global", "150tg", 3))["outputs"]
+    logged(caplog)
+    run_global_model(csv_export=True)
+    output = logged(caplog)
+    assert output.count("did not change") == 6
+    assert "calculating yield" not in output
+    assert (results / "harvest_df_cluster_3.csv").read_text() == harvest
+    run_global_model(csv_export=True, force=True)
+    assert "did not change" not in logged(caplog)
+    run_global_model(days_to_run=401, csv_export=True)
+    assert "did not change" not in logged(caplog)
+    assert (results / "harvest_df_cluster_3.csv").read_text() != harvest
+    # Missing results are made again
+    run_global_model(csv_export=True)
+    os.remove(results / "harvest_df_cluster_3.npz")
+    logged(caplog)
+    run_global_model(csv_export=True)
+    assert logged(caplog).count("did not change") == 5
+    assert (results / "harvest_df_cluster_3.csv").read_text() == harvest
+
+
+def test_run_model_same_growth(tmp_path, monkeypatch, caplog):
+    """
+    Tests if a scenario with the same growth as another takes over its results
+    """
+    caplog.set_level(logging.INFO, logger="src")
+    os.makedirs(tmp_path / "data" / "global")
+    for scenario in ["150tg", "copy"]:
+        os.symlink(
+            os.path.join(REPOSITORY, "data", "global", "150tg"),
+            tmp_path / "data" / "global" / scenario,
+        )
+        os.makedirs(tmp_path / "results" / "global" / scenario)
+    monkeypatch.chdir(tmp_path)
+    run_model(
+        optimal_growth_rate=30,
+        days_to_run=400,
+        global_pop=8000000000,
+        calories_per_person_per_day=2100,
+        harvest_loss=20,
+        food_waste=13,
+        calories_per_t_seaweed_wet=288200,
+        food_limit=0.15,
+        feed_limit=0.05,
+        biofuel_limit=0.25,
+        percent_usable_for_growth=85,
+        scenarios=["150tg", "copy"],
+        location="global",
+        number_of_clusters=3,
+        csv_export=True,
+    )
+    output = logged(caplog)
+    productive_clusters = output.count("calculating yield") // 2
+    assert output.count("taking over its results") == productive_clusters > 0
+    results = tmp_path / "results" / "global"
+    for name in os.listdir(results / "150tg"):
+        if name.endswith(".csv"):
+            assert (results / "copy" / name).read_text() == (
+                results / "150tg" / name
+            ).read_text()
+
+
+def test_simulation_index(workspace):
+    """
+    Tests if the index finds the clusters by their inputs and does not
+    give the results of a cluster that was run with other inputs since
+    """
+    run_global_model()
+    index = SimulationIndex("global")
+    manifest = load_manifest(manifest_path("global", "150tg", 3))
+    assert index.find(manifest["simulation_key"]) == manifest["outputs"][0]
+    assert index.find("unknown") is None
+    run_global_model(days_to_run=401)
+    assert index.find(manifest["simulation_key"]) is None
+    index.add(manifest_path("global", "150tg", 3), "unknown")
+    assert index.find("unknown") is None
+
+
+def test_batch_engine_warns(workspace, caplog):
+    """
+    Tests if the batch engine warns that it does not skip unchanged clusters
+    """
+    run_global_model()
+    caplog.clear()
+    run_global_model(engine="batch", force=True)
+    warnings = [record.getMessage() for record in caplog.records if record.levelname == "WARNING"]
+    assert any("force has no effect" in message for message in warnings)
+    assert any("removed their manifests" in message for message in warnings)
+    assert load_manifest(manifest_path("global", "150tg", 3)) is None
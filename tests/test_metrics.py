@@ -0,0 +1,49 @@
+"""
+Tests the food satisfaction metrics.
+"""
+import numpy as np
+import pandas as pd
+
+from src.metrics import ROLLING_DAYS, satisfaction_metrics
+
+
+def results(harvest_days, harvests, intervalls, days=30):
+    """
+    Creates results with harvests on the given days and a need of 10 t per day
+    """
+    harvest_df = pd.DataFrame(
+        {
+            "harvest_for_food": np.nan,
+            "harvest_intervall": np.nan,
+            "seaweed_needed_per_day": 10.0,
+        },
+        index=range(days),
+    )
+    harvest_df.loc[harvest_days, "harvest_for_food"] = harvests
+    harvest_df.loc[harvest_days, "harvest_intervall"] = intervalls
+    return harvest_df
+
+
+def test_satisfaction_metrics():
+    """
+    Tests if harvests last until the next one and the satisfied need
+    is averaged over the rolling window for every series at once
+    """
+    clusters = {
+        1: results([5, 15], [50.0, 100.0], [5, 10]),
+        2: results([], [], [], days=25),
+        3: results([0], [200.0], [10]),
+    }
+    satisfied_need, mean_daily_harvest = satisfaction_metrics(clusters, 50)
+    assert list(satisfied_need.columns) == [1, 2, 3]
+    assert len(satisfied_need) == 30
+    # Before the first harvest nothing is harvested, afterwards the last harvest
+    # is divided by the length of the intervall the day belongs to
+    expected = np.array([0.0] * 5 + [10.0] + [5.0] * 9 + [10.0] * 15)
+    assert np.array_equal(mean_daily_harvest[1], expected)
+    assert mean_daily_harvest[2].isna().all()
+    assert np.array_equal(mean_daily_harvest[3], np.full(30, 20.0))
+    assert satisfied_need[1].iloc[: ROLLING_DAYS - 1].isna().all()
+    assert np.isclose(satisfied_need[1].iloc[-1], (5 * 50 + 15 * 100) / 20 * 0.5)
+    assert np.allclose(satisfied_need[3].iloc[ROLLING_DAYS - 1 :], 100.0)
+    assert satisfied_need[2].isna().all()
@@ -0,0 +1,119 @@
+"""
+Tests the plotter.
+"""
+import logging
+import os
+import subprocess
+import sys
+
+from src.plotter import create_plots, read_clusters
+from tests.conftest import REPOSITORY, run_global_model
+
+# Seconds a cold import of the model and the plotter may take
+IMPORT_TIME_BUDGET = 3.0
+
+
+def plot_in_subprocess(code, **environment):
+    """
+    Runs the code in a new Python process without MPLBACKEND, which fails if
+    anything is read from the network, e.g. a style sheet from a URL
+    Arguments:
+        code (str): the code to run, start holds the time it was started at
+        environment: variables to add to the environment of the process
+    Returns:
+        list: the words printed by the code
+    """
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "def no_network(event, args):\n"
+        "    if event in ('urllib.Request', 'socket.connect', 'socket.getaddrinfo'):\n"
+        "        raise RuntimeError('network access: ' + event)\n"
+        "sys.addaudithook(no_network)\n"
+    ) + code
+    environment = dict(
+        {k: v for k, v in os.environ.items() if k not in ("MPLBACKEND", "ALLFED_MPLSTYLE")},
+        **environment,
+    )
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPOSITORY,
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+
+
+def test_import_is_fast_and_lazy():
+    """
+    Tests if importing the model and the plotter does not import matplotlib
+    and stays within the time budget, and if the first plot uses a headless
+    backend and the ALLFED style shipped with the model
+    """
+    output = plot_in_subprocess(
+        "import src.scaleup_model, src.plotter\n"
+        "print(time.perf_counter() - start)\n"
+        "print('matplotlib' in sys.modules)\n"
+        "plt = src.plotter.pyplot()\n"
+        "print(plt.get_backend().lower())\n"
+        "print(plt.rcParams['axes.spines.top'])\n"
+    )
+    assert float(output[0]) < IMPORT_TIME_BUDGET
+    assert output[1:] == ["False", "agg", "False"]
+
+
+def test_style_override(tmp_path):
+    """
+    Tests if another style sheet can be used instead of the ALLFED style
+    """
+    style = tmp_path / "other.mplstyle"
+    style.write_text("axes.spines.top: True\n")
+    output = plot_in_subprocess(
+        "import src.plotter\n"
+        "print(src.plotter.pyplot().rcParams['axes.spines.top'])\n",
+        ALLFED_MPLSTYLE=str(style),
+    )
+    assert output == ["True"]
+
+
+def test_create_plots_in_memory(workspace):
+    """
+    Tests if plotting results in memory gives the same satisfaction as
+    plotting the results read from disk
+    """
+    # Long enough for every cluster to be harvested
+    run_global_model(days_to_run=1000)
+    scenarios = ["150tg", "control"]
+    create_plots("global", scenarios, 60, 3, with_comparison=False)
+    path = workspace / "results" / "global" / "150tg" / "food_satisfaction.csv"
+    from_disk = path.read_text()
+    results = {scenario: read_clusters("global", scenario, 3) for scenario in scenarios}
+    os.remove(path)
+    create_plots("global", scenarios, 60, 3, with_comparison=False, results=results)
+    assert path.read_text() == from_disk
+    assert (workspace / "results" / "global" / "control" / "area.png").exists()
+
+
+def test_create_plots_parallel(workspace, caplog):
+    """
+    Tests if plotting in worker processes gives the same files and log
+    messages as plotting one after another
+    """
+    caplog.set_level(logging.INFO, logger="src")
+    run_global_model(days_to_run=1000)
+    scenarios = ["150tg", "control"]
+    results = workspace / "results" / "global"
+    files = [
+        scenario + os.sep + name
+        for scenario in scenarios
+        for name in ["area.png", "food_satisfaction.png", "food_satisfaction.csv"]
+    ]
+    caplog.clear()
+    create_plots("global", scenarios, 60, 3, with_comparison=False)
+    serial_messages = caplog.messages
+    serial_files = [(results / name).read_bytes() for name in files]
+    caplog.clear()
+    create_plots("global", scenarios, 60, 3, with_comparison=False, jobs=2)
+    assert caplog.messages == serial_messages
+    assert [(results / name).read_bytes() for name in files] == serial_files
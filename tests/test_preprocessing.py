@@ -0,0 +1,186 @@
+"""
+Tests the preprocessing of the growth data.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.preprocessing import (
+    COLUMNAR_EXTENSION,
+    DAILY_GROWTH_FILE,
+    GROWTH_ARRAY_FILE,
+    GROWTH_SEGMENTS_FILE,
+    cluster_medians,
+    columnar_cluster_medians,
+    columnar_index,
+    convert_growth_model_output,
+    write_columnar_growth,
+    daily_to_segments,
+    growth_model_path,
+    main,
+    prep_data,
+    prep_scenarios,
+    segments_to_daily,
+    write_growth_arrays,
+    write_growth_segments,
+)
+from src.growth_data import load_scenario_growth
+from src.scaleup_model import SeaweedScaleUpModel
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_prep_data(tmp_path, monkeypatch):
+    """
+    Tests if the monthly growth is saved as segments and as daily values
+    """
+    monkeypatch.chdir(tmp_path)
+    path = os.path.join("data", "AUS", "150tg")
+    os.makedirs(path)
+    growth_df = pd.DataFrame(
+        [[0.1, 0.2, 0.3], [0.3, 0.4, 0.5], [0.5, 0.6, 0.7]], columns=[0, 1, 2]
+    )
+    growth_df["cluster"] = [0, 0, 1]
+    growth_df.to_pickle(os.path.join(path, "seaweed_growth_rate_clustered_AUS.pkl"))
+    prep_data("150tg", "AUS", 2, starting_month=1, max_growth=2)
+    growth_segments = pd.read_csv(os.path.join(path, GROWTH_SEGMENTS_FILE))
+    assert growth_segments.values.tolist() == [
+        [1, 0, 2, 0.3],
+        [1, 2, 2, 0.4],
+        [2, 0, 2, 0.6],
+        [2, 2, 2, 0.7],
+    ]
+    all_clusters_daily = pd.read_csv(os.path.join(path, DAILY_GROWTH_FILE), index_col=0)
+    assert all_clusters_daily.equals(segments_to_daily(growth_segments))
+    assert np.allclose(all_clusters_daily["growth_daily_cluster_1"], [0.3, 0.3, 0.4, 0.4])
+    model = SeaweedScaleUpModel(path, 2, 1000, 20)
+    assert np.array_equal(model.growth_timeseries.values, [0.6, 0.6, 0.7, 0.7])
+    # The binary file of the cluster is used without copying it
+    values = model.growth_timeseries.values
+    while not isinstance(values, np.memmap):
+        values = values.base
+    os.remove(os.path.join(path, GROWTH_ARRAY_FILE.format(2)))
+    model = SeaweedScaleUpModel(path, 2, 1000, 20)
+    assert np.array_equal(model.growth_timeseries.values, [0.6, 0.6, 0.7, 0.7])
+    # Preparing the scenario again does not leave the old files behind
+    prep_data(
+        "150tg", "AUS", 2, starting_month=2, max_growth=2, daily_csv=False, daily_arrays=False
+    )
+    assert sorted(os.listdir(path)) == sorted(
+        [GROWTH_SEGMENTS_FILE, "seaweed_growth_rate_clustered_AUS.pkl"]
+    )
+    assert np.array_equal(load_scenario_growth(path)[2].values, [0.7, 0.7])
+    prep_data("150tg", "AUS", 1, max_growth=1)
+    assert not os.path.exists(os.path.join(path, GROWTH_ARRAY_FILE.format(2)))
+    assert np.allclose(load_scenario_growth(path)[1].values, [0.2, 0.3, 0.4])
+
+
+def test_growth_segments_of_daily_data(tmp_path):
+    """
+    Tests if the segments of the bundled daily data give the same timeseries
+    """
+    path = os.path.join(REPOSITORY, "data", "global", "150tg")
+    all_clusters_daily = pd.read_csv(os.path.join(path, DAILY_GROWTH_FILE), index_col=0)
+    growth_segments = daily_to_segments(all_clusters_daily)
+    assert len(growth_segments) < len(all_clusters_daily)
+    assert segments_to_daily(growth_segments).equals(all_clusters_daily)
+    os.symlink(os.path.join(path, DAILY_GROWTH_FILE), tmp_path / DAILY_GROWTH_FILE)
+    write_growth_segments(str(tmp_path))
+    # Only the segments are left to load
+    os.remove(tmp_path / DAILY_GROWTH_FILE)
+    for cluster in range(1, 4):
+        model_daily = SeaweedScaleUpModel(path, cluster, 1000, 20)
+        model_segments = SeaweedScaleUpModel(str(tmp_path), cluster, 1000, 20)
+        assert np.array_equal(
+            model_segments.growth_timeseries.values,
+            model_daily.growth_timeseries.values,
+        )
+
+
+def test_growth_arrays_of_daily_data(tmp_path):
+    """
+    Tests if the binary files of the bundled daily data give the same timeseries
+    """
+    path = os.path.join(REPOSITORY, "data", "global", "150tg")
+    os.symlink(os.path.join(path, DAILY_GROWTH_FILE), tmp_path / DAILY_GROWTH_FILE)
+    write_growth_arrays(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [DAILY_GROWTH_FILE] + [GROWTH_ARRAY_FILE.format(cluster) for cluster in range(1, 4)]
+    )
+    for cluster in range(1, 4):
+        model_daily = SeaweedScaleUpModel(path, cluster, 1000, 20)
+        model_array = SeaweedScaleUpModel(str(tmp_path), cluster, 1000, 20)
+        assert np.array_equal(
+            model_array.growth_timeseries.values,
+            model_daily.growth_timeseries.values,
+        )
+
+
+def test_prep_scenarios(tmp_path, monkeypatch, caplog):
+    """
+    Tests if several scenarios and locations are prepared like one at a time,
+    also in parallel and from the command line
+    """
+    monkeypatch.chdir(tmp_path)
+    growth_df = pd.read_pickle(
+        os.path.join(REPOSITORY, "data", "AUS", "150tg", "seaweed_growth_rate_clustered_AUS.pkl")
+    )
+    for location, scenario in [("AUS", "150tg"), ("AUS", "5tg"), ("NZ", "150tg")]:
+        os.makedirs(os.path.join("data", location, scenario))
+        growth_df.to_pickle(growth_model_path(scenario, location))
+    prep_data("150tg", "AUS", 2)
+    expected = {
+        name: open(os.path.join("data", "AUS", "150tg", name), "rb").read()
+        for name in os.listdir(os.path.join("data", "AUS", "150tg"))
+    }
+    prepared = prep_scenarios(["150tg", "5tg"], ["AUS", "NZ"], {"AUS": 2, "NZ": 1}, jobs=2)
+    assert prepared == [("150tg", "AUS"), ("5tg", "AUS"), ("150tg", "NZ")]
+    assert "No output of the growth model for scenario 5tg in NZ" in caplog.text
+    for name, content in expected.items():
+        assert open(os.path.join("data", "AUS", "5tg", name), "rb").read() == content
+    assert not os.path.exists(os.path.join("data", "NZ", "150tg", GROWTH_ARRAY_FILE.format(2)))
+    os.remove(os.path.join("data", "AUS", "5tg", DAILY_GROWTH_FILE))
+    main(["--scenarios", "5tg", "--locations", "AUS", "--no-daily-csv"])
+    assert not os.path.exists(os.path.join("data", "AUS", "5tg", DAILY_GROWTH_FILE))
+    for name in [GROWTH_SEGMENTS_FILE, GROWTH_ARRAY_FILE.format(1)]:
+        assert open(os.path.join("data", "AUS", "5tg", name), "rb").read() == expected[name]
+
+
+def test_columnar_growth(tmp_path, monkeypatch):
+    """
+    Tests if the columnar format read in blocks of months gives the same
+    prepared files as the pickle
+    """
+    monkeypatch.chdir(tmp_path)
+    for scenario in ["pickle", "columnar"]:
+        os.makedirs(os.path.join("data", "AUS", scenario))
+        os.symlink(
+            os.path.join(
+                REPOSITORY, "data", "AUS", "150tg", "seaweed_growth_rate_clustered_AUS.pkl"
+            ),
+            growth_model_path(scenario, "AUS"),
+        )
+    convert_growth_model_output("columnar", "AUS")
+    os.remove(growth_model_path("columnar", "AUS"))
+    assert prep_scenarios(["pickle", "columnar"], ["AUS"], 2, starting_month=1, block_months=5)
+    growth_df = pd.read_pickle(growth_model_path("pickle", "AUS"))
+    assert columnar_cluster_medians(
+        growth_model_path("columnar", "AUS", COLUMNAR_EXTENSION), 2, block_months=7
+    ).equals(cluster_medians(growth_df, 2))
+    # The grid cells keep their coordinates
+    with np.load(growth_model_path("columnar", "AUS", COLUMNAR_EXTENSION)) as columnar_file:
+        index = columnar_index(columnar_file)
+    assert isinstance(index, pd.MultiIndex)
+    assert index.equals(growth_df.index)
+    assert list(index.names) == list(growth_df.index.names)
+    named_df = growth_df.iloc[:3].set_axis(pd.Index(["a", "b", "c"], name="cell"))
+    write_columnar_growth(named_df, "named.npz")
+    with np.load("named.npz") as columnar_file:
+        assert columnar_index(columnar_file).equals(named_df.index)
+        assert columnar_index(columnar_file).name == "cell"
+    for name in os.listdir(os.path.join("data", "AUS", "pickle")):
+        if not name.startswith("seaweed_growth_rate_clustered"):
+            with open(os.path.join("data", "AUS", "pickle", name), "rb") as pickle_file:
+                with open(os.path.join("data", "AUS", "columnar", name), "rb") as columnar_file:
+                    assert pickle_file.read() == columnar_file.read()
@@ -0,0 +1,57 @@
+"""
+Tests the results store.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.results_store import load_results, read_harvest_df, results_path, save_results
+from tests.conftest import run_global_model
+
+
+def test_results_store(tmp_path):
+    """
+    Tests if results are read back the same, also column by column
+    """
+    harvest_df = pd.DataFrame(
+        {
+            "harvest_for_food": [np.nan, 1.5, np.nan, 2.25],
+            "current_area_used": [100.0, 100.1, 100.2, 100.3],
+            "cluster": [2, 2, 2, 2],
+            "extrapolated": [False, False, True, True],
+        }
+    )
+    path = str(tmp_path / "harvest.npz")
+    save_results(harvest_df, path)
+    assert load_results(path).equals(harvest_df)
+    projected = load_results(path, ["current_area_used", "harvest_for_food"])
+    assert projected.equals(harvest_df[["current_area_used", "harvest_for_food"]])
+    with pytest.raises(KeyError):
+        load_results(path, ["max_area"])
+    save_results(harvest_df, path, dtype="float32", compress=False)
+    results = load_results(path)
+    assert results["current_area_used"].dtype == np.float32
+    assert results["cluster"].dtype == harvest_df["cluster"].dtype
+    assert np.allclose(results["current_area_used"], harvest_df["current_area_used"])
+
+
+def test_run_model_results(workspace):
+    """
+    Tests if the results are saved in the store and only exported to csv
+    when asked for
+    """
+    results = workspace / "results" / "global"
+    run_global_model()
+    assert not (results / "150tg" / "harvest_df_cluster_3.csv").exists()
+    harvest_df = read_harvest_df("global", "150tg", 3)
+    run_global_model(csv_export=True)
+    os.remove(results_path("global", "150tg", 3))
+    harvest_df_csv = read_harvest_df("global", "150tg", 3)
+    assert harvest_df_csv.columns.equals(harvest_df.columns)
+    assert harvest_df_csv.index.equals(harvest_df.index)
+    # Parsing the csv can change the last digit
+    assert np.allclose(harvest_df_csv, harvest_df, rtol=1e-15, atol=0, equal_nan=True)
+    columns = ["max_area", "harvest_for_food"]
+    assert read_harvest_df("global", "150tg", 3, columns).equals(harvest_df_csv[columns])
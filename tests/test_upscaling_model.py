@@ -5,7 +5,17 @@ import os
 import pandas as pd
 import pytest
 
-from src.scaleup_model import SeaweedScaleUpModel, self_shading
+from src.results_store import read_harvest_df
+from src.scaleup_model import (
+    DAILY_STATE_COLUMNS,
+    HARVEST_ONLY_COLUMNS,
+    SeaweedScaleUpModel,
+    merge_harvest_df,
+    self_shading,
+    split_harvest_df,
+    steady_state_calibration,
+)
+from tests.conftest import REPOSITORY, run_global_model
 
 
 def test_initialize_model():
@@ -73,3 +83,200 @@ def test_determine_productivity():
 
     assert productivity_day_km2 is not None
     assert productivity_day_km2 == pytest.approx(94.8, 0.1)
+
+
+def test_seaweed_growth_harvest_columns():
+    """
+    Tests if the harvest columns are only filled on harvest days
+    and the daily columns on every day
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 3, 1000, 20
+    )
+    harvest_df = model.seaweed_growth(
+        initial_seaweed=10000,
+        initial_area_built=100,
+        initial_area_used=100,
+        new_module_area_per_day=100,
+        min_density=1200,
+        max_density=3600,
+        max_area=10000,
+        optimal_growth_rate=30,
+        growth_rate_fraction=model.growth_timeseries,
+        initial_lag=0,
+        percent_usable_for_growth=50,
+        days_to_run=500,
+    )
+    assert len(harvest_df) == 500
+    assert harvest_df["current_area_built"].notna().all()
+    assert harvest_df["cumulative_harvest_for_food"].is_monotonic_increasing
+    harvest_days = harvest_df["harvest_intervall"].notna()
+    assert 0 < harvest_days.sum() < 500
+    assert (harvest_df["harvest_wet"].notna() == harvest_days).all()
+    assert (harvest_df["new_area_used"].notna() == harvest_days).all()
+    assert harvest_df.loc[~harvest_days, "harvest_for_food"].isna().all()
+
+
+@pytest.mark.parametrize("event_driven", [False, True])
+def test_seaweed_growth_split_harvests(event_driven):
+    """
+    Tests if the daily state and the harvests can be merged back into
+    the dataframe with all columns
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 3, 1000, 20
+    )
+    parameters = dict(
+        initial_seaweed=10000,
+        initial_area_built=100,
+        initial_area_used=100,
+        new_module_area_per_day=100,
+        min_density=1200,
+        max_density=3600,
+        max_area=10000,
+        optimal_growth_rate=30,
+        growth_rate_fraction=model.growth_timeseries,
+        initial_lag=0,
+        percent_usable_for_growth=50,
+        days_to_run=500,
+        event_driven=event_driven,
+    )
+    harvest_df = model.seaweed_growth(**parameters)
+    daily_df, harvest_events = model.seaweed_growth(split_harvests=True, **parameters)
+    assert list(daily_df.columns) == list(DAILY_STATE_COLUMNS)
+    assert list(harvest_events.columns) == list(HARVEST_ONLY_COLUMNS)
+    assert list(harvest_events.index) == list(
+        harvest_df.index[harvest_df["harvest_intervall"].notna()]
+    )
+    assert merge_harvest_df(daily_df, harvest_events).equals(harvest_df)
+    # Columns added to the results are kept
+    harvest_df["cluster"] = 3
+    daily_df, harvest_events = split_harvest_df(harvest_df)
+    assert "cluster" in daily_df.columns
+    merged = merge_harvest_df(daily_df, harvest_events)
+    assert list(merged.columns) == list(harvest_df.columns)
+    assert merged.equals(harvest_df)
+
+
+def test_run_model_parallel(workspace):
+    """
+    Tests if running the clusters in parallel gives the same results
+    as running them one after another
+    """
+    results = workspace / "results" / "global"
+    run_global_model(csv_export=True)
+    serial_growth_rates = (results / "scenario_max_growth_rates.csv").read_text()
+    serial_harvest = (results / "150tg" / "harvest_df_cluster_3.csv").read_text()
+    run_global_model(jobs=2, csv_export=True, force=True)
+    assert (results / "scenario_max_growth_rates.csv").read_text() == serial_growth_rates
+    assert (results / "150tg" / "harvest_df_cluster_3.csv").read_text() == serial_harvest
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_model_in_memory(tmp_path, monkeypatch, jobs):
+    """
+    Tests if the model runs on growth in memory without any files and returns
+    the same results as a run on the prepared files
+    """
+    monkeypatch.chdir(tmp_path)
+    growth_data = {
+        scenario: pd.read_csv(
+            os.path.join(
+                REPOSITORY, "data", "global", scenario, "actual_growth_rate_by_cluster.csv"
+            ),
+            index_col=0,
+        )
+        for scenario in ["150tg", "control"]
+    }
+    results = run_global_model(
+        growth_data=growth_data, persist=False, return_results=True, jobs=jobs
+    )
+    assert os.listdir(tmp_path) == []
+    assert results["150tg"]
+    with pytest.raises(ValueError):
+        run_global_model(growth_data=growth_data, persist=False, checkpoints=True)
+    os.symlink(os.path.join(REPOSITORY, "data"), tmp_path / "data")
+    for scenario in ["150tg", "control"]:
+        os.makedirs(tmp_path / "results" / "global" / scenario)
+    assert run_global_model() is None
+    for scenario in ["150tg", "control"]:
+        assert sorted(results[scenario]) == sorted(
+            int(name.split("_")[-1].split(".")[0])
+            for name in os.listdir(tmp_path / "results" / "global" / scenario)
+            if name.startswith("harvest_df")
+        )
+        for cluster, harvest_df in results[scenario].items():
+            assert harvest_df.equals(read_harvest_df("global", scenario, cluster))
+    assert results.scenario_max_growth_rates.to_csv() == (
+        tmp_path / "results" / "global" / "scenario_max_growth_rates.csv"
+    ).read_text()
+
+
+@pytest.mark.parametrize("growth_rate_fraction", [0.0, 0.1, 0.3, 0.5, 0.9, 1.0])
+@pytest.mark.parametrize("days_to_run", [100, 500])
+def test_steady_state_productivity(growth_rate_fraction, days_to_run):
+    """
+    Tests if the steady state solver gives the same productivity
+    as simulating the calibration
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 2, 1000, 20
+    )
+    simulated = model.determine_average_productivity(
+        growth_rate_fraction, days_to_run, 50, 30, solver="simulation"
+    )
+    solved = model.determine_average_productivity(
+        growth_rate_fraction, days_to_run, 50, 30, solver="steady_state"
+    )
+    if simulated is None:
+        assert solved is None
+    else:
+        assert solved == pytest.approx(simulated, rel=1e-9)
+
+
+def test_steady_state_fallback():
+    """
+    Tests if the steady state solver asks for a simulation when
+    it cannot solve the cycle
+    """
+    assert steady_state_calibration(0.5, 500, 30, 20, max_density=300) is None
+    assert steady_state_calibration(0.5, 500, 30, 20, max_cycles=1) is None
+    assert steady_state_calibration(0.0, 500, 30, 20) == (None, None)
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 2, 1000, 20
+    )
+    with pytest.raises(TypeError):
+        model.determine_average_productivity(
+            model.growth_timeseries, 500, 50, 30, solver="steady_state"
+        )
+
+
+def test_seaweed_growth_fast_forward():
+    """
+    Tests if repeating the periodic harvest cycles gives the same
+    results as simulating every day
+    """
+    model = SeaweedScaleUpModel(
+        "data" + os.sep + "global" + os.sep + "150tg", 3, 1000, 20
+    )
+    parameters = dict(
+        initial_seaweed=10000,
+        initial_area_built=100,
+        initial_area_used=100,
+        new_module_area_per_day=100,
+        min_density=1200,
+        max_density=3600,
+        max_area=20000,
+        optimal_growth_rate=30,
+        growth_rate_fraction=0.4,
+        initial_lag=0,
+        percent_usable_for_growth=85,
+        days_to_run=20 * 365,
+    )
+    harvest_df = model.seaweed_growth(**parameters)
+    fast_forward_df = model.seaweed_growth(fast_forward=True, **parameters)
+    extrapolated = fast_forward_df.pop("extrapolated")
+    assert extrapolated.sum() > 6000
+    assert not extrapolated[:300].any()
+    pd.testing.assert_frame_equal(fast_forward_df, harvest_df, rtol=1e-12)
+    assert fast_forward_df["harvest_for_food"].equals(harvest_df["harvest_for_food"])